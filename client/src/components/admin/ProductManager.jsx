@@ -1,6 +1,6 @@
 import { useState, useEffect } from 'react'
 import { motion, AnimatePresence } from 'framer-motion'
-import { productService } from '../../services/productService'
+import { productService, batchJobProgress, QR_MAX_QUANTITY } from '../../services/productService'
 import {
     Plus, Building2, Package, Save, X, Trash2,
     Edit2, ExternalLink, MoreVertical, LayoutGrid,
@@ -87,12 +87,15 @@ export default function ProductManager() {
     const handleGenerateBatch = async (e) => {
         e.preventDefault()
         if (!selectedProduct || qrQuantity < 1) return
+        if (qrQuantity > QR_MAX_QUANTITY) return toast.error(`Quantity must be between 1 and ${QR_MAX_QUANTITY}`)
 
         setQrGenerating(true)
         const loadToast = toast.loading(`Generating ${qrQuantity} QR Codes...`)
 
         try {
-            const response = await productService.admin.generateBatchPDF(selectedProduct.id, qrQuantity)
+            const response = await productService.admin.generateLabelSheet(selectedProduct.id, qrQuantity, (job) => {
+                toast.loading(batchJobProgress(job), { id: loadToast })
+            })
 
             // Handle Blob Download
             const url = window.URL.createObjectURL(new Blob([response.data]))
@@ -440,7 +443,7 @@ export default function ProductManager() {
                                             required
                                             type="number"
                                             min="1"
-                                            max="500"
+                                            max={QR_MAX_QUANTITY}
                                             value={qrQuantity}
                                             onChange={e => setQrQuantity(e.target.value)}
                                             className="premium-input bg-emerald-900/10 border-emerald-500/20 text-emerald-400 text-2xl font-black h-16 text-center"
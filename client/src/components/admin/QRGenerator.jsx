@@ -1,11 +1,11 @@
 import { useState, useEffect } from 'react'
 import { motion, AnimatePresence } from 'framer-motion'
-import { productService } from '../../services/productService'
+import { productService, batchJobProgress, QR_MAX_QUANTITY, QR_INSTANT_MAX_QUANTITY } from '../../services/productService'
 import { API_URL } from '../../services/api'
 import {
     QrCode, Plus, Copy, ExternalLink, BarChart3,
     Clock, Link2, Target, Zap, Activity,
-    ChevronRight, Scan, MousePointer2
+    ChevronRight, Scan, MousePointer2, Download
 } from 'lucide-react'
 import toast from 'react-hot-toast'
 
@@ -60,13 +60,15 @@ export default function QRGenerator() {
 
     const handleInstantDownload = async () => {
         if (!selectedProduct) return toast.error('Select a product first')
-        if (quantity < 1 || quantity > 500) return toast.error('Quantity must be between 1 and 500')
+        if (quantity < 1 || quantity > QR_MAX_QUANTITY) return toast.error(`Quantity must be between 1 and ${QR_MAX_QUANTITY}`)
 
         setGenerating(true)
         const loadToast = toast.loading(`Generating ${quantity} QR Codes...`)
 
         try {
-            const response = await productService.admin.generateBatchPDF(selectedProduct, quantity)
+            const response = await productService.admin.generateLabelSheet(selectedProduct, quantity, (job) => {
+                toast.loading(batchJobProgress(job), { id: loadToast })
+            })
 
             // Handle Blob Download locally (Fixes Mixed Content & Storage issues)
             const url = window.URL.createObjectURL(new Blob([response.data]))
@@ -91,6 +93,27 @@ export default function QRGenerator() {
         }
     }
 
+    const handleBatchDownload = async (batch) => {
+        const loadToast = toast.loading(`Preparing Batch #${batch.batch_number}...`)
+        try {
+            const response = await productService.admin.downloadBatchPDF(batch.product_id, batch.id)
+
+            const url = window.URL.createObjectURL(new Blob([response.data]))
+            const link = document.createElement('a')
+            link.href = url
+            link.setAttribute('download', `QR_${batch.quantity}_${batch.product_name.replace(/\s+/g, '_')}.pdf`)
+            document.body.appendChild(link)
+            link.click()
+
+            document.body.removeChild(link)
+            window.URL.revokeObjectURL(url)
+
+            toast.success('Batch Downloaded', { id: loadToast })
+        } catch (error) {
+            toast.error('Download Failed', { id: loadToast })
+        }
+    }
+
     const fetchQRs = async (productId) => {
         try {
             const response = await productService.admin.getProductQRs(productId)
@@ -200,13 +223,13 @@ export default function QRGenerator() {
                             <input
                                 type="number"
                                 min="1"
-                                max="100"
+                                max={QR_MAX_QUANTITY}
                                 value={quantity}
                                 onChange={(e) => setQuantity(parseInt(e.target.value) || 1)}
                                 className="w-full bg-slate-900 border border-white/10 rounded-2xl px-6 py-5 text-white text-xs font-bold focus:border-blue-500 transition-all outline-none shadow-inner"
                                 placeholder="24"
                             />
-                            <p className="text-[9px] text-slate-600 italic">Generate 1-100 codes at once (4×6 grid = 24)</p>
+                            <p className="text-[9px] text-slate-600 italic">Up to {QR_INSTANT_MAX_QUANTITY} codes download instantly; larger batches run in the background (4×6 grid = 24)</p>
                         </div>
 
                         <button
@@ -313,7 +336,7 @@ export default function QRGenerator() {
                                                 </div>
                                             </div>
                                             <img
-                                                src={`${API_URL}/api/admin/catalog/products/${selectedProduct}/qr-image/${qr.code}`}
+                                                src={`${API_URL}/api/admin/catalog/products/${selectedProduct}/qr-image/${qr.code}?size=128`}
                                                 alt={`QR ${qr.code}`}
                                                 className="w-16 h-16 rounded-xl border border-white/10 bg-white p-1"
                                             />
@@ -358,11 +381,24 @@ export default function QRGenerator() {
                                                     <div className="text-[10px] font-black text-slate-600 uppercase tracking-widest flex items-center gap-2">
                                                         <Clock size={12} /> {new Date(batch.created_at).toLocaleString()}
                                                     </div>
+                                                    {batch.usage && (
+                                                        <div className="text-[10px] font-black text-slate-500 uppercase tracking-widest flex items-center gap-2">
+                                                            <Scan size={12} /> {batch.usage.scanned} Scanned · {batch.usage.used} Claimed
+                                                        </div>
+                                                    )}
                                                 </div>
                                             </div>
                                         </div>
-                                        <div className="px-6 py-3 bg-emerald-600/10 text-emerald-500 rounded-xl text-[10px] font-black uppercase tracking-widest border border-emerald-500/10">
-                                            Verified Pack
+                                        <div className="flex items-center gap-3">
+                                            <button
+                                                onClick={() => handleBatchDownload(batch)}
+                                                className="px-6 py-3 bg-white/5 hover:bg-emerald-600 text-slate-300 hover:text-white rounded-xl text-[10px] font-black uppercase tracking-widest border border-white/5 transition-all flex items-center gap-2"
+                                            >
+                                                <Download size={14} /> Download PDF
+                                            </button>
+                                            <div className="px-6 py-3 bg-emerald-600/10 text-emerald-500 rounded-xl text-[10px] font-black uppercase tracking-widest border border-emerald-500/10">
+                                                Verified Pack
+                                            </div>
                                         </div>
                                     </motion.div>
                                 ))
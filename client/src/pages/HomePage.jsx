@@ -5,6 +5,7 @@ import { motion, AnimatePresence } from 'framer-motion'
 import toast from 'react-hot-toast'
 import { videoService } from '../services/videoService'
 import { productService } from '../services/productService'
+import { rewardService } from '../services/rewardService'
 import {
     LayoutDashboard, Award, Film, LogOut, X,
     Star, Wallet, Activity, Camera, Instagram,
@@ -274,13 +275,11 @@ export default function HomePage() {
             formData.append('phone', user?.phone || 'N/A')
             if (cashbackForm.screenshot) formData.append('screenshot', cashbackForm.screenshot)
 
-            await api.post('/rewards/submit', formData, {
-                headers: { 'Content-Type': 'multipart/form-data' }
-            })
+            const response = await rewardService.submitReward(formData)
 
-            toast.success('Cashback claim submitted successfully!')
             setCashbackForm({ platform: '', upiId: '', couponCode: '', screenshot: null })
             await fetchDashboard()
+            trackVerification(response.data.id)
         } catch (error) {
             toast.error(error.response?.data?.detail || 'Submission failed')
         } finally {
@@ -288,6 +287,26 @@ export default function HomePage() {
         }
     }
 
+    // Screenshot verification runs in the background after submit; report its outcome
+    const trackVerification = async (rewardId) => {
+        const verifyToast = toast.loading('Claim submitted! Verifying your screenshot...')
+        try {
+            const status = await rewardService.waitForVerification(rewardId)
+            if (status.status === 'rejected') {
+                toast.error(`Claim rejected: ${status.rejection_reason || 'screenshot could not be verified'}`, { id: verifyToast, duration: 8000 })
+            } else if (status.is_auto_approved || status.status === 'approved') {
+                toast.success('Verified! Your cashback has been approved.', { id: verifyToast })
+            } else if (status.ai_analysis_status === 'success' || status.ai_analysis_status === 'failed') {
+                toast.success('Claim submitted. It is now with our team for review.', { id: verifyToast })
+            } else {
+                toast.success('Claim submitted. Verification is taking a while; check your dashboard shortly.', { id: verifyToast })
+            }
+            await fetchDashboard()
+        } catch (error) {
+            toast.success('Claim submitted. Check your dashboard for its status.', { id: verifyToast })
+        }
+    }
+
     const handleVideoSubmit = async (e) => {
         e.preventDefault()
         setFormLoading(true)
@@ -1,5 +1,21 @@
 import api from './api'
 
+// Label sheets up to this size come back from generate-pdf-batch directly;
+// larger runs are queued as background batch jobs (server: QR_INSTANT_PDF_MAX_QUANTITY)
+export const QR_INSTANT_MAX_QUANTITY = 5000
+export const QR_MAX_QUANTITY = 200000
+const JOB_POLL_INTERVAL_MS = 2000
+
+const sleep = (ms) => new Promise(resolve => setTimeout(resolve, ms))
+
+// One-line progress text for a batch job status
+export const batchJobProgress = (job) => {
+    if (job.status === 'generating') return `Creating codes ${job.codes_inserted}/${job.quantity}...`
+    if (job.status === 'rendering') return `Rendering PDF page ${job.pages_rendered}/${job.pages_total}...`
+    if (job.status === 'completed') return 'Downloading PDF...'
+    return `Queued ${job.quantity} QR Codes...`
+}
+
 export const productService = {
     // Public Endpoints
     getProducts: async () => {
@@ -46,6 +62,38 @@ export const productService = {
                 responseType: 'blob'
             })
         },
+        createBatchJob: async (productId, quantity) => {
+            return api.post(`/admin/catalog/products/${productId}/qr-batch-jobs?quantity=${quantity}`)
+        },
+        getBatchJob: async (jobId) => {
+            return api.get(`/admin/catalog/qr-batch-jobs/${jobId}`)
+        },
+        downloadBatchJob: async (jobId) => {
+            return api.get(`/admin/catalog/qr-batch-jobs/${jobId}/download`, {
+                responseType: 'blob'
+            })
+        },
+        // Generate a batch and fetch its PDF: instant for small runs, otherwise a
+        // background job polled until done (onProgress receives each job status)
+        generateLabelSheet: async (productId, quantity, onProgress = () => {}) => {
+            if (quantity <= QR_INSTANT_MAX_QUANTITY) {
+                return productService.admin.generateBatchPDF(productId, quantity)
+            }
+            let { data: job } = await productService.admin.createBatchJob(productId, quantity)
+            onProgress(job)
+            while (job.status !== 'completed') {
+                if (job.status === 'error') throw new Error(job.error || 'Batch job failed')
+                await sleep(JOB_POLL_INTERVAL_MS)
+                job = (await productService.admin.getBatchJob(job.job_id)).data
+                onProgress(job)
+            }
+            return productService.admin.downloadBatchJob(job.job_id)
+        },
+        downloadBatchPDF: async (productId, batchId) => {
+            return api.get(`/admin/catalog/products/${productId}/qr-pdf?batch_id=${batchId}`, {
+                responseType: 'blob'
+            })
+        },
         getBatchHistory: async (productId) => {
             return api.get(`/admin/catalog/products/${productId}/batches`)
         },
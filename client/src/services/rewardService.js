@@ -1,5 +1,14 @@
 import api from './api'
 
+const VERIFICATION_POLL_INTERVAL_MS = 3000
+const VERIFICATION_TIMEOUT_MS = 120000
+
+const sleep = (ms) => new Promise(resolve => setTimeout(resolve, ms))
+
+// AI verification has finished (or an admin already decided the claim)
+const verificationDone = (status) =>
+    ['success', 'failed'].includes(status.ai_analysis_status) || ['approved', 'rejected', 'paid'].includes(status.status)
+
 export const rewardService = {
     // Submit reward claim
     submitReward: async (formData) => {
@@ -10,6 +19,23 @@ export const rewardService = {
         })
     },
 
+    // Poll background AI verification progress of a claim
+    getVerificationStatus: async (rewardId) => {
+        return api.get(`/rewards/${rewardId}/verification`)
+    },
+
+    // Poll until the claim's verification finishes; resolves with the final
+    // status, or the last one seen if it takes longer than the timeout
+    waitForVerification: async (rewardId) => {
+        const deadline = Date.now() + VERIFICATION_TIMEOUT_MS
+        let { data: status } = await rewardService.getVerificationStatus(rewardId)
+        while (!verificationDone(status) && Date.now() < deadline) {
+            await sleep(VERIFICATION_POLL_INTERVAL_MS)
+            status = (await rewardService.getVerificationStatus(rewardId)).data
+        }
+        return status
+    },
+
     // Get user's rewards
     getMyRewards: async () => {
         return api.get('/rewards/my-claims')
@@ -25,7 +25,7 @@ if config.config_file_name is not None:
 # add your model's MetaData object here
 # for 'autogenerate' support
 from app.database import Base
-from app.models import user, coupon, reward, reel, company, product, qr_code, qr_batch
+from app.models import user, coupon, reward, reel, company, product, qr_code, qr_batch, ai_result_cache, drive_upload, qr_scan_event, product_serial_counter, id_sequence
 target_metadata = Base.metadata
 
 def run_migrations_offline() -> None:
@@ -0,0 +1,39 @@
+"""add product_serial_counters table
+
+Revision ID: a7b8c9d0e1f2
+Revises: f6a7b8c9d0e1
+Create Date: 2026-10-17 18:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'a7b8c9d0e1f2'
+down_revision = 'f6a7b8c9d0e1'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        'product_serial_counters',
+        sa.Column('product_id', sa.Integer(), nullable=False),
+        sa.Column('next_serial', sa.Integer(), nullable=False),
+        sa.Column('next_batch_number', sa.Integer(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['product_id'], ['products.id'], ),
+        sa.PrimaryKeyConstraint('product_id')
+    )
+
+    # Seed every existing product from its current maximums (last full scan)
+    op.execute("""
+        INSERT INTO product_serial_counters (product_id, next_serial, next_batch_number, updated_at)
+        SELECT p.id,
+               COALESCE((SELECT MAX(q.serial_number) FROM qr_codes q WHERE q.product_id = p.id), 0) + 1,
+               COALESCE((SELECT MAX(b.batch_number) FROM qr_batches b WHERE b.product_id = p.id), 0) + 1,
+               CURRENT_TIMESTAMP
+        FROM products p
+    """)
+
+def downgrade():
+    op.drop_table('product_serial_counters')
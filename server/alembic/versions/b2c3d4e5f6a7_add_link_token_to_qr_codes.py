@@ -20,15 +20,18 @@ def upgrade():
     op.add_column('qr_codes', sa.Column('link_token', sa.String(length=50), nullable=True))
     op.create_index(op.f('ix_qr_codes_link_token'), 'qr_codes', ['link_token'], unique=True)
     
-    # Populate existing rows with random tokens
+    # Populate existing rows with random tokens. The column is new, so tokens
+    # de-duplicated in memory are unique; written with one executemany.
     connection = op.get_bind()
     qr_codes = connection.execute(sa.text("SELECT id FROM qr_codes")).fetchall()
     
-    for row in qr_codes:
-        token = uuid.uuid4().hex[:12]
+    tokens = set()
+    while len(tokens) < len(qr_codes):
+        tokens.add(uuid.uuid4().hex[:12])
+    if qr_codes:
         connection.execute(
             sa.text("UPDATE qr_codes SET link_token = :token WHERE id = :id"),
-            {"token": token, "id": row.id}
+            [{"token": token, "id": row.id} for row, token in zip(qr_codes, tokens)]
         )
     
     # After populating, make it non-nullable if desired (optional, keeping it nullable for safety during transition)
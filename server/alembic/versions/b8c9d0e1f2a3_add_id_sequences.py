@@ -0,0 +1,27 @@
+"""add id_sequences table (link_token sequence)
+
+Revision ID: b8c9d0e1f2a3
+Revises: a7b8c9d0e1f2
+Create Date: 2026-10-17 20:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'b8c9d0e1f2a3'
+down_revision = 'a7b8c9d0e1f2'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        'id_sequences',
+        sa.Column('name', sa.String(length=50), nullable=False),
+        sa.Column('next_value', sa.BigInteger(), nullable=False),
+        sa.PrimaryKeyConstraint('name')
+    )
+    op.execute("INSERT INTO id_sequences (name, next_value) VALUES ('link_token', 1)")
+
+def downgrade():
+    op.drop_table('id_sequences')
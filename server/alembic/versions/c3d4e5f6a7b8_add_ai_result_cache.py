@@ -0,0 +1,42 @@
+"""add ai_result_cache table
+
+Revision ID: c3d4e5f6a7b8
+Revises: b2c3d4e5f6a7
+Create Date: 2026-10-17 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'c3d4e5f6a7b8'
+down_revision = 'b2c3d4e5f6a7'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        'ai_result_cache',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('image_hash', sa.String(length=64), nullable=False),
+        sa.Column('product_id', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('prompt_version', sa.String(length=50), nullable=False),
+        sa.Column('result_json', sa.JSON(), nullable=False),
+        sa.Column('hit_count', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('last_hit_at', sa.DateTime(), nullable=True),
+        sa.Column('expires_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('image_hash', 'product_id', 'prompt_version', name='uq_ai_result_cache_key')
+    )
+    op.create_index(op.f('ix_ai_result_cache_id'), 'ai_result_cache', ['id'], unique=False)
+    op.create_index(op.f('ix_ai_result_cache_image_hash'), 'ai_result_cache', ['image_hash'], unique=False)
+    op.create_index(op.f('ix_ai_result_cache_last_hit_at'), 'ai_result_cache', ['last_hit_at'], unique=False)
+    op.create_index(op.f('ix_ai_result_cache_expires_at'), 'ai_result_cache', ['expires_at'], unique=False)
+
+def downgrade():
+    op.drop_index(op.f('ix_ai_result_cache_expires_at'), table_name='ai_result_cache')
+    op.drop_index(op.f('ix_ai_result_cache_last_hit_at'), table_name='ai_result_cache')
+    op.drop_index(op.f('ix_ai_result_cache_image_hash'), table_name='ai_result_cache')
+    op.drop_index(op.f('ix_ai_result_cache_id'), table_name='ai_result_cache')
+    op.drop_table('ai_result_cache')
@@ -0,0 +1,23 @@
+"""add job_id to qr_batches
+
+Revision ID: c9d0e1f2a3b4
+Revises: b8c9d0e1f2a3
+Create Date: 2026-10-17 22:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'c9d0e1f2a3b4'
+down_revision = 'b8c9d0e1f2a3'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.add_column('qr_batches', sa.Column('job_id', sa.String(length=32), nullable=True))
+    op.create_index(op.f('ix_qr_batches_job_id'), 'qr_batches', ['job_id'], unique=True)
+
+def downgrade():
+    op.drop_index(op.f('ix_qr_batches_job_id'), table_name='qr_batches')
+    op.drop_column('qr_batches', 'job_id')
@@ -0,0 +1,21 @@
+"""add drive_file_id to drive_uploads
+
+Revision ID: d0e1f2a3b4c5
+Revises: c9d0e1f2a3b4
+Create Date: 2026-10-17 23:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'd0e1f2a3b4c5'
+down_revision = 'c9d0e1f2a3b4'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.add_column('drive_uploads', sa.Column('drive_file_id', sa.String(length=100), nullable=True))
+
+def downgrade():
+    op.drop_column('drive_uploads', 'drive_file_id')
@@ -0,0 +1,29 @@
+"""add perceptual hash columns to rewards and reels
+
+Revision ID: d4e5f6a7b8c9
+Revises: c3d4e5f6a7b8
+Create Date: 2026-10-17 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'd4e5f6a7b8c9'
+down_revision = 'c3d4e5f6a7b8'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    for table in ('rewards', 'reels'):
+        op.add_column(table, sa.Column('phash', sa.String(length=16), nullable=True))
+        for i in range(4):
+            op.add_column(table, sa.Column(f'phash_{i}', sa.Integer(), nullable=True))
+            op.create_index(op.f(f'ix_{table}_phash_{i}'), table, [f'phash_{i}'], unique=False)
+
+def downgrade():
+    for table in ('rewards', 'reels'):
+        for i in range(4):
+            op.drop_index(op.f(f'ix_{table}_phash_{i}'), table_name=table)
+            op.drop_column(table, f'phash_{i}')
+        op.drop_column(table, 'phash')
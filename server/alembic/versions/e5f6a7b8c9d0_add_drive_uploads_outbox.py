@@ -0,0 +1,43 @@
+"""add drive_uploads outbox table
+
+Revision ID: e5f6a7b8c9d0
+Revises: d4e5f6a7b8c9
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'e5f6a7b8c9d0'
+down_revision = 'd4e5f6a7b8c9'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        'drive_uploads',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('local_path', sa.String(length=500), nullable=False),
+        sa.Column('file_name', sa.String(length=255), nullable=False),
+        sa.Column('mime_type', sa.String(length=50), nullable=False),
+        sa.Column('target_type', sa.String(length=20), nullable=False),
+        sa.Column('target_id', sa.Integer(), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=True),
+        sa.Column('attempts', sa.Integer(), nullable=True),
+        sa.Column('next_attempt_at', sa.DateTime(), nullable=True),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('drive_url', sa.String(length=500), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_drive_uploads_id'), 'drive_uploads', ['id'], unique=False)
+    op.create_index(op.f('ix_drive_uploads_status'), 'drive_uploads', ['status'], unique=False)
+    op.create_index(op.f('ix_drive_uploads_next_attempt_at'), 'drive_uploads', ['next_attempt_at'], unique=False)
+
+def downgrade():
+    op.drop_index(op.f('ix_drive_uploads_next_attempt_at'), table_name='drive_uploads')
+    op.drop_index(op.f('ix_drive_uploads_status'), table_name='drive_uploads')
+    op.drop_index(op.f('ix_drive_uploads_id'), table_name='drive_uploads')
+    op.drop_table('drive_uploads')
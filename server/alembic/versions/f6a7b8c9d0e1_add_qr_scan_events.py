@@ -0,0 +1,39 @@
+"""add qr_scan_events table
+
+Revision ID: f6a7b8c9d0e1
+Revises: e5f6a7b8c9d0
+Create Date: 2026-10-17 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'f6a7b8c9d0e1'
+down_revision = 'e5f6a7b8c9d0'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        'qr_scan_events',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('scan_day', sa.Date(), nullable=False),
+        sa.Column('scanned_at', sa.DateTime(), nullable=False),
+        sa.Column('link_token', sa.String(length=50), nullable=False),
+        sa.Column('qr_code_id', sa.Integer(), nullable=False),
+        sa.Column('product_id', sa.Integer(), nullable=True),
+        sa.Column('batch_id', sa.Integer(), nullable=True),
+        sa.Column('user_agent_class', sa.String(length=20), nullable=True),
+        sa.Column('ip_prefix', sa.String(length=50), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_qr_scan_events_day_batch', 'qr_scan_events', ['scan_day', 'batch_id'], unique=False)
+    op.create_index('ix_qr_scan_events_day_product', 'qr_scan_events', ['scan_day', 'product_id'], unique=False)
+    op.create_index('ix_qr_scan_events_day_code', 'qr_scan_events', ['scan_day', 'qr_code_id'], unique=False)
+
+def downgrade():
+    op.drop_index('ix_qr_scan_events_day_code', table_name='qr_scan_events')
+    op.drop_index('ix_qr_scan_events_day_product', table_name='qr_scan_events')
+    op.drop_index('ix_qr_scan_events_day_batch', table_name='qr_scan_events')
+    op.drop_table('qr_scan_events')
@@ -76,6 +76,13 @@ async def update_reward_status(
     db.commit()
     db.refresh(reward)
     
+    if update.status == "rejected":
+        from app.services.qr_cache import qr_cache
+        qr_cache.invalidate_code(reward.coupon_code)
+        if qr:
+            from app.services.serial_bitmap import serial_bitmaps
+            serial_bitmaps.mark_used(qr.product_id, qr.serial_number, used=False)
+    
     return RewardResponse.model_validate(reward)
 
 @router.get("/reels", response_model=List[ReelResponse])
@@ -206,3 +213,122 @@ async def bulk_payment(
         "failed_details": failed_ids,
         "total_processed": len(request.reward_ids)
     }
+
+# Bulk AI Re-verification
+class ReverifyRequest(BaseModel):
+    statuses: list[str] = ["failed", "pending"]  # ai_analysis_status values to re-run
+    date_from: Optional[datetime] = None
+    date_to: Optional[datetime] = None
+    product_id: Optional[int] = None
+    concurrency: Optional[int] = None
+    rate_per_minute: Optional[int] = None
+
+@router.post("/rewards/reverify")
+async def start_reverification(
+    request: ReverifyRequest,
+    is_admin: bool = Depends(verify_admin)
+):
+    """Re-run AI verification over pending/failed rewards in the background (Admin only)"""
+    from app.services.reverification_service import reverification_service, ReverificationJob
+    
+    job = reverification_service.start(ReverificationJob(
+        statuses=request.statuses,
+        date_from=request.date_from,
+        date_to=request.date_to,
+        product_id=request.product_id,
+        concurrency=min(request.concurrency, 16) if request.concurrency else None,
+        rate_per_minute=request.rate_per_minute
+    ))
+    return job.to_dict()
+
+@router.post("/rewards/reverify/{job_id}/resume")
+async def resume_reverification(
+    job_id: str,
+    is_admin: bool = Depends(verify_admin)
+):
+    """Resume a re-verification job from its last checkpoint (Admin only)"""
+    from app.services.reverification_service import reverification_service
+    
+    try:
+        job = reverification_service.resume(job_id)
+    except (FileNotFoundError, ValueError):
+        raise HTTPException(status_code=404, detail="Re-verification job not found")
+    return job.to_dict()
+
+@router.get("/rewards/reverify/{job_id}")
+async def get_reverification_progress(
+    job_id: str,
+    is_admin: bool = Depends(verify_admin)
+):
+    """Progress report of a re-verification job (Admin only)"""
+    from app.services.reverification_service import reverification_service
+    
+    progress = reverification_service.get(job_id)
+    if not progress:
+        raise HTTPException(status_code=404, detail="Re-verification job not found")
+    return progress
+
+@router.delete("/rewards/reverify/{job_id}")
+async def cancel_reverification(
+    job_id: str,
+    is_admin: bool = Depends(verify_admin)
+):
+    """Stop a running re-verification job after its current chunk (Admin only)"""
+    from app.services.reverification_service import reverification_service
+    
+    if not reverification_service.cancel(job_id):
+        raise HTTPException(status_code=404, detail="Re-verification job not running")
+    return {"message": "Cancellation requested", "job_id": job_id}
+
+# Google Drive Upload Outbox
+@router.get("/drive-outbox")
+async def get_drive_outbox(
+    db: Session = Depends(get_db),
+    is_admin: bool = Depends(verify_admin)
+):
+    """Outbox counts per status and the dead-lettered uploads (Admin only)"""
+    from app.models.drive_upload import DriveUpload
+    from app.services.drive_outbox import drive_outbox
+    
+    dead = db.query(DriveUpload).filter(DriveUpload.status == "dead").order_by(DriveUpload.updated_at.desc()).limit(100).all()
+    return {
+        "counts": drive_outbox.stats(),
+        "dead": [
+            {
+                "id": item.id,
+                "target_type": item.target_type,
+                "target_id": item.target_id,
+                "file_name": item.file_name,
+                "attempts": item.attempts,
+                "last_error": item.last_error,
+                "updated_at": item.updated_at
+            } for item in dead
+        ]
+    }
+
+@router.post("/drive-outbox/{item_id}/retry")
+async def retry_drive_upload(
+    item_id: int,
+    is_admin: bool = Depends(verify_admin)
+):
+    """Re-queue a dead-lettered Drive upload (Admin only)"""
+    from app.services.drive_outbox import drive_outbox
+    
+    if not drive_outbox.retry(item_id):
+        raise HTTPException(status_code=404, detail="Dead-lettered upload not found")
+    return {"message": "Upload re-queued", "id": item_id}
+
+@router.get("/scan-counters")
+async def get_scan_counters(is_admin: bool = Depends(verify_admin)):
+    """Write-behind QR scan counter and scan event log status, including unflushed work (Admin only)"""
+    from app.services.scan_counter import scan_counter
+    from app.services.scan_events import scan_event_log
+    
+    return {**scan_counter.stats(), "events": scan_event_log.stats()}
+
+@router.get("/startup-report")
+async def get_startup_report(is_admin: bool = Depends(verify_admin)):
+    """Import and initialization cost per module for this worker (Admin only)"""
+    from app import startup_report
+    
+    return startup_report.snapshot()
@@ -1,8 +1,7 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 import uuid
-import re
 
 from app.database import get_db
 from app.models.company import Company
@@ -92,6 +91,9 @@ async def update_product(product_id: int, product_update: ProductUpdate, db: Ses
         
     db.commit()
     db.refresh(db_product)
+    
+    from app.services.qr_cache import qr_cache
+    qr_cache.invalidate_product(product_id)
     return db_product
 
 # --- QR Code Generation ---
@@ -106,9 +108,9 @@ async def generate_qr_for_product(product_id: int, db: Session = Depends(get_db)
     # Generate unique secure code (looks encrypted)
     import hashlib
     sku = (product.sku_prefix or "QR").upper()
-    # Get next serial for this product
-    last_qr = db.query(QRCode).filter(QRCode.product_id == product_id).order_by(QRCode.serial_number.desc()).first()
-    next_serial = (last_qr.serial_number + 1) if last_qr and last_qr.serial_number else 1
+    # Reserve the next serial for this product
+    from app.services.qr_generation import reserve_serials
+    next_serial, _ = reserve_serials(product_id, 1)
     
     salt = uuid.uuid4().hex[:8]
     raw_seed = f"{sku}-{next_serial}-{salt}"
@@ -122,69 +124,79 @@ async def generate_qr_for_product(product_id: int, db: Session = Depends(get_db)
     db.add(db_qr)
     db.commit()
     db.refresh(db_qr)
+    
+    from app.services.serial_bitmap import serial_bitmaps
+    serial_bitmaps.mark_issued(product_id, next_serial)
     return db_qr
 
 @router.post("/products/{product_id}/generate-bulk")
 async def generate_bulk_qr(product_id: int, quantity: int, db: Session = Depends(get_db), is_admin: bool = Depends(verify_admin)):
     """Generate multiple QR codes at once"""
+    from fastapi.concurrency import run_in_threadpool
+    from app.config import settings
+    from app.services.qr_generation import generate_codes
+    
     # Verify product exists
     product = db.query(Product).filter(Product.id == product_id).first()
     if not product:
         raise HTTPException(status_code=404, detail="Product not found")
     
     # Validate quantity
-    if quantity < 1 or quantity > 100:
-        raise HTTPException(status_code=400, detail="Quantity must be between 1 and 100")
+    if quantity < 1 or quantity > settings.QR_BULK_MAX_QUANTITY:
+        raise HTTPException(status_code=400, detail=f"Quantity must be between 1 and {settings.QR_BULK_MAX_QUANTITY}")
     
-    # Generate multiple codes
-    generated_codes = []
-    sku = (product.sku_prefix or "QR").upper()
-    import hashlib
+    def create_codes():
+        # Generate codes set-based (collision check + insert in chunks)
+        rows = generate_codes(db, product_id, quantity)
+        db.commit()
+        return rows
     
-    # Get last serial number for this product
-    last_qr = db.query(QRCode).filter(QRCode.product_id == product_id).order_by(QRCode.serial_number.desc()).first()
-    serial_start = (last_qr.serial_number + 1) if last_qr and last_qr.serial_number else 1
-
-    for i in range(quantity):
-        current_serial = serial_start + i
-        salt = uuid.uuid4().hex[:8]
-        raw_seed = f"{sku}-{current_serial}-{salt}"
-        unique_code = hashlib.sha256(raw_seed.encode()).hexdigest()[:12].upper()
-        
-        while db.query(QRCode).filter(QRCode.code == unique_code).first():
-            salt = uuid.uuid4().hex[:8]
-            unique_code = hashlib.sha256(f"{sku}-{current_serial}-{salt}".encode()).hexdigest()[:12].upper()
-        
-        db_qr = QRCode(product_id=product_id, code=unique_code, serial_number=current_serial)
-        db.add(db_qr)
-        generated_codes.append(db_qr)
+    rows = await run_in_threadpool(create_codes)
     
-    db.commit()
+    from app.services.serial_bitmap import serial_bitmaps
+    serial_bitmaps.mark_issued(product_id, rows[0]["serial_number"], quantity)
     
     return {
         "message": f"Generated {quantity} QR codes",
-        "codes": [QRCodeResponse.model_validate(qr) for qr in generated_codes]
+        "codes": [QRCodeResponse.model_validate(row) for row in rows]
     }
 
 @router.get("/products/{product_id}/qr-image/{code}")
-async def get_qr_image(product_id: int, code: str, db: Session = Depends(get_db)):
-    """Generate and return a single QR code image"""
-    from fastapi.responses import StreamingResponse
-    from app.services.qr_service import qr_service
+async def get_qr_image(product_id: int, code: str, request: Request, size: Optional[int] = None, db: Session = Depends(get_db)):
+    """Return a single QR code image (cached on disk, revalidated with ETag)"""
+    from fastapi.concurrency import run_in_threadpool
+    from app.services.qr_image_cache import qr_image_cache
+    from app.config import settings
+    
+    if size is not None and not settings.QR_IMAGE_MIN_SIZE <= size <= settings.QR_IMAGE_MAX_SIZE:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Size must be between {settings.QR_IMAGE_MIN_SIZE} and {settings.QR_IMAGE_MAX_SIZE} pixels"
+        )
     
     # Verify QR code exists for this product
     qr = db.query(QRCode).filter(QRCode.product_id == product_id, QRCode.code == code).first()
     if not qr:
         raise HTTPException(status_code=404, detail="QR code not found")
     
-    img_buffer = qr_service.generate_qr_image(qr.code)
-    return StreamingResponse(img_buffer, media_type="image/png")
+    # The cache key is derived from the inputs, so a matching ETag needs no rendering
+    error_correction = settings.QR_IMAGE_ERROR_CORRECTION
+    etag = qr_image_cache.etag(qr_image_cache.key(qr.code, size, error_correction))
+    headers = {"ETag": etag, "Cache-Control": f"private, max-age={settings.QR_IMAGE_MAX_AGE}"}
+    if_none_match = request.headers.get("if-none-match", "")
+    if if_none_match.strip() == "*" or etag in [tag.strip() for tag in if_none_match.split(",")]:
+        return Response(status_code=304, headers=headers)
+    
+    _, image = await run_in_threadpool(qr_image_cache.get_or_render, qr.code, size, error_correction)
+    return Response(content=image, media_type="image/png", headers=headers)
 
 @router.post("/products/{product_id}/generate-pdf-batch")
 async def generate_pdf_batch(product_id: int, quantity: int, db: Session = Depends(get_db), is_admin: bool = Depends(verify_admin)):
-    """Generate multiple QR codes and return PDF immediately"""
-    from fastapi.responses import StreamingResponse
+    """Generate a small QR batch and return its PDF immediately (larger runs: qr-batch-jobs)"""
+    from fastapi.concurrency import run_in_threadpool
     from app.services.qr_service import qr_service
+    from app.services.qr_pdf_cache import qr_pdf_cache
+    from app.services.qr_generation import generate_codes, reserve_serials
     from app.config import settings
 
     # Verify product exists
@@ -192,90 +204,114 @@ async def generate_pdf_batch(product_id: int, quantity: int, db: Session = Depen
     if not product:
         raise HTTPException(status_code=404, detail="Product not found")
     
-    # Validate quantity
-    if quantity < 1 or quantity > 500:
-        raise HTTPException(status_code=400, detail="Quantity must be between 1 and 500")
-    
-    # 1. Determine Serial Start and Batch Number
-    # Get last serial number for this product
-    last_qr = db.query(QRCode).filter(QRCode.product_id == product_id).order_by(QRCode.serial_number.desc()).first()
-    serial_start = (last_qr.serial_number + 1) if last_qr and last_qr.serial_number else 1
-    
-    # Get last batch number
-    last_batch = db.query(QRBatch).filter(QRBatch.product_id == product_id).order_by(QRBatch.batch_number.desc()).first()
-    next_batch_num = (last_batch.batch_number + 1) if last_batch else 1
-    
-    # 2. Create the Batch record
-    db_batch = QRBatch(
-        product_id=product_id,
-        batch_number=next_batch_num,
-        quantity=quantity,
-        serial_start=serial_start,
-        serial_end=serial_start + quantity - 1
-    )
-    db.add(db_batch)
-    db.flush() # Get batch ID
-    
-    # 3. Generate new codes in DB
-    generated_qr_objects = []
-    base_url = settings.FRONTEND_URL.rstrip('/')
-    sku = (product.sku_prefix or "QR").upper()
-    import hashlib
+    # Validate quantity (the request holds the connection for the whole run)
+    if quantity < 1 or quantity > settings.QR_INSTANT_PDF_MAX_QUANTITY:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Quantity must be between 1 and {settings.QR_INSTANT_PDF_MAX_QUANTITY}; use a background batch job for larger runs"
+        )
     
-    for i in range(quantity):
-        current_serial = serial_start + i
+    def create_batch():
+        # 1. Reserve the serial range and batch number (atomic per product)
+        serial_start, next_batch_num = reserve_serials(product_id, quantity, batch=True)
         
-        # Security: Create an Opaque Token (looks encrypted) instead of SKU-SERIAL
-        # This makes it impossible for users to guess the next code
-        salt = uuid.uuid4().hex[:8]
-        raw_seed = f"{sku}-{current_serial}-{salt}"
-        unique_validator = hashlib.sha256(raw_seed.encode()).hexdigest()[:12].upper()
-        
-        db_qr = QRCode(
-            product_id=product_id, 
-            batch_id=db_batch.id,
-            code=unique_validator,
-            serial_number=current_serial
+        # 2. Create the Batch record
+        db_batch = QRBatch(
+            product_id=product_id,
+            batch_number=next_batch_num,
+            quantity=quantity,
+            serial_start=serial_start,
+            serial_end=serial_start + quantity - 1
         )
-        db.add(db_qr)
-        generated_qr_objects.append(db_qr)
+        db.add(db_batch)
+        db.flush() # Get batch ID
+        
+        # 3. Generate new codes in DB (opaque random codes/tokens, set-based insert)
+        rows = generate_codes(db, product_id, quantity, batch_id=db_batch.id, serial_start=serial_start)
+        db.commit()
+        return db_batch, rows
     
-    db.commit()
+    # Inserts and commit off the event loop
+    db_batch, rows = await run_in_threadpool(create_batch)
     
-    # 3. Prepare data for PDF
-    # slugify product name for premium URL look
-    product_slug = re.sub(r'[^a-z0-9]+', '-', product.name.lower()).strip('-')
+    from app.services.serial_bitmap import serial_bitmaps
+    serial_bitmaps.mark_issued(product_id, db_batch.serial_start, quantity)
     
-    qr_data = []
-    for qr in generated_qr_objects:
-        # Use link_token for the URL instead of code
-        # URL format: /p/product-slug/link-token
-        masked_url = f"{base_url}/p/{product_slug}/{qr.link_token}"
-        label = f"{sku}-{qr.serial_number:02d}"
-        qr_data.append((qr.link_token, masked_url, label))
+    # 4. Prepare data for PDF (link_token URLs, SKU-serial labels)
+    qr_data = qr_service.label_data(product, [(row['link_token'], row['serial_number']) for row in rows])
     
-    # 4. Generate PDF in memory (RAM)
+    # 5. Generate PDF
     batch_info = {
         "number": db_batch.batch_number,
         "serial_start": db_batch.serial_start,
         "serial_end": db_batch.serial_end
     }
-    pdf_buffer = qr_service.generate_bulk_pdf(qr_data, product.name, batch_info=batch_info)
-    
     filename = f"QR_{quantity}_{product.name.replace(' ', '_')}.pdf"
     
-    return StreamingResponse(
-        pdf_buffer,
-        media_type="application/pdf",
-        headers={
-            "Content-Disposition": f'attachment; filename="{filename}"',
-            "Access-Control-Expose-Headers": "Content-Disposition"
-        }
-    )
+    # Stored in the PDF cache, so re-downloading the batch (qr-pdf?batch_id=) is a file send
+    return await qr_pdf_cache.pdf_response(qr_data, product.name, filename, batch_info=batch_info)
+
+# --- Background QR Batch Jobs ---
+
+@router.post("/products/{product_id}/qr-batch-jobs", status_code=status.HTTP_202_ACCEPTED)
+async def create_qr_batch_job(product_id: int, quantity: int, db: Session = Depends(get_db), is_admin: bool = Depends(verify_admin)):
+    """Queue generation of a QR batch and its label sheet PDF; poll the returned job for progress"""
+    from app.services.qr_batch_jobs import qr_batch_jobs, QRBatchJob
+    from app.config import settings
+    
+    product = db.query(Product).filter(Product.id == product_id).first()
+    if not product:
+        raise HTTPException(status_code=404, detail="Product not found")
+    
+    if quantity < 1 or quantity > settings.QR_BULK_MAX_QUANTITY:
+        raise HTTPException(status_code=400, detail=f"Quantity must be between 1 and {settings.QR_BULK_MAX_QUANTITY}")
+    
+    job = qr_batch_jobs.submit(QRBatchJob(product_id=product_id, quantity=quantity))
+    return job.to_dict()
+
+@router.get("/qr-batch-jobs/{job_id}")
+async def get_qr_batch_job(job_id: str, is_admin: bool = Depends(verify_admin)):
+    """Status and progress (codes inserted, pages rendered) of a QR batch job"""
+    from app.services.qr_batch_jobs import qr_batch_jobs
+    
+    progress = qr_batch_jobs.get(job_id)
+    if not progress:
+        raise HTTPException(status_code=404, detail="QR batch job not found")
+    return progress
+
+@router.get("/qr-batch-jobs/{job_id}/download")
+async def download_qr_batch_job(job_id: str, is_admin: bool = Depends(verify_admin)):
+    """Download the finished label sheet PDF of a QR batch job"""
+    from fastapi.responses import FileResponse
+    from app.services.qr_batch_jobs import qr_batch_jobs
+    
+    progress = qr_batch_jobs.get(job_id)
+    if not progress:
+        raise HTTPException(status_code=404, detail="QR batch job not found")
+    
+    path = qr_batch_jobs.artifact(job_id)
+    if not path:
+        raise HTTPException(status_code=409, detail=f"QR batch job is {progress['status']}, no PDF available")
+    
+    headers = {"Access-Control-Expose-Headers": "Content-Disposition"}
+    return FileResponse(path, media_type="application/pdf", filename=progress["filename"], headers=headers)
+
+@router.post("/qr-batch-jobs/{job_id}/retry")
+async def retry_qr_batch_job(job_id: str, is_admin: bool = Depends(verify_admin)):
+    """Re-run a failed QR batch job (codes already committed are only re-rendered)"""
+    from app.services.qr_batch_jobs import qr_batch_jobs
+    
+    try:
+        job = qr_batch_jobs.retry(job_id)
+    except (FileNotFoundError, ValueError):
+        raise HTTPException(status_code=404, detail="QR batch job not found")
+    return job.to_dict()
 
 @router.get("/companies/{company_id}/batches")
 async def get_company_batches(company_id: int, db: Session = Depends(get_db), is_admin: bool = Depends(verify_admin)):
     """Get all QR generation batches for all products of a company"""
+    from app.services.serial_bitmap import serial_bitmaps
+    
     batches = db.query(QRBatch).join(Product).filter(Product.company_id == company_id).order_by(QRBatch.created_at.desc()).all()
     
     return [
@@ -287,6 +323,7 @@ async def get_company_batches(company_id: int, db: Session = Depends(get_db), is
             "quantity": b.quantity,
             "serial_start": b.serial_start,
             "serial_end": b.serial_end,
+            "usage": serial_bitmaps.usage(b.product_id, b.serial_start, b.serial_end),
             "created_at": b.created_at
         } for b in batches
     ]
@@ -294,6 +331,8 @@ async def get_company_batches(company_id: int, db: Session = Depends(get_db), is
 @router.get("/products/{product_id}/batches")
 async def get_product_batches(product_id: int, db: Session = Depends(get_db), is_admin: bool = Depends(verify_admin)):
     """Get all QR generation batches for a product"""
+    from app.services.serial_bitmap import serial_bitmaps
+    
     batches = db.query(QRBatch).filter(QRBatch.product_id == product_id).order_by(QRBatch.created_at.desc()).all()
     return [
         {
@@ -304,48 +343,124 @@ async def get_product_batches(product_id: int, db: Session = Depends(get_db), is
             "quantity": b.quantity,
             "serial_start": b.serial_start,
             "serial_end": b.serial_end,
+            "usage": serial_bitmaps.usage(b.product_id, b.serial_start, b.serial_end),
             "created_at": b.created_at
         } for b in batches
     ]
 
+@router.get("/products/{product_id}/serial-usage")
+async def get_product_serial_usage(
+    product_id: int,
+    serial_start: Optional[int] = None,
+    serial_end: Optional[int] = None,
+    is_admin: bool = Depends(verify_admin)
+):
+    """Issued/scanned/used counts over a serial range (whole product by default), from the serial bitmaps"""
+    from app.services.serial_bitmap import serial_bitmaps
+    
+    usage = serial_bitmaps.usage(product_id, serial_start, serial_end)
+    if usage is None:
+        raise HTTPException(status_code=503, detail="Serial bitmaps are not available")
+    return {"product_id": product_id, "serial_start": serial_start, "serial_end": serial_end, **usage}
+
+@router.get("/products/{product_id}/serials/{serial_number}")
+async def get_product_serial_state(product_id: int, serial_number: int, is_admin: bool = Depends(verify_admin)):
+    """Issued/scanned/used state of one serial, from the serial bitmaps"""
+    from app.services.serial_bitmap import serial_bitmaps
+    
+    state = serial_bitmaps.lookup(product_id, serial_number)
+    if state is None:
+        raise HTTPException(status_code=503, detail="Serial bitmaps are not available")
+    if not state["issued"]:
+        raise HTTPException(status_code=404, detail="Serial not issued for this product")
+    return {"product_id": product_id, "serial_number": serial_number, **state}
+
+@router.get("/products/{product_id}/scan-events")
+async def get_product_scan_events(
+    product_id: int,
+    days: int = 30,
+    batch_id: Optional[int] = None,
+    db: Session = Depends(get_db),
+    is_admin: bool = Depends(verify_admin)
+):
+    """Scans per day and device class for a product (optionally one batch)"""
+    from datetime import datetime, timedelta
+    from sqlalchemy import func
+    from app.models.qr_scan_event import QRScanEvent
+    
+    since = datetime.utcnow().date() - timedelta(days=max(days, 1) - 1)
+    query = db.query(
+        QRScanEvent.scan_day,
+        QRScanEvent.user_agent_class,
+        func.count(QRScanEvent.id)
+    ).filter(
+        QRScanEvent.scan_day >= since,
+        QRScanEvent.product_id == product_id
+    )
+    if batch_id is not None:
+        query = query.filter(QRScanEvent.batch_id == batch_id)
+    
+    rows = query.group_by(QRScanEvent.scan_day, QRScanEvent.user_agent_class).order_by(QRScanEvent.scan_day).all()
+    
+    by_day = {}
+    for scan_day, user_agent_class, count in rows:
+        day = by_day.setdefault(scan_day.isoformat(), {"day": scan_day.isoformat(), "total": 0, "devices": {}})
+        day["devices"][user_agent_class or "other"] = count
+        day["total"] += count
+    return list(by_day.values())
+
 @router.get("/products/{product_id}/qr-codes", response_model=List[QRCodeResponse])
 async def get_product_qr_codes(product_id: int, db: Session = Depends(get_db), is_admin: bool = Depends(verify_admin)):
     return db.query(QRCode).filter(QRCode.product_id == product_id).all()
 
 @router.get("/products/{product_id}/qr-pdf")
-async def download_qr_pdf(product_id: int, db: Session = Depends(get_db), is_admin: bool = Depends(verify_admin)):
-    """Download existing QR codes as PDF"""
-    from fastapi.responses import StreamingResponse
+async def download_qr_pdf(
+    product_id: int,
+    batch_id: Optional[int] = None,
+    serial_start: Optional[int] = None,
+    serial_end: Optional[int] = None,
+    db: Session = Depends(get_db),
+    is_admin: bool = Depends(verify_admin)
+):
+    """
+    Download existing QR codes as PDF: all of the product's codes, one batch
+    (batch_id) and/or a serial range. Sheets are cached by content, so
+    downloading the same codes again is a file send.
+    """
     from app.services.qr_service import qr_service
-    from app.config import settings
+    from app.services.qr_pdf_cache import qr_pdf_cache
     
     # Get product
     product = db.query(Product).filter(Product.id == product_id).first()
     if not product:
         raise HTTPException(status_code=404, detail="Product not found")
     
-    # Get all QR codes for this product
-    qr_codes = db.query(QRCode).filter(QRCode.product_id == product_id).all()
-    
-    if not qr_codes:
+    if serial_start is not None and serial_end is not None and serial_start > serial_end:
+        raise HTTPException(status_code=400, detail="serial_start must not be greater than serial_end")
+    
+    query = db.query(QRCode.link_token, QRCode.serial_number).filter(QRCode.product_id == product_id)
+    batch_info = None
+    filename = f'qr_codes_{product.name.replace(" ", "_")}.pdf'
+    if batch_id is not None:
+        batch = db.query(QRBatch).filter(QRBatch.id == batch_id, QRBatch.product_id == product_id).first()
+        if not batch:
+            raise HTTPException(status_code=404, detail="Batch not found")
+        query = query.filter(QRCode.batch_id == batch_id)
+        batch_info = {"number": batch.batch_number, "serial_start": batch.serial_start, "serial_end": batch.serial_end}
+        filename = f"QR_{batch.quantity}_{product.name.replace(' ', '_')}.pdf"
+    if serial_start is not None:
+        query = query.filter(QRCode.serial_number >= serial_start)
+    if serial_end is not None:
+        query = query.filter(QRCode.serial_number <= serial_end)
+    if serial_start is not None or serial_end is not None:
+        filename = f'qr_codes_{product.name.replace(" ", "_")}_{serial_start or 1}-{serial_end if serial_end is not None else "end"}.pdf'
+    
+    # Serial order keeps the sheet (and its cache key) stable between downloads
+    rows = query.order_by(QRCode.serial_number.asc()).all()
+    if not rows:
         raise HTTPException(status_code=404, detail="No QR codes found for this product")
     
     # Prepare data for PDF using config URL
-    base_url = settings.FRONTEND_URL.rstrip('/')
-    product_slug = re.sub(r'[^a-z0-9]+', '-', product.name.lower()).strip('-')
-    sku = (product.sku_prefix or "QR").upper()
+    qr_data = qr_service.label_data(product, rows)
     
-    qr_data = []
-    for qr in qr_codes:
-        masked_url = f"{base_url}/p/{product_slug}/{qr.link_token}"
-        label = f"{sku}-{qr.serial_number:02d}"
-        qr_data.append((qr.link_token, masked_url, label))
-    
-    # Generate PDF
-    pdf_buffer = qr_service.generate_bulk_pdf(qr_data, product.name)
-    
-    return StreamingResponse(
-        pdf_buffer,
-        media_type="application/pdf",
-        headers={"Content-Disposition": f'attachment; filename="qr_codes_{product.name.replace(" ", "_")}.pdf"'}
-    )
+    return await qr_pdf_cache.pdf_response(qr_data, product.name, filename, batch_info=batch_info)
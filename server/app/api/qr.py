@@ -1,38 +1,96 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 from datetime import datetime
+from app.config import settings
 from app.database import get_db
 from app.models.qr_code import QRCode
 from app.models.product import Product
 from app.schemas.product import ProductResponse, QRResolutionResponse
+from app.services.qr_cache import qr_cache
+from app.services.link_tokens import token_acceptable
+from app.services.scan_counter import scan_counter
+from app.services.scan_events import scan_event_log
+from app.services.serial_bitmap import serial_bitmaps
 
 router = APIRouter()
 
-@router.get("/{token}", response_model=QRResolutionResponse)
-async def resolve_qr_code(token: str, db: Session = Depends(get_db)):
+def resolve_token(db: Session, token: str):
     """
-    Resolve a unique QR code link token.
-    Increments scan count and returns the associated product + the HIDDEN code.
+    Look up a link token (in-process cache, else one joined read of qr_codes
+    and products) and count the scan. Raises HTTPException for unknown or used codes.
     """
-    qr = db.query(QRCode).filter(QRCode.link_token == token).first()
-    
-    if not qr:
-        raise HTTPException(status_code=404, detail="Invalid QR code")
+    resolution = qr_cache.get(token)
+    if resolution is None:
+        # Cache miss: QR code and product in one round trip
+        row = db.query(QRCode, Product).outerjoin(
+            Product, Product.id == QRCode.product_id
+        ).filter(QRCode.link_token == token).first()
+        
+        if not row:
+            raise HTTPException(status_code=404, detail="Invalid QR code")
+        
+        qr, product = row
+        resolution = qr_cache.put(token, qr, product)
+        # Fresh from the database: bring this process's bitmap up to date
+        serial_bitmaps.mark_used(qr.product_id, qr.serial_number, bool(qr.is_used))
     
-    if qr.is_used:
+    # The bitmap sees claims and rejections made in this process since the snapshot was cached
+    used = serial_bitmaps.is_used(resolution.product_id, resolution.serial_number)
+    is_used = resolution.is_used if used is None else used
+    if is_used:
         raise HTTPException(status_code=400, detail="This QR code has already been used and claimed.")
     
-    # Increment scan count
-    qr.scan_count += 1
-    qr.last_scanned_at = datetime.utcnow()
-    db.commit()
+    if settings.SCAN_COUNTER_MODE == "direct":
+        # Atomic increment; the is_used guard also catches a claim the cache has not seen yet
+        counted = db.query(QRCode).filter(
+            QRCode.link_token == token,
+            QRCode.is_used == False  # noqa: E712
+        ).update({
+            QRCode.scan_count: func.coalesce(QRCode.scan_count, 0) + 1,
+            QRCode.last_scanned_at: datetime.utcnow()
+        }, synchronize_session=False)
+        db.commit()
+        if not counted:
+            qr_cache.invalidate_token(token)
+            serial_bitmaps.mark_used(resolution.product_id, resolution.serial_number)
+            raise HTTPException(status_code=400, detail="This QR code has already been used and claimed.")
+    else:
+        # Buffered, flushed in batches by scan_counter
+        scan_counter.record(resolution.qr_id)
+    serial_bitmaps.mark_scanned(resolution.product_id, resolution.serial_number)
+    
+    return resolution
+
+def acceptable_token(token: str) -> str:
+    """
+    Path dependency declared before get_db: forged, malformed or (when disabled)
+    unsigned tokens are rejected without opening a database session
+    """
+    if not token_acceptable(token):
+        raise HTTPException(status_code=404, detail="Invalid QR code")
+    return token
+
+@router.get("/{token}", response_model=QRResolutionResponse)
+async def resolve_qr_code(request: Request, token: str = Depends(acceptable_token), db: Session = Depends(get_db)):
+    """
+    Resolve a unique QR code link token.
+    Increments scan count and returns the associated product + the HIDDEN code.
+    """
+    resolution = resolve_token(db, token)
+    scan_event_log.record(
+        token,
+        resolution.qr_id,
+        resolution.product_id,
+        resolution.batch_id,
+        request.headers.get("user-agent"),
+        request.client.host if request.client else None
+    )
     
-    # Fetch product
-    product = db.query(Product).filter(Product.id == qr.product_id).first()
-    if not product:
+    if not resolution.product:
         raise HTTPException(status_code=404, detail="Associated product not found")
         
     return {
-        "product": product,
-        "coupon_code": qr.code
+        "product": resolution.product,
+        "coupon_code": resolution.code
     }
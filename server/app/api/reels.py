@@ -34,57 +34,40 @@ async def submit_reel(
 ):
     """Submit a reel for free product"""
     
-    # Create upload directory
-    upload_dir = f"{settings.UPLOAD_DIR}/reels"
-    os.makedirs(upload_dir, exist_ok=True)
-    
-    # Security: Validate file extension and sanitize filename
-    file_extension = os.path.splitext(screenshot.filename)[1].lower()
-    if file_extension not in ['.jpg', '.jpeg', '.png', '.webp']:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Invalid image format. Allowed: .jpg, .jpeg, .png, .webp"
-        )
-    
-    # Generate a completely random, secure filename
-    import uuid
-    safe_filename = f"{uuid.uuid4().hex}_{timestamp}{file_extension}"
-    file_path = f"{upload_dir}/{safe_filename}"
-    
-    # Calculate Image Hash to prevent duplicates
-    import hashlib
-    file_content = screenshot.file.read()
-    screenshot.file.seek(0) # Reset file pointer for saving
-    image_hash = hashlib.sha256(file_content).hexdigest()
+    # Stream the upload to disk (size-capped), hashing it as it is written
+    import time
+    import mimetypes
+    from app.services.upload_service import ingest_upload
+    timestamp = int(time.time())
+    upload = await ingest_upload(screenshot, "reels")
+    file_path = upload.file_path
+    image_hash = upload.sha256
     
     # Check if this exact image has been used before
-    import app.models.reel as reel_model
-    existing_reel = db.query(reel_model.Reel).filter(reel_model.Reel.image_hash == image_hash).first()
+    existing_reel = db.query(Reel).filter(Reel.image_hash == image_hash).first()
     if existing_reel:
+        upload.discard()
         raise HTTPException(
             status_code=400, 
             detail="This proof screenshot has already been used for another claim. Duplicates are not allowed."
         )
-
-    with open(file_path, "wb") as buffer:
-        buffer.write(file_content)
     
-    # Create reel record
-    # 3. Upload to Google Drive (if local save passed)
-    drive_link = file_path # Fallback to local
+    # Near-duplicate check (re-saved / cropped / re-compressed copies of a used proof)
+    from starlette.concurrency import run_in_threadpool
+    from app.services.phash_service import phash_service
     try:
-        from app.services.google_drive_service import google_drive_service
-        drive_filename = f"REEL_{instagram_username.replace('@', '')}_{timestamp}.jpg"
-        print(f"☁️ Uploading Reel Proof to Google Drive: {drive_filename}")
-        uploaded_link = google_drive_service.upload_file(file_path, drive_filename)
-        if uploaded_link:
-            drive_link = uploaded_link
-            # Clean up local file
-            if os.path.exists(file_path):
-                os.remove(file_path)
-    except Exception as drive_err:
-        print(f"⚠️ Google Drive upload failed for reel, keeping local: {str(drive_err)}")
-
+        phash_value = await run_in_threadpool(phash_service.compute, file_path)
+    except Exception:
+        os.remove(file_path)
+        raise HTTPException(status_code=400, detail="Could not read the uploaded image. Please upload a valid screenshot.")
+    near_match = phash_service.find_closest(db, Reel, phash_value)
+    if near_match and phash_service.is_duplicate(near_match[1]):
+        os.remove(file_path)
+        raise HTTPException(
+            status_code=400, 
+            detail="This proof screenshot has already been used for another claim. Duplicates are not allowed."
+        )
+    
     reel = Reel(
         user_id=current_user.id,
         name=name,
@@ -93,15 +76,31 @@ async def submit_reel(
         address=address,
         instagram_handle=instagram_username,
         reel_url=reel_url,
-        brand_tag_proof=drive_link,
+        brand_tag_proof=file_path,  # Switched to the Drive link by the upload outbox
         image_hash=image_hash,
+        **phash_service.columns(phash_value),
         product_name=product_name,
-        status="pending"
+        status="pending",
+        # Farther matches are accepted; reels are admin-reviewed, so leave the reviewer a note
+        admin_notes=phash_service.review_note("reel", *near_match) if near_match else None
     )
     
     db.add(reel)
+    db.flush()
+    
+    # Upload to Google Drive in the background (committed together with the reel)
+    from app.services.drive_outbox import drive_outbox, enqueue_drive_upload
+    enqueue_drive_upload(
+        db,
+        local_path=file_path,
+        file_name=f"REEL_{instagram_username.replace('@', '')}_{timestamp}{upload.extension}",
+        mime_type=mimetypes.guess_type(file_path)[0] or "image/jpeg",
+        target_type="reel",
+        target_id=reel.id
+    )
     db.commit()
     db.refresh(reel)
+    drive_outbox.notify()
     
     # TODO: Send confirmation email
     
@@ -8,7 +8,7 @@ from app.database import get_db
 from app.models.reward import Reward
 from app.models.user import User
 from app.models.qr_code import QRCode
-from app.schemas.reward import RewardResponse
+from app.schemas.reward import RewardResponse, RewardVerificationStatus
 from app.config import settings
 from app.api.auth import get_current_user
 
@@ -47,136 +47,64 @@ async def submit_reward(
     # Get User IP
     client_ip = request.client.host if request and request.client else "unknown"
     
-    # Create upload directory
-    upload_dir = f"{settings.UPLOAD_DIR}/rewards"
-    os.makedirs(upload_dir, exist_ok=True)
+    # Fetch Product Data for AI Context (before touching the upload)
+    qr = db.query(QRCode).filter(QRCode.code == coupon_code.upper()).first()
+    if not qr:
+        raise HTTPException(status_code=404, detail="Invalid coupon code")
     
-    # Security: Validate file extension and sanitize filename
-    file_extension = os.path.splitext(screenshot.filename)[1].lower()
-    if file_extension not in ['.jpg', '.jpeg', '.png', '.webp']:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Invalid image format. Allowed: .jpg, .jpeg, .png, .webp"
-        )
+    if qr.is_used:
+        raise HTTPException(status_code=400, detail="This coupon code has already been claimed")
     
-    # Generate a completely random, secure filename
-    import uuid
-    import time
-    timestamp = int(time.time())
-    safe_filename = f"{uuid.uuid4().hex}_{timestamp}{file_extension}"
-    file_path = f"{upload_dir}/{safe_filename}"
+    product = db.query(Product).filter(Product.id == qr.product_id).first()
+    if not product:
+        raise HTTPException(status_code=404, detail="Product not found")
     
-    # Calculate Image Hash to prevent duplicates
-    import hashlib
-    file_content = screenshot.file.read()
-    screenshot.file.seek(0) # Reset file pointer for saving
-    image_hash = hashlib.sha256(file_content).hexdigest()
+    # Stream the upload to disk (size-capped), hashing it as it is written
+    from app.services.upload_service import ingest_upload
+    upload = await ingest_upload(screenshot, "rewards")
+    file_path = upload.file_path
+    image_hash = upload.sha256
     
     # Check if this exact image has been used before
     existing_reward = db.query(Reward).filter(Reward.image_hash == image_hash).first()
     if existing_reward:
+        upload.discard()
         raise HTTPException(
             status_code=400, 
             detail="This screenshot has already been used for another claim. Duplicates are not allowed."
         )
-
-    with open(file_path, "wb") as buffer:
-        buffer.write(file_content)
-    
-    # Fetch Product Data for AI Context
-    qr = db.query(QRCode).filter(QRCode.code == coupon_code.upper()).first()
-    if not qr:
-        raise HTTPException(status_code=404, detail="Invalid coupon code")
-    
-    if qr.is_used:
-        raise HTTPException(status_code=400, detail="This coupon code has already been claimed")
-    
-    product = db.query(Product).filter(Product.id == qr.product_id).first()
-    if not product:
-        raise HTTPException(status_code=404, detail="Product not found")
-
-    # Autonomous AI Analysis - 2 Step Process
-    ai_verified = False
-    is_auto_approved = False
-    ai_decision_log = ""
-    reward_status = "pending"
     
+    # Normalize: compact WebP for storage/Drive + downscaled JPEG for the AI model
+    from starlette.concurrency import run_in_threadpool
+    from app.services.image_service import image_service
     try:
-        from app.services.ai_service import ai_service
-        
-        target_urls = {
-            "amazon": product.amazon_url,
-            "flipkart": product.flipkart_url,
-            "meesho": product.meesho_url,
-            "myntra": product.myntra_url,
-            "nykaa": product.nykaa_url,
-            "jiomart": product.jiomart_url
-        }
-        
-        print(f"🤖 Starting 2-Step AI Verification for: {product.name}")
-        ai_result = ai_service.autonomous_verification(
-            file_path, 
-            product.name, 
-            target_urls
-        )
-        
-        ai_verified = True
-        detected_rating = ai_result.get('detected_rating', 0)
-        
-        # STEP 1: Check for 5-star rating (MANDATORY)
-        if detected_rating != 5:
-            # Delete uploaded file
-            os.remove(file_path)
-            
-            print(f"❌ REJECTED: Only 5-star reviews are eligible. Detected: {detected_rating} stars")
-            raise HTTPException(
-                status_code=400,
-                detail=f"केवल 5-स्टार रिव्यू के लिए कैशबैक मिलेगा। आपका रिव्यू: {detected_rating} स्टार। कृपया 5-स्टार रिव्यू का सही स्क्रीनशॉट अपलोड करें।"
-            )
-        
-        print(f"✅ Step 1 Passed: 5-Star Review Detected")
-        
-        # STEP 2: Platform Match Check
-        ai_decision_log = ai_result.get('decision_reasoning', 'No reasoning provided')
-        
-        if ai_result.get('auto_approve', False):
-            # AI found the review on platform with high confidence
-            print("✅ Step 2 Passed: Review FOUND on Platform → AUTO-APPROVED")
-            reward_status = "approved"
-            is_auto_approved = True
-            ai_decision_log = f"✅ Auto-Approved: {ai_decision_log}"
-        else:
-            # AI couldn't confirm platform match - needs manual verification
-            print(f"🔄 Step 2 Failed: Review NOT FOUND on Platform → PENDING for Admin Review")
-            print(f"   Reasoning: {ai_decision_log}")
-            reward_status = "pending"
-            ai_decision_log = f"⚠️ Manual Review Required: {ai_decision_log}"
-            
-    except HTTPException:
-        # Re-raise validation errors (like non-5-star)
-        raise
+        file_path, _ = await run_in_threadpool(image_service.normalize, file_path)
     except Exception as e:
-        print(f"❌ AI Verification System Error: {str(e)}")
-        ai_decision_log = f"System Error: {str(e)}"
-        # On error, keep as pending for manual review
-
-    # Create reward record
-    # 4. Upload to Google Drive (if local save and AI check passed)
-    drive_link = f"/{file_path}" # Fallback to local
-    try:
-        from app.services.google_drive_service import google_drive_service
-        drive_filename = f"{name.replace(' ', '_')}_{coupon_code.upper()}.jpg"
-        print(f"☁️ Uploading to Google Drive: {drive_filename}")
-        uploaded_link = google_drive_service.upload_file(file_path, drive_filename)
-        if uploaded_link:
-            drive_link = uploaded_link
-            # IMPORTANT: Delete local file after successful drive upload
-            if os.path.exists(file_path):
-                os.remove(file_path)
-                print(f"🗑️ Local file deleted: {file_path}")
-    except Exception as drive_err:
-        print(f"⚠️ Google Drive upload failed, keeping local: {str(drive_err)}")
-
+        if os.path.exists(file_path):
+            os.remove(file_path)
+        print(f"❌ Screenshot normalization failed: {str(e)}")
+        raise HTTPException(status_code=400, detail="Could not read the uploaded image. Please upload a valid screenshot.")
+    
+    # Near-duplicate check (re-saved / cropped / re-compressed copies of a used screenshot)
+    from app.services.phash_service import phash_service
+    phash_value = await run_in_threadpool(phash_service.compute, file_path)
+    # Rejected claims free their QR for a retry, usually with a fixed screenshot of the same review
+    near_match = phash_service.find_closest(db, Reward, phash_value, filters=(Reward.status != "rejected",))
+    if near_match and phash_service.is_duplicate(near_match[1]):
+        for path in (file_path, image_service.ai_variant_path(file_path)):
+            if os.path.exists(path):
+                os.remove(path)
+        raise HTTPException(
+            status_code=400,
+            detail="This screenshot has already been used for another claim. Duplicates are not allowed."
+        )
+    
+    # A more distant match is accepted but held for admin review (the worker never auto-approves it)
+    review_note = None
+    if near_match:
+        review_note = f"⚠️ Manual Review Required: {phash_service.review_note('claim', *near_match)}"
+        print(f"⚠️ Near-duplicate screenshot: {review_note}")
+    
     reward = Reward(
         user_id=current_user.id,
         name=name,
@@ -185,21 +113,18 @@ async def submit_reward(
         address="N/A",
         product_name=product.name,
         purchase_date=datetime.now(),
-        review_screenshot=drive_link,
+        review_screenshot=f"/{file_path}",  # Moved to Google Drive by the verification worker
         platform_name=platform,
         coupon_code=coupon_code.upper(),
         upi_id=upi_id,
         payment_amount=product.cashback_amount or 100.0,
-        status=reward_status,
+        status="pending",
         image_hash=image_hash,
+        **phash_service.columns(phash_value),
         user_ip=client_ip,
-        # AI Fields
-        ai_verified=ai_verified,
-        is_auto_approved=is_auto_approved,
-        ai_decision_log=ai_decision_log,
-        detected_rating=ai_result.get('detected_rating') if 'ai_result' in locals() else None,
-        ai_confidence=ai_result.get('confidence_score') if 'ai_result' in locals() else None,
-        ai_analysis_status="success" if ai_verified else "failed"
+        # AI verification runs in the background worker pool
+        ai_analysis_status="queued",
+        ai_decision_log=review_note
     )
     
     # Mark QR code as used
@@ -211,6 +136,16 @@ async def submit_reward(
     db.commit()
     db.refresh(reward)
     
+    from app.services.qr_cache import qr_cache
+    from app.services.serial_bitmap import serial_bitmaps
+    qr_cache.invalidate_code(qr.code)
+    serial_bitmaps.mark_used(qr.product_id, qr.serial_number)
+    
+    # Autonomous AI Analysis - 2 Step Process (status, is_auto_approved and
+    # ai_decision_log are updated by the worker; poll /{reward_id}/verification)
+    from app.services.verification_worker import verification_worker
+    verification_worker.enqueue(reward.id)
+    
     return RewardResponse.model_validate(reward)
 
 @router.get("/my-claims", response_model=List[RewardResponse])
@@ -238,3 +173,31 @@ async def get_reward(
         raise HTTPException(status_code=404, detail="Reward not found")
     
     return RewardResponse.model_validate(reward)
+
+@router.get("/{reward_id}/verification", response_model=RewardVerificationStatus)
+async def get_reward_verification(
+    reward_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Poll the background AI verification progress of a reward claim"""
+    from app.services.verification_worker import verification_worker
+    
+    reward = db.query(Reward).filter(
+        Reward.id == reward_id,
+        Reward.user_id == current_user.id
+    ).first()
+    
+    if not reward:
+        raise HTTPException(status_code=404, detail="Reward not found")
+    
+    return RewardVerificationStatus(
+        reward_id=reward.id,
+        status=reward.status,
+        ai_analysis_status=reward.ai_analysis_status,
+        is_auto_approved=reward.is_auto_approved,
+        ai_decision_log=reward.ai_decision_log,
+        detected_rating=reward.detected_rating,
+        rejection_reason=reward.rejection_reason,
+        queue=verification_worker.stats()
+    )
@@ -10,6 +10,7 @@ class Settings(BaseModel):
     # Database
     DATABASE_URL: str = os.getenv("DATABASE_URL", "sqlite:///./purna_gummies.db")
     ENVIRONMENT: str = os.getenv("ENVIRONMENT", "development") # development or production
+    DB_CREATE_TABLES: bool = os.getenv("DB_CREATE_TABLES", "true").lower() == "true"  # create_all at startup; disable when alembic manages the schema
     
     # JWT
     SECRET_KEY: str = os.getenv("SECRET_KEY", "your-secret-key-change-in-production")
@@ -47,6 +48,14 @@ class Settings(BaseModel):
     MAX_FILE_SIZE: int = 5242880  # 5MB
     UPLOAD_DIR: str = "uploads"
     
+    # Screenshot Normalization (long-edge caps in pixels)
+    AI_IMAGE_MAX_EDGE: int = int(os.getenv("AI_IMAGE_MAX_EDGE", "1600"))
+    AI_IMAGE_QUALITY: int = int(os.getenv("AI_IMAGE_QUALITY", "85"))
+    ARCHIVE_IMAGE_MAX_EDGE: int = int(os.getenv("ARCHIVE_IMAGE_MAX_EDGE", "2400"))
+    ARCHIVE_IMAGE_QUALITY: int = int(os.getenv("ARCHIVE_IMAGE_QUALITY", "80"))
+    PHASH_MAX_DISTANCE: int = int(os.getenv("PHASH_MAX_DISTANCE", "1"))  # Hamming bits; closer screenshots are rejected as duplicates
+    PHASH_REVIEW_DISTANCE: int = int(os.getenv("PHASH_REVIEW_DISTANCE", "3"))  # up to this (max 3) accepted but held for admin review
+    
     # Google API Keys
     GEMINI_API_KEY: Optional[str] = os.getenv("GEMINI_API_KEY")
     OPENAI_API_KEY: Optional[str] = os.getenv("OPENAI_API_KEY")
@@ -56,5 +65,96 @@ class Settings(BaseModel):
     GOOGLE_DRIVE_CLIENT_ID: Optional[str] = os.getenv("DRIVE_CLIENT_ID")
     GOOGLE_DRIVE_CLIENT_SECRET: Optional[str] = os.getenv("DRIVE_CLIENT_SECRET")
     GOOGLE_DRIVE_REFRESH_TOKEN: Optional[str] = os.getenv("GOOGLE_DRIVE_REFRESH_TOKEN")
+    
+    # Google Drive Upload Mode
+    DRIVE_MULTIPART_THRESHOLD: int = int(os.getenv("DRIVE_MULTIPART_THRESHOLD", "5242880"))  # bytes; larger files use resumable upload
+    DRIVE_FOLDER_SHARING: bool = os.getenv("DRIVE_FOLDER_SHARING", "true").lower() == "true"  # public via folder, not per file
+    
+    # Google Drive Upload Outbox
+    DRIVE_OUTBOX_WORKERS: int = int(os.getenv("DRIVE_OUTBOX_WORKERS", "2"))
+    DRIVE_OUTBOX_BATCH_SIZE: int = int(os.getenv("DRIVE_OUTBOX_BATCH_SIZE", "10"))
+    DRIVE_OUTBOX_MAX_ATTEMPTS: int = int(os.getenv("DRIVE_OUTBOX_MAX_ATTEMPTS", "8"))
+    DRIVE_OUTBOX_BASE_DELAY: int = int(os.getenv("DRIVE_OUTBOX_BASE_DELAY", "5"))  # seconds, doubled per attempt
+    DRIVE_OUTBOX_MAX_DELAY: int = int(os.getenv("DRIVE_OUTBOX_MAX_DELAY", "3600"))
+    
+    # Background AI Verification
+    AI_VERIFICATION_WORKERS: int = int(os.getenv("AI_VERIFICATION_WORKERS", "4"))
+    AI_RATE_LIMIT_RPM: int = int(os.getenv("AI_RATE_LIMIT_RPM", "60"))  # OpenAI requests per minute for bulk re-runs
+    REVERIFY_CONCURRENCY: int = int(os.getenv("REVERIFY_CONCURRENCY", "4"))
+    JOBS_DIR: str = os.getenv("JOBS_DIR", "jobs")  # Checkpoints and artifacts of long-running jobs
+    QR_BATCH_JOB_WORKERS: int = int(os.getenv("QR_BATCH_JOB_WORKERS", "2"))  # concurrent QR batch generate + render jobs
+    QR_BATCH_JOB_RETENTION_DAYS: int = int(os.getenv("QR_BATCH_JOB_RETENTION_DAYS", "7"))  # then checkpoint + PDF are deleted
+    
+    # AI Result Cache
+    AI_CACHE_ENABLED: bool = os.getenv("AI_CACHE_ENABLED", "true").lower() == "true"
+    AI_CACHE_TTL_HOURS: int = int(os.getenv("AI_CACHE_TTL_HOURS", "168"))  # 7 days
+    AI_CACHE_MAX_ENTRIES: int = int(os.getenv("AI_CACHE_MAX_ENTRIES", "50000"))
+    
+    # Bulk QR Generation
+    LINK_TOKEN_KEY: Optional[str] = os.getenv("LINK_TOKEN_KEY")  # Feistel key for link tokens; required outside development, never change once codes are printed
+    QR_SIGNED_TOKENS: bool = os.getenv("QR_SIGNED_TOKENS", "true").lower() == "true"  # append a MAC to new link tokens
+    QR_TOKEN_SIGNING_KEY: Optional[str] = os.getenv("QR_TOKEN_SIGNING_KEY")  # required outside development, never change once signed codes are printed
+    QR_ACCEPT_UNSIGNED_TOKENS: bool = os.getenv("QR_ACCEPT_UNSIGNED_TOKENS", "true").lower() == "true"  # legacy labels
+    QR_BULK_MAX_QUANTITY: int = int(os.getenv("QR_BULK_MAX_QUANTITY", "200000"))
+    QR_INSTANT_PDF_MAX_QUANTITY: int = int(os.getenv("QR_INSTANT_PDF_MAX_QUANTITY", "5000"))  # generate-pdf-batch; larger runs go through qr-batch-jobs
+    QR_GENERATION_CHUNK_SIZE: int = int(os.getenv("QR_GENERATION_CHUNK_SIZE", "5000"))  # rows per INSERT / IN-list size
+    
+    # QR Label Sheet PDFs
+    QR_PDF_PAGES_PER_CHUNK: int = int(os.getenv("QR_PDF_PAGES_PER_CHUNK", "4"))  # pages per streamed chunk
+    QR_PDF_SPOOL_THRESHOLD: int = int(os.getenv("QR_PDF_SPOOL_THRESHOLD", "10000"))  # labels; larger sheets go to a temp file
+    QR_PDF_SPOOL_DIR: Optional[str] = os.getenv("QR_PDF_SPOOL_DIR")  # default: system temp dir
+    QR_PDF_RENDER_MODE: str = os.getenv("QR_PDF_RENDER_MODE", "image")  # image (1-bit bitmap, smallest) or vector (module rectangles + shared pattern forms)
+    QR_RENDER_WORKERS: int = int(os.getenv("QR_RENDER_WORKERS", str(os.cpu_count() or 1)))  # processes encoding QR codes
+    QR_RENDER_PARALLEL_MIN: int = int(os.getenv("QR_RENDER_PARALLEL_MIN", "48"))  # smaller batches are encoded inline
+    
+    # QR Label Sheet PDF Cache (disk, shared by workers)
+    QR_PDF_CACHE_ENABLED: bool = os.getenv("QR_PDF_CACHE_ENABLED", "true").lower() == "true"
+    QR_PDF_CACHE_DIR: str = os.getenv("QR_PDF_CACHE_DIR", "cache/qr_pdfs")
+    QR_PDF_CACHE_MAX_BYTES: int = int(os.getenv("QR_PDF_CACHE_MAX_BYTES", str(2 * 1024 * 1024 * 1024)))  # finished sheets
+    QR_PDF_PAGE_CACHE_MAX_BYTES: int = int(os.getenv("QR_PDF_PAGE_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))  # encoded QR images, per page
+    
+    # QR PNG Image Cache (disk, shared by workers)
+    QR_IMAGE_CACHE_ENABLED: bool = os.getenv("QR_IMAGE_CACHE_ENABLED", "true").lower() == "true"
+    QR_IMAGE_CACHE_DIR: str = os.getenv("QR_IMAGE_CACHE_DIR", "cache/qr_images")
+    QR_IMAGE_CACHE_MAX_BYTES: int = int(os.getenv("QR_IMAGE_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+    QR_IMAGE_ERROR_CORRECTION: str = os.getenv("QR_IMAGE_ERROR_CORRECTION", "H")  # L, M, Q or H
+    QR_IMAGE_MIN_SIZE: int = int(os.getenv("QR_IMAGE_MIN_SIZE", "64"))  # pixels
+    QR_IMAGE_MAX_SIZE: int = int(os.getenv("QR_IMAGE_MAX_SIZE", "2048"))
+    QR_IMAGE_MAX_AGE: int = int(os.getenv("QR_IMAGE_MAX_AGE", "86400"))  # browser Cache-Control max-age, seconds
+    
+    # QR Link-Token Resolution Cache (per process)
+    QR_CACHE_ENABLED: bool = os.getenv("QR_CACHE_ENABLED", "true").lower() == "true"
+    QR_CACHE_TTL_SECONDS: int = int(os.getenv("QR_CACHE_TTL_SECONDS", "60"))
+    QR_CACHE_MAX_ENTRIES: int = int(os.getenv("QR_CACHE_MAX_ENTRIES", "10000"))
+    
+    # QR Serial Bitmaps (issued/scanned/used per product, per process)
+    SERIAL_BITMAP_ENABLED: bool = os.getenv("SERIAL_BITMAP_ENABLED", "true").lower() == "true"
+    SERIAL_BITMAP_REFRESH_SECONDS: float = float(os.getenv("SERIAL_BITMAP_REFRESH_SECONDS", "300"))  # full rebuild from the database (other workers' changes)
+    
+    # QR Scan Counters: "buffered" (write-behind batches) or "direct" (one atomic UPDATE per scan)
+    SCAN_COUNTER_MODE: str = os.getenv("SCAN_COUNTER_MODE", "buffered")
+    SCAN_FLUSH_INTERVAL: float = float(os.getenv("SCAN_FLUSH_INTERVAL", "2"))  # seconds
+    SCAN_FLUSH_BATCH_SIZE: int = int(os.getenv("SCAN_FLUSH_BATCH_SIZE", "500"))  # codes per UPDATE; also flushes early
+    
+    # QR Scan Event Log
+    SCAN_EVENTS_ENABLED: bool = os.getenv("SCAN_EVENTS_ENABLED", "true").lower() == "true"
+    SCAN_EVENT_BUFFER_SIZE: int = int(os.getenv("SCAN_EVENT_BUFFER_SIZE", "100000"))  # ring buffer; oldest dropped when full
+    SCAN_EVENT_BATCH_SIZE: int = int(os.getenv("SCAN_EVENT_BATCH_SIZE", "1000"))  # rows per bulk INSERT
+    SCAN_EVENT_FLUSH_INTERVAL: float = float(os.getenv("SCAN_EVENT_FLUSH_INTERVAL", "2"))  # seconds
+    SCAN_EVENT_RETENTION_DAYS: int = int(os.getenv("SCAN_EVENT_RETENTION_DAYS", "365"))  # 0 keeps events forever
+    
+    # External Backends: "openai"/"google"/"smtp" for real services, "fake" for offline load tests
+    AI_BACKEND: str = os.getenv("AI_BACKEND", "openai")
+    DRIVE_BACKEND: str = os.getenv("DRIVE_BACKEND", "google")
+    EMAIL_BACKEND: str = os.getenv("EMAIL_BACKEND", "smtp")
+    
+    # Fake Backend Behaviour (latency spec: fixed:ms | uniform:lo:hi | normal:mean:sd | lognormal:median:sigma)
+    FAKE_AI_LATENCY: str = os.getenv("FAKE_AI_LATENCY", "lognormal:1500:0.4")
+    FAKE_AI_ERROR_RATE: float = float(os.getenv("FAKE_AI_ERROR_RATE", "0"))
+    FAKE_AI_VERDICTS: str = os.getenv("FAKE_AI_VERDICTS", "five_star_auto_approve")  # e.g. five_star_auto_approve:0.7,three_star:0.2,parse_failure:0.1
+    FAKE_DRIVE_LATENCY: str = os.getenv("FAKE_DRIVE_LATENCY", "normal:400:100")
+    FAKE_DRIVE_ERROR_RATE: float = float(os.getenv("FAKE_DRIVE_ERROR_RATE", "0"))
+    FAKE_SMTP_LATENCY: str = os.getenv("FAKE_SMTP_LATENCY", "normal:300:50")
+    FAKE_SMTP_ERROR_RATE: float = float(os.getenv("FAKE_SMTP_ERROR_RATE", "0"))
 
 settings = Settings()
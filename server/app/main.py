@@ -1,20 +1,18 @@
-from fastapi import FastAPI
-from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
-import os
+from app import startup_report
+from app.startup_report import timed
 
-# Import routers (will create these next)
-# from app.api import auth, user, admin, admin_auth, rewards, reels, videos, products, qr, admin_products
+with timed("import", "fastapi"):
+    from fastapi import FastAPI, Request
+    from fastapi.responses import JSONResponse
+    from fastapi.middleware.cors import CORSMiddleware
+    from fastapi.staticfiles import StaticFiles
+import os
+import importlib
 
-from app.database import engine, Base
+with timed("import", "app.database"):
+    from app.database import engine, Base
 from app.config import settings
 
-# Import all models so SQLAlchemy knows about them
-from app.models import user, coupon, reward, reel
-
-# Create database tables
-Base.metadata.create_all(bind=engine)
-
 # Create uploads directory if it doesn't exist
 os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
 
@@ -27,6 +25,15 @@ app = FastAPI(
     redoc_url="/redoc" if settings.ENVIRONMENT == "development" else None
 )
 
+# Refuse oversized uploads from their Content-Length before the body is spooled
+# (registered before CORS so the 413 still carries CORS headers)
+@app.middleware("http")
+async def reject_oversized_uploads(request: Request, call_next):
+    from app.services.upload_service import declared_too_large, too_large_detail
+    if declared_too_large(request):
+        return JSONResponse(status_code=413, content={"detail": too_large_detail()})
+    return await call_next(request)
+
 # CORS Middleware configuration
 if settings.ENVIRONMENT == "development":
     # Permissive for local development across various ports/IPs
@@ -51,8 +58,21 @@ else:
 # Mount static files for uploads
 app.mount("/uploads", StaticFiles(directory=settings.UPLOAD_DIR), name="uploads")
 
-# Include API routers
-from app.api import auth, user, admin, admin_auth, rewards, reels, videos, products, qr, admin_products
+# Include API routers (timed individually for the startup report)
+def _import_router(name):
+    with timed("import", f"app.api.{name}"):
+        return importlib.import_module(f"app.api.{name}")
+
+auth = _import_router("auth")
+user = _import_router("user")
+admin = _import_router("admin")
+admin_auth = _import_router("admin_auth")
+rewards = _import_router("rewards")
+reels = _import_router("reels")
+videos = _import_router("videos")
+products = _import_router("products")
+qr = _import_router("qr")
+admin_products = _import_router("admin_products")
 
 # Include routers
 app.include_router(auth.router, prefix="/api/auth", tags=["auth"])
@@ -66,6 +86,53 @@ app.include_router(products.router, prefix="/api/products", tags=["products"])
 app.include_router(qr.router, prefix="/api/qr", tags=["qr"])
 app.include_router(admin_products.router, prefix="/api/admin/catalog", tags=["admin-catalog"])
 
+@app.on_event("startup")
+async def start_background_workers():
+    if settings.DB_CREATE_TABLES:
+        # Import all models so SQLAlchemy knows about them
+        from app import models  # noqa: F401
+        with timed("startup", "create_all"):
+            Base.metadata.create_all(bind=engine)
+
+    with timed("startup", "verification_worker"):
+        from app.services.verification_worker import verification_worker
+        verification_worker.start()
+    with timed("startup", "drive_outbox"):
+        from app.services.drive_outbox import drive_outbox
+        drive_outbox.start()
+    with timed("startup", "scan_counter"):
+        from app.services.scan_counter import scan_counter
+        scan_counter.start()
+    with timed("startup", "scan_event_log"):
+        from app.services.scan_events import scan_event_log
+        scan_event_log.start()
+    with timed("startup", "serial_bitmaps"):
+        from app.services.serial_bitmap import serial_bitmaps
+        serial_bitmaps.start()
+    with timed("startup", "qr_batch_jobs"):
+        from app.services.qr_batch_jobs import qr_batch_jobs
+        qr_batch_jobs.recover()
+
+    # OpenAI / Google Drive clients are built on first use (see app.services.lazy)
+    startup_report.print_report()
+
+@app.on_event("shutdown")
+async def stop_background_workers():
+    from app.services.verification_worker import verification_worker
+    from app.services.drive_outbox import drive_outbox
+    from app.services.scan_counter import scan_counter
+    from app.services.scan_events import scan_event_log
+    from app.services.qr_service import qr_service
+    from app.services.qr_batch_jobs import qr_batch_jobs
+    from app.services.serial_bitmap import serial_bitmaps
+    verification_worker.stop()
+    drive_outbox.stop()
+    scan_counter.stop()
+    scan_event_log.stop()
+    qr_service.shutdown()
+    qr_batch_jobs.shutdown()
+    serial_bitmaps.stop()
+
 @app.get("/")
 async def root():
     return {
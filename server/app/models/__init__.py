@@ -6,5 +6,10 @@ from app.models.company import Company
 from app.models.product import Product
 from app.models.qr_code import QRCode
 from app.models.qr_batch import QRBatch
+from app.models.ai_result_cache import AIResultCache
+from app.models.drive_upload import DriveUpload
+from app.models.qr_scan_event import QRScanEvent
+from app.models.product_serial_counter import ProductSerialCounter
+from app.models.id_sequence import IdSequence
 
-__all__ = ["User", "Coupon", "Reward", "Reel", "Company", "Product", "QRCode", "QRBatch"]
+__all__ = ["User", "Coupon", "Reward", "Reel", "Company", "Product", "QRCode", "QRBatch", "AIResultCache", "DriveUpload", "QRScanEvent", "ProductSerialCounter", "IdSequence"]
@@ -0,0 +1,28 @@
+from sqlalchemy import Column, Integer, String, DateTime, JSON, UniqueConstraint
+from datetime import datetime
+from app.database import Base
+
+class AIResultCache(Base):
+    __tablename__ = "ai_result_cache"
+    __table_args__ = (
+        UniqueConstraint("image_hash", "product_id", "prompt_version", name="uq_ai_result_cache_key"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    
+    # Cache key
+    image_hash = Column(String(64), nullable=False, index=True)  # SHA256 of the screenshot
+    product_id = Column(Integer, nullable=False, default=0)  # 0 when the prompt has no product context
+    prompt_version = Column(String(50), nullable=False)  # e.g. autonomous-v1, screenshot-v1
+    
+    # Cached AI verdict
+    result_json = Column(JSON, nullable=False)
+    hit_count = Column(Integer, default=0)
+    
+    # Expiry / eviction
+    created_at = Column(DateTime, default=datetime.utcnow)
+    last_hit_at = Column(DateTime, default=datetime.utcnow, index=True)
+    expires_at = Column(DateTime, nullable=False, index=True)
+
+    def __repr__(self):
+        return f"<AIResultCache {self.image_hash[:8]} product={self.product_id} {self.prompt_version}>"
@@ -0,0 +1,32 @@
+from sqlalchemy import Column, Integer, String, DateTime, Text
+from datetime import datetime
+from app.database import Base
+
+class DriveUpload(Base):
+    """Outbox row for a pending Google Drive upload"""
+    __tablename__ = "drive_uploads"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    
+    # File to upload
+    local_path = Column(String(500), nullable=False)
+    file_name = Column(String(255), nullable=False)
+    mime_type = Column(String(50), nullable=False, default="image/jpeg")
+    
+    # Row whose screenshot column receives the Drive link
+    target_type = Column(String(20), nullable=False)  # reward, reel
+    target_id = Column(Integer, nullable=False)
+    
+    # Delivery state
+    status = Column(String(20), default="pending", index=True)  # pending, in_progress, done, dead
+    attempts = Column(Integer, default=0)
+    next_attempt_at = Column(DateTime, default=datetime.utcnow, index=True)
+    last_error = Column(Text, nullable=True)
+    drive_file_id = Column(String(100), nullable=True)  # set once the file exists on Drive; retries only re-publish it
+    drive_url = Column(String(500), nullable=True)
+    
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<DriveUpload {self.id} {self.target_type}#{self.target_id} - {self.status}>"
@@ -0,0 +1,22 @@
+from sqlalchemy import Column, String, BigInteger, DDL, event
+from app.database import Base
+
+class IdSequence(Base):
+    """
+    Named counters handed out in ranges (e.g. the link_token sequence).
+    Values are reserved with an in-place increment, never reused.
+    """
+    __tablename__ = "id_sequences"
+    
+    name = Column(String(50), primary_key=True)
+    next_value = Column(BigInteger, nullable=False, default=1)
+
+    def __repr__(self):
+        return f"<IdSequence {self.name} - next {self.next_value}>"
+
+# Seed the known sequences whenever the table is created outside of migrations (create_all)
+event.listen(
+    IdSequence.__table__,
+    "after_create",
+    DDL("INSERT INTO id_sequences (name, next_value) VALUES ('link_token', 1)")
+)
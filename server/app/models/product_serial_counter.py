@@ -0,0 +1,18 @@
+from sqlalchemy import Column, Integer, DateTime, ForeignKey
+from datetime import datetime
+from app.database import Base
+
+class ProductSerialCounter(Base):
+    """
+    Next free QR serial and batch number per product. Ranges are reserved by
+    incrementing this row, so allocation never scans qr_codes or qr_batches.
+    """
+    __tablename__ = "product_serial_counters"
+    
+    product_id = Column(Integer, ForeignKey("products.id"), primary_key=True)
+    next_serial = Column(Integer, nullable=False, default=1)
+    next_batch_number = Column(Integer, nullable=False, default=1)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<ProductSerialCounter Product {self.product_id} - serial {self.next_serial}, batch {self.next_batch_number}>"
@@ -17,6 +17,9 @@ class QRBatch(Base):
     serial_start = Column(Integer, nullable=True)
     serial_end = Column(Integer, nullable=True)
     
+    # Background job that created the batch (lets a retried job find its committed codes)
+    job_id = Column(String(32), nullable=True, unique=True, index=True)
+    
     # Metadata
     created_at = Column(DateTime, default=datetime.utcnow)
     
@@ -2,7 +2,13 @@ from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, JSON, Bool
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.database import Base
-import uuid
+
+
+def _default_link_token(context):
+    """Allocate from the link_token sequence (its own short transaction)"""
+    from app.services.link_tokens import allocate_link_tokens
+    return allocate_link_tokens(1, context.connection)[0]
+
 
 class QRCode(Base):
     __tablename__ = "qr_codes"
@@ -15,7 +21,7 @@ class QRCode(Base):
     code = Column(String(50), unique=True, index=True)
     
     # Public Link Token (Shown in URL, maps to the code)
-    link_token = Column(String(50), unique=True, index=True, default=lambda: uuid.uuid4().hex[:12])
+    link_token = Column(String(50), unique=True, index=True, default=_default_link_token)
     
     serial_number = Column(Integer, nullable=True) # Serial within the product
     
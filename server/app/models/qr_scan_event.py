@@ -0,0 +1,34 @@
+from sqlalchemy import Column, Integer, String, DateTime, Date, Index
+from datetime import datetime
+from app.database import Base
+
+class QRScanEvent(Base):
+    """
+    Append-only log of QR scans. Rows are bucketed by scan_day and every
+    secondary index leads with it, so time-range queries and retention
+    deletes only touch the days involved.
+    """
+    __tablename__ = "qr_scan_events"
+    
+    id = Column(Integer, primary_key=True)
+    scan_day = Column(Date, nullable=False)
+    scanned_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    
+    # Scanned code (no foreign keys: inserts stay cheap and old days can be dropped freely)
+    link_token = Column(String(50), nullable=False)
+    qr_code_id = Column(Integer, nullable=False)
+    product_id = Column(Integer, nullable=True)
+    batch_id = Column(Integer, nullable=True)
+    
+    # Coarse client info, no raw user agent or full IP is stored
+    user_agent_class = Column(String(20), nullable=True)  # android, ios, desktop, bot, other
+    ip_prefix = Column(String(50), nullable=True)  # /24 for IPv4, /48 for IPv6
+    
+    __table_args__ = (
+        Index("ix_qr_scan_events_day_batch", "scan_day", "batch_id"),
+        Index("ix_qr_scan_events_day_product", "scan_day", "product_id"),
+        Index("ix_qr_scan_events_day_code", "scan_day", "qr_code_id"),
+    )
+
+    def __repr__(self):
+        return f"<QRScanEvent {self.link_token} @ {self.scanned_at}>"
@@ -20,6 +20,12 @@ class Reel(Base):
     reel_url = Column(String(500), nullable=False)
     brand_tag_proof = Column(String(500), nullable=False)  # Screenshot path
     image_hash = Column(String(64), unique=True, index=True, nullable=True)  # To prevent duplicates
+    # Perceptual hash (dHash) for near-duplicates; split into 16-bit chunks for indexed lookup
+    phash = Column(String(16), nullable=True)
+    phash_0 = Column(Integer, index=True, nullable=True)
+    phash_1 = Column(Integer, index=True, nullable=True)
+    phash_2 = Column(Integer, index=True, nullable=True)
+    phash_3 = Column(Integer, index=True, nullable=True)
 
     
     # Status
@@ -23,6 +23,12 @@ class Reward(Base):
     coupon_code = Column(String(50), nullable=True, index=True) # Linked QR code
     screenshot_quality = Column(String(20), nullable=True)  # AI analysis: excellent, good, fair, poor
     image_hash = Column(String(64), unique=True, index=True, nullable=True)  # To prevent duplicates
+    # Perceptual hash (dHash) for near-duplicates; split into 16-bit chunks for indexed lookup
+    phash = Column(String(16), nullable=True)
+    phash_0 = Column(Integer, index=True, nullable=True)
+    phash_1 = Column(Integer, index=True, nullable=True)
+    phash_2 = Column(Integer, index=True, nullable=True)
+    phash_3 = Column(Integer, index=True, nullable=True)
     user_ip = Column(String(45), nullable=True)  # To track fraud from same device/network
 
 
@@ -36,7 +42,7 @@ class Reward(Base):
     detected_rating = Column(Integer, nullable=True)  # Star rating detected by AI (1-5)
     detected_comment = Column(Text, nullable=True)  # Review comment extracted by AI
     ai_confidence = Column(Float, nullable=True)  # AI confidence score (0.0-1.0)
-    ai_analysis_status = Column(String(50), default="pending")  # pending, success, failed
+    ai_analysis_status = Column(String(50), default="pending")  # queued, processing, success, failed
     ai_decision_log = Column(Text, nullable=True)  # Detailed AI reasoning
     is_auto_approved = Column(Boolean, default=False)  # Flag for autonomous approval
     
@@ -47,6 +47,17 @@ class RewardResponse(BaseModel):
     class Config:
         from_attributes = True
 
+# Background AI Verification Progress
+class RewardVerificationStatus(BaseModel):
+    reward_id: int
+    status: str
+    ai_analysis_status: Optional[str] = None  # queued, processing, success, failed
+    is_auto_approved: bool = False
+    ai_decision_log: Optional[str] = None
+    detected_rating: Optional[int] = None
+    rejection_reason: Optional[str] = None
+    queue: Optional[dict] = None  # Worker pool depth (queued / processing)
+
 # Reward Update (Admin)
 class RewardUpdateRequest(BaseModel):
     status: str  # pending, approved, rejected, paid
@@ -0,0 +1,127 @@
+"""
+AI Result Cache Service
+Persists AI verdicts keyed by (image_hash, product_id, prompt_version) so that
+re-analysing the same screenshot for the same product skips the model call
+"""
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+from sqlalchemy.exc import IntegrityError
+from app.config import settings
+from app.database import SessionLocal
+from app.models.ai_result_cache import AIResultCache
+
+
+class AIResultCacheService:
+    """Read-through cache for AI analysis results with TTL and size-bounded eviction"""
+
+    def __init__(self):
+        self.ttl = timedelta(hours=settings.AI_CACHE_TTL_HOURS)
+        self.max_entries = settings.AI_CACHE_MAX_ENTRIES
+        self.evict_every = 100  # Run eviction once per this many writes
+        self._writes = 0
+        self._lock = threading.Lock()
+
+    def get(self, image_hash: str, product_id: Optional[int], prompt_version: str) -> Optional[Dict]:
+        """Return the cached result, or None on a miss / expired entry"""
+        db = SessionLocal()
+        try:
+            entry = db.query(AIResultCache).filter(
+                AIResultCache.image_hash == image_hash,
+                AIResultCache.product_id == (product_id or 0),
+                AIResultCache.prompt_version == prompt_version
+            ).first()
+            if not entry:
+                return None
+
+            now = datetime.utcnow()
+            if entry.expires_at < now:
+                db.delete(entry)
+                db.commit()
+                return None
+
+            entry.hit_count = (entry.hit_count or 0) + 1
+            entry.last_hit_at = now
+            db.commit()
+            return dict(entry.result_json)
+        except Exception as e:
+            print(f"⚠️ AI cache read failed: {str(e)}")
+            db.rollback()
+            return None
+        finally:
+            db.close()
+
+    def put(self, image_hash: str, product_id: Optional[int], prompt_version: str, result: Dict):
+        """Store (or refresh) a result"""
+        db = SessionLocal()
+        try:
+            now = datetime.utcnow()
+            key_filter = (
+                AIResultCache.image_hash == image_hash,
+                AIResultCache.product_id == (product_id or 0),
+                AIResultCache.prompt_version == prompt_version
+            )
+            entry = db.query(AIResultCache).filter(*key_filter).first()
+            if entry:
+                entry.result_json = result
+                entry.expires_at = now + self.ttl
+                entry.last_hit_at = now
+            else:
+                db.add(AIResultCache(
+                    image_hash=image_hash,
+                    product_id=product_id or 0,
+                    prompt_version=prompt_version,
+                    result_json=result,
+                    hit_count=0,
+                    created_at=now,
+                    last_hit_at=now,
+                    expires_at=now + self.ttl
+                ))
+            db.commit()
+        except IntegrityError:
+            # Another worker cached the same key concurrently - keep theirs
+            db.rollback()
+        except Exception as e:
+            print(f"⚠️ AI cache write failed: {str(e)}")
+            db.rollback()
+        finally:
+            db.close()
+
+        with self._lock:
+            self._writes += 1
+            run_eviction = self._writes % self.evict_every == 0
+        if run_eviction:
+            self.evict()
+
+    def evict(self) -> int:
+        """Delete expired entries, then least-recently-hit ones above max_entries"""
+        db = SessionLocal()
+        try:
+            removed = db.query(AIResultCache).filter(
+                AIResultCache.expires_at < datetime.utcnow()
+            ).delete(synchronize_session=False)
+
+            overflow = db.query(AIResultCache.id).count() - self.max_entries
+            if overflow > 0:
+                # Find the last_hit_at cutoff instead of loading every id
+                cutoff = db.query(AIResultCache.last_hit_at).order_by(
+                    AIResultCache.last_hit_at.asc()
+                ).offset(overflow - 1).limit(1).scalar()
+                removed += db.query(AIResultCache).filter(
+                    AIResultCache.last_hit_at <= cutoff
+                ).delete(synchronize_session=False)
+
+            db.commit()
+            if removed:
+                print(f"🧹 AI cache evicted {removed} entries")
+            return removed
+        except Exception as e:
+            print(f"⚠️ AI cache eviction failed: {str(e)}")
+            db.rollback()
+            return 0
+        finally:
+            db.close()
+
+
+# Create singleton instance
+ai_cache_service = AIResultCacheService()
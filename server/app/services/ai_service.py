@@ -1,18 +1,30 @@
 import os
+import json
 import base64
-from typing import Dict, Optional
-from openai import OpenAI
-from PIL import Image
-import io
+import hashlib
+import mimetypes
+from typing import Callable, Dict, Optional
 from dotenv import load_dotenv
+from app.config import settings
+from app.services.lazy import LazyService
 
 # Load environment variables
 load_dotenv()
 
+# Bump when a prompt changes so cached verdicts from the old prompt are not reused
+AUTONOMOUS_PROMPT_VERSION = "autonomous-v1"
+SCREENSHOT_PROMPT_VERSION = "screenshot-v1"
+
 class AIAnalysisService:
     """Service for analyzing review screenshots using OpenAI GPT-4 Vision API"""
     
     def __init__(self):
+        if settings.AI_BACKEND == "fake":
+            from app.services.fake_backends import FakeOpenAIClient
+            self.client = FakeOpenAIClient()
+            print("🧪 Using fake OpenAI backend")
+            return
+        
         # Get API key from environment
         api_key = os.getenv("OPENAI_API_KEY")
         if not api_key:
@@ -23,13 +35,22 @@ class AIAnalysisService:
             return
         
         try:
+            from openai import OpenAI
             self.client = OpenAI(api_key=api_key)
             print("✅ OpenAI GPT-4 Vision Service initialized successfully")
         except Exception as e:
             print(f"❌ Failed to initialize OpenAI: {str(e)}")
             self.client = None
     
-    def autonomous_verification(self, image_path: str, target_product_name: str, target_urls: Dict[str, str]) -> Dict:
+    def autonomous_verification(
+        self,
+        image_path: str,
+        target_product_name: str,
+        target_urls: Dict[str, str],
+        image_hash: Optional[str] = None,
+        product_id: Optional[int] = None,
+        before_model_call: Optional[Callable[[], None]] = None
+    ) -> Dict:
         """
         Perform a fully autonomous verification of a review screenshot
         
@@ -37,17 +58,33 @@ class AIAnalysisService:
             image_path: Path to the screenshot
             target_product_name: The expected product name from DB
             target_urls: Dictionary of authorized marketplace links (amazon, flipkart)
+            image_hash: SHA256 of the original upload (computed from image_path if omitted)
+            product_id: Product the screenshot is verified against (cache key)
+            before_model_call: Called only when the model is actually queried (e.g. a rate limiter)
             
         Returns:
             Dict with verification results and auto-approval status
         """
+        # Product context is part of the prompt, so edits to it invalidate cached verdicts
+        context_digest = hashlib.sha256(
+            json.dumps([target_product_name, target_urls], sort_keys=True).encode()
+        ).hexdigest()[:12]
+        prompt_version = f"{AUTONOMOUS_PROMPT_VERSION}:{context_digest}"
+        
+        cache_hash = self._cache_hash(image_path, image_hash)
+        cached = self._cache_get(cache_hash, product_id, prompt_version)
+        if cached is not None:
+            return cached
+        
         if not self.client:
             return {'status': 'failed', 'error': 'AI Model not initialized'}
+        
+        if before_model_call:
+            before_model_call()
             
         try:
-            # Encode image to base64
-            with open(image_path, "rb") as image_file:
-                base64_image = base64.b64encode(image_file.read()).decode('utf-8')
+            # Encode image to base64 (with its real MIME type)
+            image_data_url = self._encode_image(image_path)
             
             # Format URLs for AI context
             urls_context = "\n".join([f"- {plat.capitalize()}: {url}" for plat, url in target_urls.items() if url])
@@ -105,7 +142,7 @@ class AIAnalysisService:
                             {
                                 "type": "image_url",
                                 "image_url": {
-                                    "url": f"data:image/jpeg;base64,{base64_image}"
+                                    "url": image_data_url
                                 }
                             }
                         ]
@@ -123,11 +160,55 @@ class AIAnalysisService:
                 result.get('confidence_score', 0) > 0.85
             )
             
+            # Parse failures are not cached so a retry gets a fresh answer
+            if 'error' not in result:
+                self._cache_put(cache_hash, product_id, prompt_version, result)
+            
             return result
             
         except Exception as e:
             return {'status': 'failed', 'error': str(e)}
 
+    def _encode_image(self, image_path: str) -> str:
+        """Build a base64 data URL, labelled with the file's actual image type"""
+        if image_path.startswith(("http://", "https://")):
+            # Already publicly hosted (e.g. Google Drive) - let the model fetch it
+            return image_path
+        mime_type = mimetypes.guess_type(image_path)[0] or "image/jpeg"
+        with open(image_path, "rb") as image_file:
+            base64_image = base64.b64encode(image_file.read()).decode('utf-8')
+        return f"data:{mime_type};base64,{base64_image}"
+
+    def _cache_hash(self, image_path: str, image_hash: Optional[str]) -> Optional[str]:
+        """Cache key hash for an image (None disables caching for this call)"""
+        if not settings.AI_CACHE_ENABLED:
+            return None
+        if image_hash:
+            return image_hash
+        try:
+            sha = hashlib.sha256()
+            with open(image_path, "rb") as image_file:
+                for chunk in iter(lambda: image_file.read(65536), b""):
+                    sha.update(chunk)
+            return sha.hexdigest()
+        except OSError:
+            return None
+
+    def _cache_get(self, image_hash: Optional[str], product_id: Optional[int], prompt_version: str) -> Optional[Dict]:
+        if not image_hash:
+            return None
+        from app.services.ai_cache_service import ai_cache_service
+        cached = ai_cache_service.get(image_hash, product_id, prompt_version)
+        if cached is not None:
+            print(f"⚡ AI cache hit: {image_hash[:12]} ({prompt_version})")
+        return cached
+
+    def _cache_put(self, image_hash: Optional[str], product_id: Optional[int], prompt_version: str, result: Dict):
+        if not image_hash:
+            return
+        from app.services.ai_cache_service import ai_cache_service
+        ai_cache_service.put(image_hash, product_id, prompt_version, result)
+
     def _parse_json(self, text: str) -> Dict:
         """Helper to safely parse JSON from AI response"""
         import json
@@ -139,16 +220,22 @@ class AIAnalysisService:
         except:
             return {"error": "JSON parse failed", "raw": text}
     
-    def analyze_screenshot(self, image_path: str) -> Dict:
+    def analyze_screenshot(self, image_path: str, image_hash: Optional[str] = None) -> Dict:
         """
         Analyze a review screenshot to extract rating and comment
         
         Args:
             image_path: Path to the screenshot image
+            image_hash: SHA256 of the original upload (computed from image_path if omitted)
             
         Returns:
             Dict with keys: rating, comment, confidence, status
         """
+        cache_hash = self._cache_hash(image_path, image_hash)
+        cached = self._cache_get(cache_hash, None, SCREENSHOT_PROMPT_VERSION)
+        if cached is not None:
+            return cached
+        
         # Check if client is available
         if not self.client:
             return {
@@ -161,9 +248,8 @@ class AIAnalysisService:
             }
         
         try:
-            # Encode image to base64
-            with open(image_path, "rb") as image_file:
-                base64_image = base64.b64encode(image_file.read()).decode('utf-8')
+            # Encode image to base64 (with its real MIME type)
+            image_data_url = self._encode_image(image_path)
             
             # Create prompt for OpenAI
             prompt = """
@@ -201,7 +287,7 @@ class AIAnalysisService:
                             {
                                 "type": "image_url",
                                 "image_url": {
-                                    "url": f"data:image/jpeg;base64,{base64_image}"
+                                    "url": image_data_url
                                 }
                             }
                         ]
@@ -214,6 +300,10 @@ class AIAnalysisService:
             result = self._parse_response(response.choices[0].message.content)
             result['status'] = 'success'
             
+            # A zero-confidence result means the response could not be parsed
+            if result['confidence'] > 0:
+                self._cache_put(cache_hash, None, SCREENSHOT_PROMPT_VERSION, result)
+            
             return result
             
         except Exception as e:
@@ -272,4 +362,4 @@ class AIAnalysisService:
 
 
 # Create singleton instance
-ai_service = AIAnalysisService()
+ai_service = LazyService("ai_service", AIAnalysisService)
@@ -0,0 +1,228 @@
+"""
+Disk LRU Cache
+Size-bounded, content-addressed file store shared by the QR image and PDF
+caches. Recency is kept in memory and mirrored to file mtimes. Several
+processes may share the directory, so every RESCAN_SECONDS the size and LRU
+order are re-read from the directory rather than trusted from this process's
+own bookkeeping. The walk runs outside the lock and is swapped in afterwards;
+lookups and stores made meanwhile are journaled and replayed on top of it, and
+eviction in between works from the in-memory order. Files are written
+atomically; cached files are handed out already open, so another
+worker's eviction cannot remove one between the lookup and the send.
+"""
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import BinaryIO, Dict, Optional
+
+RESCAN_SECONDS = 60  # re-read the directory at most this often
+STALE_TEMP_SECONDS = 3600  # temp files older than this were left by a crashed writer
+
+
+class DiskLRUCache:
+    """Thread-safe LRU of files named <key><extension> under one directory"""
+
+    def __init__(self, directory: str, max_bytes: int, extension: str, label: str):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.extension = extension
+        self.label = label
+        self._entries: "OrderedDict[str, int]" = OrderedDict()  # key -> file size, oldest first
+        self._total = 0
+        self._scanned_at = None  # monotonic time of the last directory scan
+        self._scanning = False
+        self._journal = []  # (key, size or None if removed) recorded while a scan is running
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def enabled(self) -> bool:
+        return True
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "enabled": self.enabled(),
+                "directory": self.directory,
+                "entries": len(self._entries),
+                "bytes": self._total,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions
+            }
+
+    def clear(self):
+        self._rescan(force=True)
+        with self._lock:
+            for key in list(self._entries):
+                self._evict(key)
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}{self.extension}")
+
+    def temp_path(self, key: str) -> str:
+        """Unique scratch path next to the entry (pass to store() when complete)"""
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        return f"{path}.{uuid.uuid4().hex}.tmp"
+
+    def open(self, key: str) -> Optional[BinaryIO]:
+        """Cached file opened for reading (marked as recently used), or None; caller closes it"""
+        if not self.enabled():
+            return None
+        path = self.path(key)
+        self._rescan()
+        with self._lock:
+            try:
+                f = open(path, "rb")
+            except OSError:
+                # Not cached, or evicted by another worker
+                self._forget(key)
+                self.misses += 1
+                return None
+            try:
+                os.utime(path)
+            except OSError:
+                pass
+            self._touch(key, os.fstat(f.fileno()).st_size)
+            self.hits += 1
+            return f
+
+    def read(self, key: str) -> Optional[bytes]:
+        if not self.enabled():
+            return None
+        path = self.path(key)
+        self._rescan()
+        with self._lock:
+            try:
+                with open(path, "rb") as f:
+                    data = f.read()
+                os.utime(path)
+            except OSError:
+                # Not cached, or evicted by another worker
+                self._forget(key)
+                self.misses += 1
+                return None
+            self._touch(key, len(data))
+            self.hits += 1
+            return data
+
+    def write(self, key: str, data: bytes):
+        if not self.enabled():
+            return
+        temp_path = None
+        try:
+            temp_path = self.temp_path(key)
+            with open(temp_path, "wb") as f:
+                f.write(data)
+        except OSError as e:
+            print(f"⚠️ Could not store file in {self.label}: {str(e)}")
+            if temp_path and os.path.exists(temp_path):
+                os.remove(temp_path)
+            return
+        self.store(key, temp_path)
+
+    def store(self, key: str, temp_path: str) -> Optional[str]:
+        """Move a finished temp file into the cache; returns its final path"""
+        path = self.path(key)
+        try:
+            file_size = os.path.getsize(temp_path)
+            os.replace(temp_path, path)
+        except OSError as e:
+            print(f"⚠️ Could not store file in {self.label}: {str(e)}")
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            return None
+
+        self._rescan()
+        with self._lock:
+            self._forget(key)
+            self._touch(key, file_size)
+            self._evict_over_limit()
+        return path
+
+    def _rescan(self, force: bool = False):
+        """
+        Replace the LRU with what is on disk when RESCAN_SECONDS have passed
+        (or on first use). Only one thread walks at a time; the others carry
+        on with the current bookkeeping.
+        """
+        with self._lock:
+            if self._scanning:
+                return
+            loading = self._scanned_at is None
+            if not force and not loading and time.monotonic() - self._scanned_at < RESCAN_SECONDS:
+                return
+            self._scanning = True
+        found = []
+        try:
+            found = self._walk()
+        finally:
+            with self._lock:
+                self._entries = OrderedDict((key, file_size) for _, key, file_size in sorted(found))
+                self._total = sum(self._entries.values())
+                journal, self._journal = self._journal, []
+                self._scanning = False
+                for key, file_size in journal:
+                    if file_size is None:
+                        self._forget(key)
+                    else:
+                        self._touch(key, file_size)
+                self._scanned_at = time.monotonic()
+                # Other workers store in the same directory
+                self._evict_over_limit()
+        if loading and found:
+            print(f"🗂️ {self.label} loaded: {len(found)} files, {sum(f[2] for f in found) // 1024} KB")
+
+    def _walk(self):
+        """(mtime, key, size) for every cached file, deleting abandoned temp files"""
+        found = []
+        stale_before = time.time() - STALE_TEMP_SECONDS
+        if os.path.isdir(self.directory):
+            for root, _, files in os.walk(self.directory):
+                for name in files:
+                    file_path = os.path.join(root, name)
+                    try:
+                        stat = os.stat(file_path)
+                        if name.endswith(".tmp"):
+                            if stat.st_mtime < stale_before:
+                                os.remove(file_path)
+                            continue
+                    except OSError:
+                        continue
+                    if name.endswith(self.extension):
+                        found.append((stat.st_mtime, name[:-len(self.extension)], stat.st_size))
+        return found
+
+    def _evict_over_limit(self):
+        """Drop least recently used entries until under max_bytes. Caller holds the lock."""
+        while self._total > self.max_bytes and len(self._entries) > 1:
+            self._evict(next(iter(self._entries)))
+
+    def _touch(self, key: str, file_size: int):
+        if self._scanning:
+            self._journal.append((key, file_size))
+        if key in self._entries:
+            self._entries.move_to_end(key)
+        else:
+            self._entries[key] = file_size
+            self._total += file_size
+
+    def _forget(self, key: str):
+        if self._scanning:
+            self._journal.append((key, None))
+        file_size = self._entries.pop(key, None)
+        if file_size is not None:
+            self._total -= file_size
+
+    def _evict(self, key: str):
+        self._forget(key)
+        self.evictions += 1
+        try:
+            os.remove(self.path(key))
+        except OSError:
+            pass
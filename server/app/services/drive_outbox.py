@@ -0,0 +1,259 @@
+"""
+Google Drive Upload Outbox
+Uploads are recorded in the drive_uploads table inside the request's transaction
+and delivered by background workers with retries, exponential backoff and
+dead-lettering. The reward/reel keeps pointing at the local file until the
+upload succeeds, then its screenshot column is switched to the Drive link.
+
+Delivery has two steps: create the file, then make it readable by link. The
+created file id is committed to the row in between, so when publishing fails
+the retry only publishes again instead of uploading a second copy.
+"""
+import os
+import random
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+from sqlalchemy import func
+from app.config import settings
+from app.database import SessionLocal
+from app.models.drive_upload import DriveUpload
+from app.models.reward import Reward
+from app.models.reel import Reel
+
+# target_type -> (model, column holding the screenshot location)
+TARGETS = {
+    "reward": (Reward, "review_screenshot"),
+    "reel": (Reel, "brand_tag_proof"),
+}
+
+# in_progress rows older than this are assumed to belong to a crashed worker
+STALE_CLAIM = timedelta(minutes=10)
+
+
+def enqueue_drive_upload(db, local_path: str, file_name: str, mime_type: str, target_type: str, target_id: int) -> DriveUpload:
+    """
+    Record an upload in the outbox. Added to the caller's session so it commits
+    atomically with the reward/reel; call drive_outbox.notify() after commit.
+    """
+    item = DriveUpload(
+        local_path=local_path,
+        file_name=file_name,
+        mime_type=mime_type,
+        target_type=target_type,
+        target_id=target_id,
+        status="pending",
+        attempts=0,
+        next_attempt_at=datetime.utcnow()
+    )
+    db.add(item)
+    return item
+
+
+class DriveOutboxWorker:
+    """Background threads that drain the drive_uploads outbox"""
+
+    def __init__(self, num_workers: Optional[int] = None):
+        self.num_workers = num_workers or settings.DRIVE_OUTBOX_WORKERS
+        self.poll_interval = 5.0
+        self._threads = []
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._reclaim_lock = threading.Lock()
+        self._next_reclaim = 0.0  # monotonic time of the next stale claim sweep
+
+    def start(self):
+        if self._threads:
+            return
+        self._stop.clear()
+        for i in range(self.num_workers):
+            thread = threading.Thread(target=self._run, name=f"drive-outbox-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        print(f"✅ Drive outbox workers started ({self.num_workers})")
+
+    def stop(self, timeout: float = 5.0):
+        self._stop.set()
+        self._wake.set()
+        for thread in self._threads:
+            thread.join(timeout=timeout)
+        self._threads = []
+
+    def notify(self):
+        """Wake the workers (new item committed)"""
+        self._wake.set()
+
+    def stats(self) -> Dict:
+        db = SessionLocal()
+        try:
+            rows = db.query(DriveUpload.status, func.count(DriveUpload.id)).group_by(DriveUpload.status).all()
+            return {status: count for status, count in rows}
+        finally:
+            db.close()
+
+    def retry(self, item_id: int) -> bool:
+        """Move a dead-lettered item back to pending"""
+        db = SessionLocal()
+        try:
+            item = db.query(DriveUpload).filter(DriveUpload.id == item_id, DriveUpload.status == "dead").first()
+            if not item:
+                return False
+            item.status = "pending"
+            item.attempts = 0
+            item.next_attempt_at = datetime.utcnow()
+            db.commit()
+        finally:
+            db.close()
+        self.notify()
+        return True
+
+    def _reclaim_if_due(self):
+        """Release stale claims every STALE_CLAIM / 2 (one worker thread does it)"""
+        with self._reclaim_lock:
+            if time.monotonic() < self._next_reclaim:
+                return
+            self._next_reclaim = time.monotonic() + STALE_CLAIM.total_seconds() / 2
+        self._release_stale_claims()
+
+    def _release_stale_claims(self):
+        db = SessionLocal()
+        try:
+            released = db.query(DriveUpload).filter(
+                DriveUpload.status == "in_progress",
+                DriveUpload.updated_at < datetime.utcnow() - STALE_CLAIM
+            ).update({"status": "pending"}, synchronize_session=False)
+            db.commit()
+            if released:
+                print(f"🔄 Released {released} stale Drive upload claims")
+        except Exception as e:
+            print(f"⚠️ Could not release stale Drive upload claims: {str(e)}")
+        finally:
+            db.close()
+
+    def _claim_batch(self, db) -> List[DriveUpload]:
+        """Atomically move up to DRIVE_OUTBOX_BATCH_SIZE due items from pending to in_progress"""
+        candidates = db.query(DriveUpload.id).filter(
+            DriveUpload.status == "pending",
+            DriveUpload.next_attempt_at <= datetime.utcnow()
+        ).order_by(DriveUpload.next_attempt_at.asc()).limit(settings.DRIVE_OUTBOX_BATCH_SIZE).all()
+
+        claimed_ids = []
+        for (item_id,) in candidates:
+            claimed = db.query(DriveUpload).filter(
+                DriveUpload.id == item_id,
+                DriveUpload.status == "pending"
+            ).update({"status": "in_progress", "updated_at": datetime.utcnow()}, synchronize_session=False)
+            if claimed:
+                claimed_ids.append(item_id)
+        db.commit()
+
+        if not claimed_ids:
+            return []
+        return db.query(DriveUpload).filter(DriveUpload.id.in_(claimed_ids)).all()
+
+    def _run(self):
+        while not self._stop.is_set():
+            # Another worker process may have crashed holding claims
+            self._reclaim_if_due()
+            db = SessionLocal()
+            try:
+                items = self._claim_batch(db)
+                if items:
+                    self._deliver(db, items)
+                    continue
+            except Exception as e:
+                print(f"❌ Drive outbox worker error: {str(e)}")
+                db.rollback()
+            finally:
+                db.close()
+
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+
+    def _backoff(self, attempts: int) -> timedelta:
+        delay = min(settings.DRIVE_OUTBOX_MAX_DELAY, settings.DRIVE_OUTBOX_BASE_DELAY * (2 ** (attempts - 1)))
+        return timedelta(seconds=delay * random.uniform(0.8, 1.2))
+
+    def _deliver(self, db, items: List[DriveUpload]):
+        from app.services.google_drive_service import google_drive_service
+
+        errors = {}
+        uploadable = []
+        for item in items:
+            if item.drive_file_id:
+                continue  # created on an earlier attempt, only publish it
+            if os.path.exists(item.local_path):
+                uploadable.append(item)
+            else:
+                errors[item.id] = "Local file missing"
+
+        if uploadable:
+            print(f"☁️ Uploading {len(uploadable)} file(s) to Google Drive")
+            try:
+                file_ids = google_drive_service.create_files(
+                    [(item.local_path, item.file_name, item.mime_type) for item in uploadable]
+                )
+            except Exception as e:
+                file_ids = [None] * len(uploadable)
+                for item in uploadable:
+                    errors[item.id] = str(e)
+            for item, file_id in zip(uploadable, file_ids):
+                if file_id:
+                    item.drive_file_id = file_id
+                else:
+                    errors.setdefault(item.id, "Drive upload returned no file id")
+            # Record the created files before publishing them
+            db.commit()
+
+        links = {}
+        created = [item for item in items if item.drive_file_id]
+        if created:
+            try:
+                results = google_drive_service.publish_files([item.drive_file_id for item in created])
+            except Exception as e:
+                results = [None] * len(created)
+                for item in created:
+                    errors[item.id] = str(e)
+            for item, drive_url in zip(created, results):
+                if drive_url:
+                    links[item.id] = drive_url
+                else:
+                    errors.setdefault(item.id, "Could not make Drive file readable by link")
+
+        uploaded_paths = []
+        for item in items:
+            item.attempts = (item.attempts or 0) + 1
+            drive_url = links.get(item.id)
+
+            if drive_url:
+                model, column = TARGETS[item.target_type]
+                target = db.query(model).filter(model.id == item.target_id).first()
+                if target and getattr(target, column).lstrip("/") == item.local_path:
+                    setattr(target, column, drive_url)
+                item.status = "done"
+                item.drive_url = drive_url
+                item.last_error = None
+                uploaded_paths.append(item.local_path)
+                continue
+
+            error = errors.get(item.id)
+            item.last_error = error
+            if error == "Local file missing" or item.attempts >= settings.DRIVE_OUTBOX_MAX_ATTEMPTS:
+                item.status = "dead"
+                print(f"💀 Drive upload #{item.id} dead-lettered after {item.attempts} attempts: {error}")
+            else:
+                item.status = "pending"
+                item.next_attempt_at = datetime.utcnow() + self._backoff(item.attempts)
+                print(f"⚠️ Drive upload #{item.id} failed (attempt {item.attempts}), retrying at {item.next_attempt_at:%H:%M:%S}: {error}")
+        db.commit()
+
+        # Only remove local copies once the Drive links are committed
+        for local_path in uploaded_paths:
+            if os.path.exists(local_path):
+                os.remove(local_path)
+                print(f"🗑️ Local file deleted: {local_path}")
+
+
+# Create singleton instance
+drive_outbox = DriveOutboxWorker()
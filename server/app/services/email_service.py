@@ -79,8 +79,13 @@ class EmailService:
             part = MIMEText(html, "html")
             message.attach(part)
             
-            # Send email via Gmail SMTP
-            with smtplib.SMTP(settings.SMTP_HOST, settings.SMTP_PORT) as server:
+            # Send email via Gmail SMTP (or the offline stand-in for load tests)
+            if settings.EMAIL_BACKEND == "fake":
+                from app.services.fake_backends import FakeSMTP as smtp_class
+            else:
+                smtp_class = smtplib.SMTP
+            
+            with smtp_class(settings.SMTP_HOST, settings.SMTP_PORT) as server:
                 server.starttls()  # Secure connection
                 server.login(settings.SMTP_USER, settings.SMTP_PASSWORD)
                 server.send_message(message)
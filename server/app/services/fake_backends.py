@@ -0,0 +1,184 @@
+"""
+Local Stand-in Backends
+Offline replacements for OpenAI, Google Drive and SMTP used for load tests and CI.
+Selected with AI_BACKEND=fake, DRIVE_BACKEND=fake and EMAIL_BACKEND=fake.
+"""
+import json
+import random
+import time
+import uuid
+from types import SimpleNamespace
+from typing import Dict, List, Tuple
+from app.config import settings
+
+
+class LatencyModel:
+    """
+    Samples a delay from a spec string (all values in milliseconds):
+
+        fixed:200            always 200ms
+        uniform:100:500      between 100 and 500ms
+        normal:300:50        mean 300, std-dev 50
+        lognormal:1500:0.4   median 1500, sigma 0.4 (long right tail, like real APIs)
+    """
+
+    def __init__(self, spec: str):
+        parts = (spec or "fixed:0").split(":")
+        self.kind = parts[0]
+        self.params = [float(p) for p in parts[1:]]
+        if self.kind not in ("fixed", "uniform", "normal", "lognormal"):
+            raise ValueError(f"Unknown latency distribution: {spec}")
+
+    def sample_ms(self) -> float:
+        if self.kind == "fixed":
+            return self.params[0]
+        if self.kind == "uniform":
+            return random.uniform(self.params[0], self.params[1])
+        if self.kind == "normal":
+            return max(0.0, random.gauss(self.params[0], self.params[1]))
+        median, sigma = self.params
+        return median * random.lognormvariate(0, sigma)
+
+    def sleep(self):
+        delay = self.sample_ms()
+        if delay > 0:
+            time.sleep(delay / 1000)
+
+
+def maybe_fail(error_rate: float, backend: str):
+    """Raise a simulated backend error with probability error_rate"""
+    if error_rate > 0 and random.random() < error_rate:
+        raise RuntimeError(f"Simulated {backend} failure")
+
+
+# --- OpenAI ---
+
+# Canned responses. Each one carries the keys of both prompts
+# (autonomous_verification and analyze_screenshot).
+CANNED_VERDICTS: Dict[str, str] = {
+    "five_star_auto_approve": json.dumps({
+        "is_match": True, "confidence_score": 0.97, "extracted_reviewer": "Load Test",
+        "extracted_text_snippet": "Great gummies, tasty and effective.", "detected_rating": 5,
+        "detected_platform": "Amazon", "is_verified_badge_present": True, "is_edited_or_fake": False,
+        "decision_reasoning": "Fake backend: authentic UI, product match, 5 stars.",
+        "rating": 5, "comment": "Great gummies, tasty and effective.", "platform": "Amazon", "confidence": 0.97
+    }),
+    "five_star_manual": json.dumps({
+        "is_match": False, "confidence_score": 0.6, "extracted_reviewer": "Load Test",
+        "extracted_text_snippet": "Nice product.", "detected_rating": 5,
+        "detected_platform": "Flipkart", "is_verified_badge_present": False, "is_edited_or_fake": False,
+        "decision_reasoning": "Fake backend: 5 stars but product match uncertain.",
+        "rating": 5, "comment": "Nice product.", "platform": "Flipkart", "confidence": 0.6
+    }),
+    "three_star": json.dumps({
+        "is_match": True, "confidence_score": 0.92, "extracted_reviewer": "Load Test",
+        "extracted_text_snippet": "It is okay.", "detected_rating": 3,
+        "detected_platform": "Amazon", "is_verified_badge_present": True, "is_edited_or_fake": False,
+        "decision_reasoning": "Fake backend: genuine review but only 3 stars.",
+        "rating": 3, "comment": "It is okay.", "platform": "Amazon", "confidence": 0.92
+    }),
+    "parse_failure": "Sorry, I can't help with verifying this image.",
+}
+
+
+def parse_weighted(spec: str) -> List[Tuple[str, float]]:
+    """'five_star_auto_approve:0.7,three_star:0.3' -> [(name, weight), ...]"""
+    choices = []
+    for item in (spec or "").split(","):
+        if not item.strip():
+            continue
+        name, _, weight = item.strip().partition(":")
+        if name not in CANNED_VERDICTS:
+            raise ValueError(f"Unknown fake verdict: {name}")
+        choices.append((name, float(weight) if weight else 1.0))
+    return choices or [("five_star_auto_approve", 1.0)]
+
+
+class _FakeCompletions:
+    def __init__(self, latency: LatencyModel, error_rate: float, verdicts: List[Tuple[str, float]]):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.names = [name for name, _ in verdicts]
+        self.weights = [weight for _, weight in verdicts]
+
+    def create(self, **kwargs):
+        self.latency.sleep()
+        maybe_fail(self.error_rate, "OpenAI")
+        verdict = random.choices(self.names, weights=self.weights, k=1)[0]
+        message = SimpleNamespace(content=CANNED_VERDICTS[verdict])
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+class FakeOpenAIClient:
+    """Mimics the subset of openai.OpenAI used by AIAnalysisService"""
+
+    def __init__(self):
+        completions = _FakeCompletions(
+            LatencyModel(settings.FAKE_AI_LATENCY),
+            settings.FAKE_AI_ERROR_RATE,
+            parse_weighted(settings.FAKE_AI_VERDICTS)
+        )
+        self.chat = SimpleNamespace(completions=completions)
+
+
+# --- Google Drive ---
+
+class FakeDriveService:
+    """Same interface as GoogleDriveService; returns a fake lh3 link"""
+
+    def __init__(self):
+        self.folder_id = settings.GOOGLE_DRIVE_FOLDER_ID
+        self.latency = LatencyModel(settings.FAKE_DRIVE_LATENCY)
+        self.error_rate = settings.FAKE_DRIVE_ERROR_RATE
+        print("🧪 Using fake Google Drive backend")
+
+    def upload_file(self, local_path, file_name, mime_type='image/jpeg'):
+        return self.upload_files([(local_path, file_name, mime_type)])[0]
+
+    def upload_files(self, items):
+        return self.publish_files(self.create_files(items))
+
+    def create_files(self, items):
+        file_ids = []
+        for _ in items:
+            self.latency.sleep()
+            try:
+                maybe_fail(self.error_rate, "Google Drive")
+            except RuntimeError as e:
+                print(f"❌ Google Drive Upload Error: {str(e)}")
+                file_ids.append(None)
+                continue
+            file_ids.append(f"fake-{uuid.uuid4().hex}")
+        return file_ids
+
+    def publish_files(self, file_ids):
+        return [f"https://lh3.googleusercontent.com/d/{file_id}" if file_id else None for file_id in file_ids]
+
+
+# --- SMTP ---
+
+class FakeSMTP:
+    """Drop-in for smtplib.SMTP as used by EmailService (context manager + starttls/login/send_message)"""
+
+    sent_count = 0
+
+    def __init__(self, host=None, port=None):
+        self.latency = LatencyModel(settings.FAKE_SMTP_LATENCY)
+        self.error_rate = settings.FAKE_SMTP_ERROR_RATE
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def starttls(self):
+        pass
+
+    def login(self, user, password):
+        pass
+
+    def send_message(self, message):
+        self.latency.sleep()
+        maybe_fail(self.error_rate, "SMTP")
+        FakeSMTP.sent_count += 1
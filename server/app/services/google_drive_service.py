@@ -1,20 +1,26 @@
 import os
-from google.oauth2.credentials import Credentials
-from googleapiclient.discovery import build
-from googleapiclient.http import MediaFileUpload
-from google.auth.transport.requests import Request
+import time
 from app.config import settings
+from app.services.lazy import LazyService
+
+SHARE_RETRY_SECONDS = 300  # wait this long before retrying a failed folder share
 
 class GoogleDriveService:
     def __init__(self):
         self.scopes = ['https://www.googleapis.com/auth/drive.file']
         self.folder_id = settings.GOOGLE_DRIVE_FOLDER_ID
         self.service = None
+        self._folder_shared = None  # Unknown until the first upload
+        self._share_retry_at = 0  # monotonic time before which a failed share is not retried
         self._authenticate()
 
     def _authenticate(self):
         """Authenticate using Refresh Token for personal Google Drive"""
         try:
+            from google.oauth2.credentials import Credentials
+            from googleapiclient.discovery import build
+            from google.auth.transport.requests import Request
+
             if not all([settings.GOOGLE_DRIVE_CLIENT_ID, 
                        settings.GOOGLE_DRIVE_CLIENT_SECRET, 
                        settings.GOOGLE_DRIVE_REFRESH_TOKEN]):
@@ -39,40 +45,138 @@ class GoogleDriveService:
             print(f"❌ Google Drive Auth Error: {str(e)}")
             self.service = None
 
+    def _ensure_folder_shared(self):
+        """
+        Make the upload folder readable by anyone once, so uploaded files inherit
+        public visibility instead of needing a permissions call per file.
+        Falls back to per-file permissions if the folder cannot be shared; a
+        failure is retried after SHARE_RETRY_SECONDS rather than remembered.
+        """
+        if self._folder_shared is not None:
+            return self._folder_shared
+        if not settings.DRIVE_FOLDER_SHARING:
+            self._folder_shared = False
+            return False
+        if time.monotonic() < self._share_retry_at:
+            return False
+        try:
+            self.service.permissions().create(
+                fileId=self.folder_id,
+                body={'type': 'anyone', 'role': 'reader'}
+            ).execute()
+            self._folder_shared = True
+            print("✅ Google Drive folder shared (files inherit public read access)")
+        except Exception as e:
+            print(f"⚠️ Could not share Drive folder, using per-file permissions: {str(e)}")
+            self._share_retry_at = time.monotonic() + SHARE_RETRY_SECONDS
+            return False
+        return True
+
+    def _create_file(self, local_path, file_name, mime_type):
+        """Create the file: one multipart request for small files, resumable for large ones"""
+        from googleapiclient.http import MediaFileUpload
+
+        file_metadata = {
+            'name': file_name,
+            'parents': [self.folder_id]
+        }
+        resumable = os.path.getsize(local_path) > settings.DRIVE_MULTIPART_THRESHOLD
+        media = MediaFileUpload(local_path, mimetype=mime_type, resumable=resumable)
+        file = self.service.files().create(
+            body=file_metadata,
+            media_body=media,
+            fields='id'
+        ).execute()
+        return file.get('id')
+
+    @staticmethod
+    def _public_link(file_id):
+        # Return a direct image link format (more reliable for <img> tags)
+        return f"https://lh3.googleusercontent.com/d/{file_id}"
+
     def upload_file(self, local_path, file_name, mime_type='image/jpeg'):
         """Upload a file to Google Drive and return its view link"""
+        return self.upload_files([(local_path, file_name, mime_type)])[0]
+
+    def upload_files(self, items):
+        """
+        Upload several files and return their view links (None for failures)
+
+        Args:
+            items: List of (local_path, file_name, mime_type) tuples
+        """
+        return self.publish_files(self.create_files(items))
+
+    def create_files(self, items):
+        """
+        Create the files in the upload folder and return their Drive file ids
+        (None for failures). They are not readable by link until publish_files.
+
+        Drive's batch endpoint does not accept media uploads, so each file is a
+        single request.
+        """
         if not self.service:
             # Try to re-authenticate once if service is down
             self._authenticate()
             if not self.service:
-                return None
-            
-        try:
-            file_metadata = {
-                'name': file_name,
-                'parents': [self.folder_id]
-            }
-            media = MediaFileUpload(local_path, mimetype=mime_type, resumable=True)
-            file = self.service.files().create(
-                body=file_metadata,
-                media_body=media,
-                fields='id, webViewLink, webContentLink'
-            ).execute()
-            
-            file_id = file.get('id')
-            
-            # Make the file readable by anyone (Personal accounts can do this if enabled)
-            self.service.permissions().create(
-                fileId=file_id,
-                body={'type': 'anyone', 'role': 'reader'}
-            ).execute()
-            
-            # Return a direct image link format (more reliable for <img> tags)
-            return f"https://lh3.googleusercontent.com/d/{file_id}"
-            
-        except Exception as e:
-            print(f"❌ Google Drive Upload Error: {str(e)}")
-            return None
+                return [None] * len(items)
+
+        file_ids = []
+        for local_path, file_name, mime_type in items:
+            try:
+                file_ids.append(self._create_file(local_path, file_name, mime_type))
+            except Exception as e:
+                print(f"❌ Google Drive Upload Error: {str(e)}")
+                file_ids.append(None)
+        return file_ids
+
+    def publish_files(self, file_ids):
+        """
+        Make created files readable by link and return their view links (None
+        for failures). Nothing to do per file when the folder is shared; else
+        the permission calls are sent together in one batch request. Safe to
+        repeat for a file whose permission call failed earlier.
+        """
+        if not any(file_ids):
+            return [None] * len(file_ids)
+        if not self.service:
+            self._authenticate()
+            if not self.service:
+                return [None] * len(file_ids)
+
+        if not self._ensure_folder_shared():
+            failed_permissions = set()
+
+            def on_permission(request_id, response, exception):
+                if exception is not None:
+                    print(f"❌ Google Drive Permission Error: {str(exception)}")
+                    failed_permissions.add(request_id)
+
+            try:
+                batch = self.service.new_batch_http_request(callback=on_permission)
+                for file_id in file_ids:
+                    if file_id:
+                        batch.add(
+                            self.service.permissions().create(
+                                fileId=file_id,
+                                body={'type': 'anyone', 'role': 'reader'}
+                            ),
+                            request_id=file_id
+                        )
+                batch.execute()
+            except Exception as e:
+                print(f"❌ Google Drive Permission Batch Error: {str(e)}")
+                failed_permissions.update(file_id for file_id in file_ids if file_id)
+
+            file_ids = [None if file_id in failed_permissions else file_id for file_id in file_ids]
+
+        return [self._public_link(file_id) if file_id else None for file_id in file_ids]
+
+def _build_drive_service():
+    if settings.DRIVE_BACKEND == "fake":
+        from app.services.fake_backends import FakeDriveService
+        return FakeDriveService()
+    return GoogleDriveService()
 
-# Singleton instance
-google_drive_service = GoogleDriveService()
+# Singleton instance (authenticates on first upload, not at import)
+google_drive_service = LazyService("google_drive_service", _build_drive_service)
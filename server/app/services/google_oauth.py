@@ -1,8 +1,6 @@
 """
 Google OAuth Configuration and Helper Functions
 """
-from google.oauth2 import id_token
-from google.auth.transport import requests
 import os
 
 class GoogleOAuth:
@@ -13,6 +11,9 @@ class GoogleOAuth:
     
     def verify_token(self, token: str):
         """Verify Google ID token and return user info"""
+        from google.oauth2 import id_token
+        from google.auth.transport import requests
+
         try:
             print(f"[DEBUG] Verifying token with Client ID: {self.client_id}")
             
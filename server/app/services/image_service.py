@@ -0,0 +1,75 @@
+"""
+Screenshot Normalization Service
+Produces a downscaled variant for the AI model and a compact WebP for storage
+"""
+import os
+from typing import Tuple
+from PIL import Image, ImageOps
+from app.config import settings
+
+
+class ImageNormalizationService:
+    """Service for re-encoding uploaded screenshots into AI and archival variants"""
+
+    def __init__(self):
+        self.ai_max_edge = settings.AI_IMAGE_MAX_EDGE
+        self.ai_quality = settings.AI_IMAGE_QUALITY
+        self.archive_max_edge = settings.ARCHIVE_IMAGE_MAX_EDGE
+        self.archive_quality = settings.ARCHIVE_IMAGE_QUALITY
+
+    @staticmethod
+    def ai_variant_path(archive_path: str) -> str:
+        """Path of the AI-sized JPEG that sits next to an archived screenshot"""
+        return f"{os.path.splitext(archive_path)[0]}_ai.jpg"
+
+    def _load(self, source_path: str) -> Image.Image:
+        """Open an image, apply EXIF rotation and flatten transparency onto white"""
+        with Image.open(source_path) as img:
+            img = ImageOps.exif_transpose(img)
+            if img.mode in ("RGBA", "LA", "P"):
+                img = img.convert("RGBA")
+                background = Image.new("RGB", img.size, "white")
+                background.paste(img, mask=img.split()[-1])
+                return background
+            return img.convert("RGB")
+
+    @staticmethod
+    def _fit(img: Image.Image, max_edge: int) -> Image.Image:
+        """Downscale so the long edge is at most max_edge (never upscales)"""
+        if max(img.size) <= max_edge:
+            return img
+        resized = img.copy()
+        resized.thumbnail((max_edge, max_edge), Image.LANCZOS)
+        return resized
+
+    def normalize(self, source_path: str) -> Tuple[str, str]:
+        """
+        Normalize an uploaded screenshot
+
+        Args:
+            source_path: Path of the original upload (JPEG/PNG/WebP)
+
+        Returns:
+            (archive_path, ai_path) - WebP for storage/Drive and JPEG for the model.
+            The original file is removed once both variants are written.
+        """
+        img = self._load(source_path)
+
+        archive_path = f"{os.path.splitext(source_path)[0]}.webp"
+        ai_path = self.ai_variant_path(archive_path)
+
+        self._fit(img, self.archive_max_edge).save(
+            archive_path, format="WEBP", quality=self.archive_quality, method=4
+        )
+        self._fit(img, self.ai_max_edge).save(
+            ai_path, format="JPEG", quality=self.ai_quality, optimize=True
+        )
+
+        if os.path.abspath(source_path) != os.path.abspath(archive_path):
+            os.remove(source_path)
+
+        return archive_path, ai_path
+
+
+# Create singleton instance
+image_service = ImageNormalizationService()
@@ -0,0 +1,46 @@
+"""
+Lazy Service Singletons
+Wraps a service factory so the instance (with its heavy imports, API clients
+and network handshakes) is only built on first use instead of at import time.
+"""
+import threading
+import time
+from typing import Any, Callable
+from app import startup_report
+
+
+class LazyService:
+    """Proxy that builds the real service on first attribute access"""
+
+    _PROXY_ATTRIBUTES = ("_name", "_factory", "_instance", "_lock")
+
+    def __init__(self, name: str, factory: Callable[[], Any]):
+        self._name = name
+        self._factory = factory
+        self._instance = None
+        self._lock = threading.Lock()
+
+    @property
+    def initialized(self) -> bool:
+        return self._instance is not None
+
+    def get(self):
+        if self._instance is None:
+            with self._lock:
+                if self._instance is None:
+                    started = time.perf_counter()
+                    instance = self._factory()
+                    elapsed = time.perf_counter() - started
+                    startup_report.record("init", self._name, elapsed)
+                    print(f"⏱️ {self._name} initialized in {elapsed * 1000:.0f}ms")
+                    self._instance = instance
+        return self._instance
+
+    def __getattr__(self, attr):
+        return getattr(self.get(), attr)
+
+    def __setattr__(self, attr, value):
+        if attr in self._PROXY_ATTRIBUTES:
+            object.__setattr__(self, attr, value)
+        else:
+            setattr(self.get(), attr, value)
@@ -0,0 +1,178 @@
+"""
+Link Token Allocation
+Public QR link tokens derived from a global sequence instead of random values:
+
+    token = base36(feistel_permutation(sequence_value)), 10 characters
+
+The permutation is a keyed 4-round Feistel network over 48 bits, so distinct
+sequence values always give distinct tokens (collision-free by construction)
+while consecutive codes still look unrelated. Tokens are lowercase base36 so
+they stay distinct under MySQL's case-insensitive collations, and their length
+(10) never matches the 12-character hex tokens issued before.
+
+LINK_TOKEN_KEY must never change once tokens have been issued: a new key
+yields a different permutation that can repeat earlier tokens. It and
+QR_TOKEN_SIGNING_KEY are dedicated secrets, separate from the JWT SECRET_KEY
+so that one can be rotated freely; outside development the app refuses to
+start without them.
+
+With QR_SIGNED_TOKENS on, a 6-character MAC (truncated HMAC-SHA256 under
+QR_TOKEN_SIGNING_KEY, ~31 bits) is appended to new tokens. token_acceptable()
+checks it statelessly, so forged and junk tokens are rejected before any
+database work; unsigned tokens issued earlier keep resolving unless
+QR_ACCEPT_UNSIGNED_TOKENS is turned off.
+"""
+import hashlib
+import hmac
+import re
+from typing import List
+from sqlalchemy import select, update
+from app.config import settings
+from app.database import SessionLocal, engine
+from app.models.id_sequence import IdSequence
+
+SEQUENCE_NAME = "link_token"
+DOMAIN_BITS = 48
+HALF_BITS = DOMAIN_BITS // 2
+HALF_MASK = (1 << HALF_BITS) - 1
+ROUNDS = 4  # Luby-Rackoff: 4 rounds of a keyed PRF give a strong pseudorandom permutation
+ALPHABET = "0123456789abcdefghijklmnopqrstuvwxyz"
+TOKEN_LENGTH = 10  # 36 ** 10 > 2 ** 48
+MAC_LENGTH = 6  # 36 ** 6 ~ 2 ** 31
+SIGNED_TOKEN = re.compile(f"[0-9a-z]{{{TOKEN_LENGTH + MAC_LENGTH}}}")
+# Unsigned formats already printed: random 12-hex tokens and plain sequence tokens
+UNSIGNED_TOKEN = re.compile(f"[0-9a-f]{{12}}|[0-9a-z]{{{TOKEN_LENGTH}}}")
+
+
+def _required_key(name: str) -> str:
+    value = getattr(settings, name)
+    if value:
+        return value
+    if settings.ENVIRONMENT != "development":
+        raise RuntimeError(f"{name} must be set (a dedicated secret, never changed once QR codes are printed)")
+    print(f"⚠️ {name} is not set; using a development-only key")
+    return f"development-{name.lower()}"
+
+
+_round_key = hashlib.sha256(f"link-token:{_required_key('LINK_TOKEN_KEY')}".encode()).digest()
+_mac_base = hmac.new(hashlib.sha256(f"link-token-mac:{_required_key('QR_TOKEN_SIGNING_KEY')}".encode()).digest(), digestmod=hashlib.sha256)
+
+
+def _round(round_index: int, value: int) -> int:
+    digest = hashlib.blake2b(bytes([round_index]) + value.to_bytes(3, "big"), key=_round_key, digest_size=3).digest()
+    return int.from_bytes(digest, "big")
+
+
+def permute(value: int) -> int:
+    """Keyed bijection on [0, 2**48)"""
+    if not 0 <= value < (1 << DOMAIN_BITS):
+        raise ValueError("Link token sequence exhausted")
+    left, right = value >> HALF_BITS, value & HALF_MASK
+    for round_index in range(ROUNDS):
+        left, right = right, left ^ _round(round_index, right)
+    return (left << HALF_BITS) | right
+
+
+# All two-character base36 strings, so encoding needs half the divmods
+_PAIRS = [a + b for a in ALPHABET for b in ALPHABET]
+
+
+def encode(value: int, length: int = TOKEN_LENGTH) -> str:
+    """Fixed-width lowercase base36 (length must be even)"""
+    pairs = []
+    for _ in range(length // 2):
+        value, pair = divmod(value, 1296)
+        pairs.append(_PAIRS[pair])
+    return "".join(reversed(pairs))
+
+
+def token_for(sequence_value: int) -> str:
+    token = encode(permute(sequence_value))
+    return sign(token) if settings.QR_SIGNED_TOKENS else token
+
+
+def mac(body: str) -> str:
+    signer = _mac_base.copy()
+    signer.update(body.encode())
+    return encode(int.from_bytes(signer.digest()[:4], "big") % (36 ** MAC_LENGTH), MAC_LENGTH)
+
+
+def sign(body: str) -> str:
+    return body + mac(body)
+
+
+def token_acceptable(token: str) -> bool:
+    """
+    Stateless pre-check for GET /api/qr/{token}: signed tokens must carry a
+    valid MAC (constant-time compare), unsigned ones must have a known shape
+    and are only accepted while QR_ACCEPT_UNSIGNED_TOKENS is on
+    """
+    if SIGNED_TOKEN.fullmatch(token):
+        body, given = token[:TOKEN_LENGTH], token[TOKEN_LENGTH:]
+        return hmac.compare_digest(mac(body), given)
+    return settings.QR_ACCEPT_UNSIGNED_TOKENS and UNSIGNED_TOKEN.fullmatch(token) is not None
+
+
+def tokens_for_range(start: int, count: int) -> List[str]:
+    """token_for over a range, with the Feistel rounds inlined (~2x faster for bulk runs)"""
+    if start < 0 or start + count > (1 << DOMAIN_BITS):
+        raise ValueError("Link token sequence exhausted")
+    blake2b = hashlib.blake2b
+    prefixes = [bytes([round_index]) for round_index in range(ROUNDS)]
+    tokens = []
+    for value in range(start, start + count):
+        left, right = value >> HALF_BITS, value & HALF_MASK
+        for prefix in prefixes:
+            digest = blake2b(prefix + right.to_bytes(3, "big"), key=_round_key, digest_size=3).digest()
+            left, right = right, left ^ int.from_bytes(digest, "big")
+        tokens.append(encode((left << HALF_BITS) | right))
+    if settings.QR_SIGNED_TOKENS:
+        tokens = [sign(token) for token in tokens]
+    return tokens
+
+
+def _reserve(executor, count: int) -> int:
+    """Advance the sequence by count on executor (Session or Connection); returns the first value"""
+    # The UPDATE row-locks the sequence until commit, so the read-back is ours alone
+    updated = executor.execute(
+        update(IdSequence).where(IdSequence.name == SEQUENCE_NAME).values(next_value=IdSequence.next_value + count)
+    ).rowcount
+    if not updated:
+        raise RuntimeError(f"Sequence '{SEQUENCE_NAME}' is missing from id_sequences")
+    next_value = executor.execute(
+        select(IdSequence.next_value).where(IdSequence.name == SEQUENCE_NAME)
+    ).scalar_one()
+    return next_value - count
+
+
+def allocate_link_tokens(count: int, connection=None) -> List[str]:
+    """
+    Reserve `count` sequence values and return their tokens
+
+    Like reserve_serials, the reservation is a short transaction of its own, so
+    the single id_sequences row is not locked while the caller inserts its
+    codes. Values reserved by an insert that later rolls back are skipped;
+    the gap is harmless, tokens only need to be distinct.
+
+    Args:
+        count: Number of tokens
+        connection: The caller's Session/Connection. Only used on SQLite, where
+            one write lock covers the whole database: a second transaction
+            could not proceed while the caller holds it, so the reservation
+            joins the caller's transaction instead.
+    """
+    if count < 1:
+        return []
+    if connection is not None and engine.dialect.name == "sqlite":
+        return tokens_for_range(_reserve(connection, count), count)
+
+    db = SessionLocal()
+    try:
+        start = _reserve(db, count)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+    return tokens_for_range(start, count)
@@ -0,0 +1,137 @@
+"""
+Streaming PDF Writer
+Minimal PDF 1.4 writer that emits objects in order and hands back the bytes
+produced so far, so finished pages can be sent (or spooled) before the rest of
+the document exists. Only what the QR label sheets need: Helvetica text,
+1-bit images, form XObjects and raw drawing operators.
+"""
+import zlib
+from typing import Dict, List, Optional
+
+CATALOG_ID = 1
+PAGES_ID = 2  # Written last, once every page is known
+FONT_ID = 3
+FONT_NAME = "Helvetica-Bold"
+
+
+def escape_text(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def encode_content(content: str) -> bytes:
+    """Content stream bytes in the font's WinAnsi (cp1252) encoding; unmappable characters become '?'"""
+    return content.encode("cp1252", errors="replace")
+
+
+def text_width(text: str, size: float) -> float:
+    from reportlab.pdfbase.pdfmetrics import stringWidth
+    return stringWidth(text, FONT_NAME, size)
+
+
+class StreamingPDFWriter:
+    """Append pages with add_page(); call drain() to collect the bytes written so far"""
+
+    def __init__(self, page_width: float, page_height: float):
+        self.page_width = page_width
+        self.page_height = page_height
+        self._chunks: List[bytes] = []
+        self._position = 0
+        self._offsets: Dict[int, int] = {}
+        self._next_id = FONT_ID + 1
+        self._page_ids: List[int] = []
+
+        self._write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+        self._write_object(CATALOG_ID, f"<< /Type /Catalog /Pages {PAGES_ID} 0 R >>".encode())
+        self._write_object(
+            FONT_ID,
+            f"<< /Type /Font /Subtype /Type1 /BaseFont /{FONT_NAME} /Encoding /WinAnsiEncoding >>".encode()
+        )
+
+    @property
+    def page_count(self) -> int:
+        return len(self._page_ids)
+
+    def _write(self, data: bytes):
+        self._chunks.append(data)
+        self._position += len(data)
+
+    def _allocate(self) -> int:
+        object_id = self._next_id
+        self._next_id += 1
+        return object_id
+
+    def _write_object(self, object_id: int, body: bytes, stream: Optional[bytes] = None):
+        self._offsets[object_id] = self._position
+        self._write(f"{object_id} 0 obj\n".encode())
+        self._write(body)
+        if stream is not None:
+            self._write(b"\nstream\n")
+            self._write(stream)
+            self._write(b"\nendstream")
+        self._write(b"\nendobj\n")
+
+    def add_object(self, body: bytes, stream: Optional[bytes] = None) -> int:
+        object_id = self._allocate()
+        self._write_object(object_id, body, stream)
+        return object_id
+
+    def add_gray_image(self, width: int, height: int, data: bytes, compressed: bool = False) -> int:
+        """1 bit per pixel DeviceGray image (1 = white), rows padded to whole bytes"""
+        if not compressed:
+            data = zlib.compress(data)
+        header = (
+            f"<< /Type /XObject /Subtype /Image /Width {width} /Height {height} "
+            f"/ColorSpace /DeviceGray /BitsPerComponent 1 /Interpolate false "
+            f"/Filter /FlateDecode /Length {len(data)} >>"
+        ).encode()
+        return self.add_object(header, data)
+
+    def add_form(self, width: float, height: float, content, xobjects: Optional[Dict[str, int]] = None,
+                 compressed: bool = False) -> int:
+        """Form XObject (reusable drawing) with the given bounding box and content stream"""
+        data = content if compressed else zlib.compress(encode_content(content))
+        resources = ""
+        if xobjects:
+            refs = " ".join(f"/{name} {object_id} 0 R" for name, object_id in xobjects.items())
+            resources = f" /Resources << /XObject << {refs} >> >>"
+        header = (
+            f"<< /Type /XObject /Subtype /Form /BBox [0 0 {width} {height}]{resources} "
+            f"/Filter /FlateDecode /Length {len(data)} >>"
+        ).encode()
+        return self.add_object(header, data)
+
+    def add_page(self, content: str, xobjects: Optional[Dict[str, int]] = None):
+        """Write a page whose content stream is `content` (PDF operators)"""
+        data = zlib.compress(encode_content(content))
+        content_id = self.add_object(f"<< /Filter /FlateDecode /Length {len(data)} >>".encode(), data)
+
+        resources = f"/Font << /F1 {FONT_ID} 0 R >>"
+        if xobjects:
+            refs = " ".join(f"/{name} {object_id} 0 R" for name, object_id in xobjects.items())
+            resources += f" /XObject << {refs} >>"
+
+        page_id = self.add_object((
+            f"<< /Type /Page /Parent {PAGES_ID} 0 R "
+            f"/MediaBox [0 0 {self.page_width:.4f} {self.page_height:.4f}] "
+            f"/Resources << {resources} >> /Contents {content_id} 0 R >>"
+        ).encode())
+        self._page_ids.append(page_id)
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+    def close(self) -> bytes:
+        """Write the page tree, xref table and trailer; returns the remaining bytes"""
+        kids = " ".join(f"{page_id} 0 R" for page_id in self._page_ids)
+        self._write_object(PAGES_ID, f"<< /Type /Pages /Kids [{kids}] /Count {len(self._page_ids)} >>".encode())
+
+        xref_offset = self._position
+        size = self._next_id
+        lines = [f"xref\n0 {size}\n", "0000000000 65535 f \n"]
+        for object_id in range(1, size):
+            lines.append(f"{self._offsets[object_id]:010d} 00000 n \n")
+        self._write("".join(lines).encode())
+        self._write(f"trailer\n<< /Size {size} /Root {CATALOG_ID} 0 R >>\nstartxref\n{xref_offset}\n%%EOF\n".encode())
+        return self.drain()
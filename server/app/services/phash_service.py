@@ -0,0 +1,115 @@
+"""
+Perceptual Hash Service
+64-bit dHash fingerprints for near-duplicate screenshot detection.
+
+Lookups use multi-index hashing: the hash is split into four 16-bit chunks,
+each stored in its own indexed column. Two hashes within Hamming distance
+k < 4 must agree exactly on at least one chunk (pigeonhole), so an indexed
+OR-lookup on the chunks returns every candidate without scanning the table.
+
+Unrelated screenshots of the same app screen can land a few bits apart, so
+only matches within PHASH_MAX_DISTANCE are rejected outright; matches up to
+PHASH_REVIEW_DISTANCE are accepted but never auto-approved.
+"""
+from typing import Dict, List, Optional, Tuple
+from PIL import Image, ImageOps
+from sqlalchemy import or_
+from app.config import settings
+
+CHUNKS = 4
+CHUNK_BITS = 16
+CHUNK_MASK = (1 << CHUNK_BITS) - 1
+
+
+class PerceptualHashService:
+    """Computes dHash fingerprints and finds stored near-duplicates"""
+
+    def __init__(self):
+        # Distances >= CHUNKS are not guaranteed to be found by the chunk index
+        self.max_distance = min(settings.PHASH_MAX_DISTANCE, CHUNKS - 1)
+        self.review_distance = max(min(settings.PHASH_REVIEW_DISTANCE, CHUNKS - 1), self.max_distance)
+
+    @staticmethod
+    def compute(image_path: str) -> int:
+        """dHash: compare adjacent pixels of a 9x8 grayscale thumbnail (64 bits)"""
+        with Image.open(image_path) as img:
+            img = ImageOps.exif_transpose(img).convert("L").resize((9, 8), Image.LANCZOS)
+            pixels = list(img.getdata())
+
+        value = 0
+        for row in range(8):
+            for col in range(8):
+                left = pixels[row * 9 + col]
+                right = pixels[row * 9 + col + 1]
+                value = (value << 1) | (1 if left > right else 0)
+        return value
+
+    @staticmethod
+    def chunks(value: int) -> List[int]:
+        return [(value >> (CHUNK_BITS * i)) & CHUNK_MASK for i in range(CHUNKS)]
+
+    @staticmethod
+    def hamming(a: int, b: int) -> int:
+        return bin(a ^ b).count("1")
+
+    def columns(self, value: int) -> Dict:
+        """Model column values for a fingerprint (phash hex + indexed chunks)"""
+        c0, c1, c2, c3 = self.chunks(value)
+        return {
+            "phash": f"{value:016x}",
+            "phash_0": c0,
+            "phash_1": c1,
+            "phash_2": c2,
+            "phash_3": c3
+        }
+
+    def find_closest(self, db, model, value: int, max_distance: Optional[int] = None, exclude_id: Optional[int] = None,
+                     filters: tuple = ()) -> Optional[Tuple[int, int]]:
+        """
+        Return (id, distance) of the `model` row (Reward or Reel) whose
+        fingerprint is closest to `value`, if within max_distance bits
+        (review_distance by default), else None. `filters` are extra
+        SQLAlchemy criteria on the candidate rows.
+        """
+        max_distance = self.review_distance if max_distance is None else min(max_distance, CHUNKS - 1)
+        c0, c1, c2, c3 = self.chunks(value)
+
+        query = db.query(model.id, model.phash).filter(or_(
+            model.phash_0 == c0,
+            model.phash_1 == c1,
+            model.phash_2 == c2,
+            model.phash_3 == c3
+        ))
+        if exclude_id is not None:
+            query = query.filter(model.id != exclude_id)
+        if filters:
+            query = query.filter(*filters)
+
+        closest = None
+        for candidate_id, candidate_phash in query.all():
+            if not candidate_phash:
+                continue
+            distance = self.hamming(value, int(candidate_phash, 16))
+            if distance <= max_distance and (closest is None or distance < closest[1]):
+                closest = (candidate_id, distance)
+        return closest
+
+    def find_near_duplicate(self, db, model, value: int, max_distance: Optional[int] = None):
+        """
+        Return the id of a `model` row whose fingerprint is within max_distance
+        bits of `value` (PHASH_MAX_DISTANCE by default), or None
+        """
+        closest = self.find_closest(db, model, value, self.max_distance if max_distance is None else max_distance)
+        return closest[0] if closest else None
+
+    def is_duplicate(self, distance: int) -> bool:
+        """Close enough to reject; farther matches within review_distance go to admin review"""
+        return distance <= self.max_distance
+
+    @staticmethod
+    def review_note(label: str, match_id: int, distance: int) -> str:
+        return f"Screenshot is a near-duplicate of {label} #{match_id} ({distance} bits apart); check before approving."
+
+
+# Create singleton instance
+phash_service = PerceptualHashService()
@@ -0,0 +1,396 @@
+"""
+QR Batch Jobs
+Creates a QR batch and renders its label sheet PDF in the background, so the
+admin request returns a job id immediately instead of holding the connection
+open for the whole run.
+
+A job has two phases: generating (batch + codes inserted and committed in one
+transaction) and rendering (PDF written to JOBS_DIR/qr_batches/<job_id>.pdf).
+State is checkpointed to JSON next to the artifact, so any worker process can
+report progress and serve the download. The batch row carries the job id and is
+committed with the codes, so a retried job finds them (even if it crashed
+before checkpointing the batch id) and only re-renders the PDF.
+
+A running job refreshes heartbeat_at in its checkpoint every HEARTBEAT_INTERVAL
+seconds. Retry leaves a job alone while another process's heartbeat is fresh,
+and at startup jobs whose owner stopped heartbeating are marked failed so they
+can be retried.
+"""
+import os
+import re
+import json
+import time
+import uuid
+import socket
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+from app.config import settings
+from app.database import SessionLocal
+from app.models.product import Product
+from app.models.qr_batch import QRBatch
+from app.models.qr_code import QRCode
+
+# Minimum seconds between progress checkpoints while a phase is running
+CHECKPOINT_INTERVAL = 1.0
+# Seconds between heartbeat checkpoints, and after which a silent job counts as orphaned
+HEARTBEAT_INTERVAL = 10.0
+STALE_AFTER = timedelta(seconds=60)
+
+ACTIVE_STATUSES = ("queued", "generating", "rendering")
+
+# Identifies this worker process in checkpoints
+OWNER = f"{socket.gethostname()}:{os.getpid()}"
+
+
+class QRBatchJob:
+    """One batch generation + PDF rendering run"""
+
+    def __init__(self, product_id: int, quantity: int, job_id: Optional[str] = None):
+        self.job_id = job_id or uuid.uuid4().hex[:12]
+        self.product_id = product_id
+        self.quantity = quantity
+
+        self.status = "queued"  # queued, generating, rendering, completed, error
+        self.batch_id = None
+        self.batch_number = None
+        self.serial_start = None
+        self.serial_end = None
+        self.codes_inserted = 0
+        self.pages_total = 0
+        self.pages_rendered = 0
+        self.artifact_bytes = 0
+        self.filename = None
+        self.error = None
+        self.created_at = datetime.utcnow()
+        self.started_at = None
+        self.finished_at = None
+        self.owner = None
+        self.heartbeat_at = None
+
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self._last_checkpoint = 0.0
+
+    # --- Checkpointing ---
+
+    @staticmethod
+    def _path(job_id: str, extension: str) -> str:
+        if not re.fullmatch(r"[A-Za-z0-9_-]{1,64}", job_id):
+            raise ValueError(f"Invalid job id: {job_id}")
+        return os.path.join(settings.JOBS_DIR, "qr_batches", f"{job_id}.{extension}")
+
+    @classmethod
+    def checkpoint_path(cls, job_id: str) -> str:
+        return cls._path(job_id, "json")
+
+    @classmethod
+    def artifact_path(cls, job_id: str) -> str:
+        return cls._path(job_id, "pdf")
+
+    def to_dict(self) -> Dict:
+        with self._lock:
+            return {
+                "job_id": self.job_id,
+                "status": self.status,
+                "product_id": self.product_id,
+                "quantity": self.quantity,
+                "batch_id": self.batch_id,
+                "batch_number": self.batch_number,
+                "serial_start": self.serial_start,
+                "serial_end": self.serial_end,
+                "codes_inserted": self.codes_inserted,
+                "pages_total": self.pages_total,
+                "pages_rendered": self.pages_rendered,
+                "artifact_bytes": self.artifact_bytes,
+                "filename": self.filename,
+                "error": self.error,
+                "created_at": self.created_at.isoformat(),
+                "started_at": self.started_at.isoformat() if self.started_at else None,
+                "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+                "owner": self.owner,
+                "heartbeat_at": self.heartbeat_at.isoformat() if self.heartbeat_at else None
+            }
+
+    def is_orphaned(self) -> bool:
+        """Marked active but its owner has stopped heartbeating (crashed or restarted)"""
+        if self.status not in ACTIVE_STATUSES:
+            return False
+        return self.heartbeat_at is None or datetime.utcnow() - self.heartbeat_at > STALE_AFTER
+
+    def save_checkpoint(self, force: bool = True):
+        now = time.monotonic()
+        if not force and now - self._last_checkpoint < CHECKPOINT_INTERVAL:
+            return
+        self._last_checkpoint = now
+        path = self.checkpoint_path(self.job_id)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with self._save_lock:  # the heartbeat thread saves too
+            self._update(heartbeat_at=datetime.utcnow())
+            with open(tmp_path, "w") as f:
+                json.dump(self.to_dict(), f, indent=2)
+            os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, job_id: str) -> "QRBatchJob":
+        """Rebuild a job from its checkpoint file"""
+        with open(cls.checkpoint_path(job_id)) as f:
+            data = json.load(f)
+        job = cls(product_id=data["product_id"], quantity=data["quantity"], job_id=data["job_id"])
+        for field in ("status", "batch_id", "batch_number", "serial_start", "serial_end", "codes_inserted",
+                      "pages_total", "pages_rendered", "artifact_bytes", "filename", "error"):
+            setattr(job, field, data[field])
+        job.owner = data.get("owner")
+        for field in ("created_at", "started_at", "finished_at", "heartbeat_at"):
+            setattr(job, field, datetime.fromisoformat(data[field]) if data.get(field) else None)
+        return job
+
+    def _update(self, **fields):
+        with self._lock:
+            for name, value in fields.items():
+                setattr(self, name, value)
+
+    # --- Execution ---
+
+    def _adopt(self, batch: QRBatch):
+        self._update(
+            batch_id=batch.id,
+            batch_number=batch.batch_number,
+            serial_start=batch.serial_start,
+            serial_end=batch.serial_end,
+            codes_inserted=batch.quantity
+        )
+        self.save_checkpoint()
+
+    def _generate(self):
+        """Create the batch (marked with this job's id) and its codes in one transaction"""
+        from app.services.qr_generation import generate_codes, reserve_serials
+        from app.services.serial_bitmap import serial_bitmaps
+
+        self._update(status="generating", codes_inserted=0)
+        self.save_checkpoint()
+
+        db = SessionLocal()
+        try:
+            product = db.query(Product).filter(Product.id == self.product_id).first()
+            if not product:
+                raise ValueError("Product not found")
+
+            # An earlier run committed the codes but died before checkpointing the batch id
+            committed = db.query(QRBatch).filter(QRBatch.job_id == self.job_id).first()
+            if committed:
+                self._adopt(committed)
+                print(f"🔄 QR batch job {self.job_id}: batch #{committed.batch_number} was already committed")
+                return
+
+            serial_start, batch_number = reserve_serials(self.product_id, self.quantity, batch=True)
+            batch = QRBatch(
+                product_id=self.product_id,
+                batch_number=batch_number,
+                quantity=self.quantity,
+                serial_start=serial_start,
+                serial_end=serial_start + self.quantity - 1,
+                job_id=self.job_id
+            )
+            db.add(batch)
+            db.flush()
+
+            def on_progress(inserted: int):
+                self._update(codes_inserted=inserted)
+                self.save_checkpoint(force=False)
+
+            generate_codes(db, self.product_id, self.quantity, batch_id=batch.id, serial_start=serial_start, on_progress=on_progress)
+            db.commit()
+            serial_bitmaps.mark_issued(self.product_id, serial_start, self.quantity)
+            self._adopt(batch)
+            print(f"✅ QR batch job {self.job_id}: batch #{batch.batch_number} with {self.quantity} codes committed")
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def _render(self):
+        """Write the batch's label sheet to the artifact path (atomically)"""
+        from app.services.qr_service import qr_service
+
+        db = SessionLocal()
+        try:
+            product = db.query(Product).filter(Product.id == self.product_id).first()
+            if not product:
+                raise ValueError("Product not found")
+            rows = db.query(QRCode.link_token, QRCode.serial_number).filter(
+                QRCode.batch_id == self.batch_id
+            ).order_by(QRCode.serial_number.asc()).all()
+            product_name = product.name
+            qr_data = qr_service.label_data(product, rows)
+        finally:
+            db.close()
+
+        codes_per_page = 24  # iter_bulk_pdf's default 4 x 6 grid
+        pages_per_chunk = settings.QR_PDF_PAGES_PER_CHUNK
+        self._update(
+            status="rendering",
+            pages_total=-(-len(qr_data) // codes_per_page),
+            pages_rendered=0,
+            filename=f"QR_{len(qr_data)}_{product_name.replace(' ', '_')}.pdf"
+        )
+        self.save_checkpoint()
+
+        batch_info = {"number": self.batch_number, "serial_start": self.serial_start, "serial_end": self.serial_end}
+        path = self.artifact_path(self.job_id)
+        tmp_path = f"{path}.tmp"
+        written = 0
+        try:
+            with open(tmp_path, "wb") as f:
+                for chunk in qr_service.iter_bulk_pdf(qr_data, product_name, batch_info):
+                    f.write(chunk)
+                    written += len(chunk)
+                    # iter_bulk_pdf yields every QR_PDF_PAGES_PER_CHUNK pages
+                    self._update(pages_rendered=min(self.pages_total, self.pages_rendered + pages_per_chunk))
+                    self.save_checkpoint(force=False)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        self._update(pages_rendered=self.pages_total, artifact_bytes=written)
+
+    def _heartbeat(self, done: threading.Event):
+        while not done.wait(HEARTBEAT_INTERVAL):
+            try:
+                self.save_checkpoint()
+            except OSError as e:
+                print(f"⚠️ QR batch job {self.job_id} heartbeat failed: {str(e)}")
+
+    def run(self):
+        self._update(error=None, started_at=datetime.utcnow(), finished_at=None, owner=OWNER)
+        done = threading.Event()
+        threading.Thread(target=self._heartbeat, args=(done,), name=f"qr-batch-heartbeat-{self.job_id}", daemon=True).start()
+        try:
+            if self.batch_id is None:
+                self._generate()
+            self._render()
+            self._update(status="completed", finished_at=datetime.utcnow())
+            print(f"✅ QR batch job {self.job_id} completed: {self.pages_total} pages, {self.artifact_bytes // 1024} KB")
+        except Exception as e:
+            self._update(status="error", error=str(e), finished_at=datetime.utcnow())
+            print(f"❌ QR batch job {self.job_id} failed: {str(e)}")
+        finally:
+            done.set()
+            self.save_checkpoint()
+        return self.to_dict()
+
+
+class QRBatchJobService:
+    """Runs QR batch jobs on a small thread pool and looks them up by id"""
+
+    def __init__(self, num_workers: Optional[int] = None):
+        self.num_workers = num_workers or settings.QR_BATCH_JOB_WORKERS
+        self._jobs: Dict[str, QRBatchJob] = {}
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def submit(self, job: QRBatchJob) -> QRBatchJob:
+        with self._lock:
+            running = self._jobs.get(job.job_id)
+            if running and running.status not in ("completed", "error"):
+                return running
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.num_workers, thread_name_prefix="qr-batch-job")
+            self._jobs[job.job_id] = job
+        job._update(status="queued", error=None, owner=OWNER)
+        job.save_checkpoint()
+        self._pool.submit(self._run, job)
+        self.prune()
+        return job
+
+    def _run(self, job: QRBatchJob):
+        try:
+            job.run()
+        finally:
+            # Finished jobs are served from their checkpoint
+            with self._lock:
+                if self._jobs.get(job.job_id) is job:
+                    del self._jobs[job.job_id]
+
+    def retry(self, job_id: str) -> QRBatchJob:
+        """
+        Re-run a failed (or orphaned) job; codes already committed are not
+        generated again. A job still heartbeating in any process is returned as is.
+        """
+        job = self._jobs.get(job_id)
+        if job:
+            return job
+        job = QRBatchJob.load(job_id)
+        if job.status == "completed" or (job.status in ACTIVE_STATUSES and not job.is_orphaned()):
+            return job
+        return self.submit(job)
+
+    def recover(self):
+        """Mark jobs left active by a crashed or restarted worker as failed (retry resumes them)"""
+        directory = os.path.join(settings.JOBS_DIR, "qr_batches")
+        failed = 0
+        for name in os.listdir(directory) if os.path.isdir(directory) else []:
+            if not name.endswith(".json"):
+                continue
+            try:
+                job = QRBatchJob.load(name[:-len(".json")])
+            except (OSError, ValueError, KeyError):
+                continue
+            if job.job_id in self._jobs or not job.is_orphaned():
+                continue
+            job._update(status="error", error="Interrupted by a worker restart; retry to resume", finished_at=datetime.utcnow())
+            job.save_checkpoint()
+            failed += 1
+        if failed:
+            print(f"🔄 Marked {failed} interrupted QR batch jobs as failed")
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        """Progress of a job (live if running in this process, else from its checkpoint)"""
+        job = self._jobs.get(job_id)
+        if job:
+            return job.to_dict()
+        try:
+            return QRBatchJob.load(job_id).to_dict()
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def artifact(self, job_id: str) -> Optional[str]:
+        """Path of the finished PDF, or None if the job has not completed"""
+        progress = self.get(job_id)
+        if not progress or progress["status"] != "completed":
+            return None
+        path = QRBatchJob.artifact_path(job_id)
+        return path if os.path.exists(path) else None
+
+    def prune(self):
+        """Delete checkpoints and artifacts of jobs older than QR_BATCH_JOB_RETENTION_DAYS"""
+        directory = os.path.join(settings.JOBS_DIR, "qr_batches")
+        cutoff = time.time() - timedelta(days=settings.QR_BATCH_JOB_RETENTION_DAYS).total_seconds()
+        removed = 0
+        for name in os.listdir(directory) if os.path.isdir(directory) else []:
+            path = os.path.join(directory, name)
+            job_id = name.split(".", 1)[0]
+            try:
+                active = job_id in self._jobs and self._jobs[job_id].status not in ("completed", "error")
+                if os.path.getmtime(path) < cutoff and not active:
+                    os.remove(path)
+                    removed += 1
+            except OSError:
+                continue
+        if removed:
+            print(f"🧹 Removed {removed} expired QR batch job files")
+
+    def shutdown(self):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+
+# Create singleton instance
+qr_batch_jobs = QRBatchJobService()
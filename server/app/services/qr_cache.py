@@ -0,0 +1,123 @@
+"""
+QR Resolution Cache
+In-process LRU + TTL cache mapping a QR link_token to what GET /api/qr/{token}
+needs (code, is_used and a product snapshot), so repeat scans skip the reads.
+
+Entries are invalidated when a reward claims or frees the code and when an admin
+edits the product. Each worker process has its own cache; the TTL bounds how
+long another process's change can go unnoticed.
+"""
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Optional, Set
+from app.config import settings
+from app.schemas.product import ProductResponse
+
+
+@dataclass(frozen=True)
+class QRResolution:
+    qr_id: int
+    code: str
+    serial_number: Optional[int]
+    is_used: bool
+    product_id: int
+    batch_id: Optional[int]
+    product: Optional[ProductResponse]
+
+
+class QRResolutionCache:
+    """Thread-safe LRU of link_token -> QRResolution with per-entry expiry"""
+
+    def __init__(self, max_entries: Optional[int] = None, ttl_seconds: Optional[float] = None):
+        self.max_entries = max_entries or settings.QR_CACHE_MAX_ENTRIES
+        self.ttl = settings.QR_CACHE_TTL_SECONDS if ttl_seconds is None else ttl_seconds
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()  # token -> (expires_at, QRResolution)
+        self._by_code: Dict[str, str] = {}
+        self._by_product: Dict[int, Set[str]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, token: str) -> Optional[QRResolution]:
+        if not settings.QR_CACHE_ENABLED:
+            return None
+        with self._lock:
+            cached = self._entries.get(token)
+            if cached is None:
+                self.misses += 1
+                return None
+            expires_at, resolution = cached
+            if expires_at < time.monotonic():
+                self._remove(token)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(token)
+            self.hits += 1
+            return resolution
+
+    def put(self, token: str, qr, product) -> QRResolution:
+        """Snapshot a QRCode row (and its Product, may be None) and cache it"""
+        resolution = QRResolution(
+            qr_id=qr.id,
+            code=qr.code,
+            serial_number=qr.serial_number,
+            is_used=bool(qr.is_used),
+            product_id=qr.product_id,
+            batch_id=qr.batch_id,
+            product=ProductResponse.model_validate(product) if product else None
+        )
+        if not settings.QR_CACHE_ENABLED:
+            return resolution
+
+        with self._lock:
+            self._remove(token)
+            self._entries[token] = (time.monotonic() + self.ttl, resolution)
+            self._by_code[resolution.code] = token
+            self._by_product.setdefault(resolution.product_id, set()).add(token)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+        return resolution
+
+    def invalidate_token(self, token: Optional[str]):
+        with self._lock:
+            self._remove(token)
+
+    def invalidate_code(self, code: Optional[str]):
+        """Drop the entry for a coupon code (claimed or freed)"""
+        with self._lock:
+            self._remove(self._by_code.get(code))
+
+    def invalidate_product(self, product_id: int):
+        """Drop every entry whose product snapshot belongs to product_id"""
+        with self._lock:
+            for token in list(self._by_product.get(product_id, ())):
+                self._remove(token)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_code.clear()
+            self._by_product.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+    def _remove(self, token: Optional[str]):
+        cached = self._entries.pop(token, None) if token else None
+        if cached is None:
+            return
+        resolution = cached[1]
+        if self._by_code.get(resolution.code) == token:
+            del self._by_code[resolution.code]
+        tokens = self._by_product.get(resolution.product_id)
+        if tokens:
+            tokens.discard(token)
+            if not tokens:
+                del self._by_product[resolution.product_id]
+
+
+# Create singleton instance
+qr_cache = QRResolutionCache()
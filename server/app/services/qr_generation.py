@@ -0,0 +1,138 @@
+"""
+Bulk QR Code Generation
+Creates codes for large print runs (100k+) set-based instead of row by row:
+random claim codes from `secrets`, de-duplicated in memory, collision-checked
+against the table with one IN query per chunk, and inserted with executemany in
+chunks. Link tokens come from the link_token sequence (see link_tokens.py).
+
+Serials and batch numbers are reserved from product_serial_counters in a short
+transaction of their own, so concurrent runs for one product never overlap.
+Numbers reserved by a run that later rolls back are skipped, not reused.
+"""
+import secrets
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Set, Tuple
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+from app.config import settings
+from app.database import SessionLocal
+from app.models.qr_code import QRCode
+from app.models.qr_batch import QRBatch
+from app.models.product_serial_counter import ProductSerialCounter
+
+CODE_BYTES = 6  # 12 hex characters, same shape as the existing claim codes
+
+
+def _random_values(count: int, upper: bool) -> Set[str]:
+    values = set()
+    while len(values) < count:
+        value = secrets.token_hex(CODE_BYTES)
+        values.add(value.upper() if upper else value)
+    return values
+
+
+def _unique_values(db, column, count: int, upper: bool) -> List[str]:
+    """`count` random values that do not exist in `column` yet"""
+    chunk_size = settings.QR_GENERATION_CHUNK_SIZE
+    accepted: Set[str] = set()
+    while len(accepted) < count:
+        candidates = _random_values(count - len(accepted), upper) - accepted
+        candidate_list = list(candidates)
+        for start in range(0, len(candidate_list), chunk_size):
+            chunk = candidate_list[start:start + chunk_size]
+            taken = db.query(column).filter(column.in_(chunk)).all()
+            candidates.difference_update(value for (value,) in taken)
+        accepted.update(candidates)
+    return list(accepted)
+
+
+def _seed_counter(db, product_id: int):
+    """Create a product's counter row from its current maximums (once per product)"""
+    last_serial = db.query(func.max(QRCode.serial_number)).filter(QRCode.product_id == product_id).scalar()
+    last_batch = db.query(func.max(QRBatch.batch_number)).filter(QRBatch.product_id == product_id).scalar()
+    db.add(ProductSerialCounter(
+        product_id=product_id,
+        next_serial=(last_serial or 0) + 1,
+        next_batch_number=(last_batch or 0) + 1
+    ))
+    try:
+        db.commit()
+    except IntegrityError:
+        # Another worker seeded it first
+        db.rollback()
+
+
+def reserve_serials(product_id: int, count: int, batch: bool = False) -> Tuple[int, Optional[int]]:
+    """
+    Atomically reserve `count` consecutive serials (and one batch number if `batch`)
+
+    Returns:
+        (first serial, batch number or None)
+    """
+    counter = ProductSerialCounter
+    values = {counter.next_serial: counter.next_serial + count, counter.updated_at: datetime.utcnow()}
+    if batch:
+        values[counter.next_batch_number] = counter.next_batch_number + 1
+
+    db = SessionLocal()
+    try:
+        for _ in range(2):
+            # The UPDATE row-locks the counter until commit, so the read-back is ours alone
+            updated = db.query(counter).filter(counter.product_id == product_id).update(values, synchronize_session=False)
+            if updated:
+                next_serial, next_batch_number = db.query(
+                    counter.next_serial, counter.next_batch_number
+                ).filter(counter.product_id == product_id).one()
+                db.commit()
+                return next_serial - count, (next_batch_number - 1) if batch else None
+            db.rollback()
+            _seed_counter(db, product_id)
+        raise RuntimeError(f"Could not reserve serials for product {product_id}")
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def generate_codes(
+    db,
+    product_id: int,
+    quantity: int,
+    batch_id: Optional[int] = None,
+    serial_start: Optional[int] = None,
+    on_progress: Optional[Callable[[int], None]] = None
+) -> List[Dict]:
+    """
+    Insert `quantity` new QR codes for a product (caller commits).
+    on_progress is called with the number of rows inserted so far after each chunk.
+
+    Returns:
+        The inserted rows as dicts (code, link_token, serial_number, ...), in serial order
+    """
+    if serial_start is None:
+        serial_start, _ = reserve_serials(product_id, quantity)
+
+    from app.services.link_tokens import allocate_link_tokens
+
+    codes = _unique_values(db, QRCode.code, quantity, upper=True)
+    link_tokens = allocate_link_tokens(quantity, db)  # collision-free, no lookups
+
+    created_at = datetime.utcnow()
+    rows = [{
+        "product_id": product_id,
+        "batch_id": batch_id,
+        "code": code,
+        "link_token": link_token,
+        "serial_number": serial_start + i,
+        "scan_count": 0,
+        "is_used": False,
+        "created_at": created_at
+    } for i, (code, link_token) in enumerate(zip(codes, link_tokens))]
+
+    chunk_size = settings.QR_GENERATION_CHUNK_SIZE
+    for start in range(0, len(rows), chunk_size):
+        db.bulk_insert_mappings(QRCode, rows[start:start + chunk_size])
+        if on_progress:
+            on_progress(min(start + chunk_size, len(rows)))
+    return rows
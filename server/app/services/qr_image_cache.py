@@ -0,0 +1,55 @@
+"""
+QR Image Cache
+Disk-backed, size-bounded LRU of rendered QR PNGs. Files are content-addressed:
+the name is a hash of (payload, size, error correction, render version), so the
+same name always means the same bytes and doubles as a strong ETag.
+
+LRU bookkeeping lives in DiskLRUCache.
+"""
+import hashlib
+from typing import Optional, Tuple
+from app.config import settings
+from app.services.disk_cache import DiskLRUCache
+
+# Bump when generate_qr_image output changes so old files stop matching
+RENDER_VERSION = 1
+
+
+class QRImageCache(DiskLRUCache):
+    """LRU of rendered QR PNGs stored under one directory"""
+
+    def __init__(self, directory: Optional[str] = None, max_bytes: Optional[int] = None):
+        super().__init__(
+            directory or settings.QR_IMAGE_CACHE_DIR,
+            max_bytes or settings.QR_IMAGE_CACHE_MAX_BYTES,
+            extension=".png",
+            label="QR image cache"
+        )
+
+    def enabled(self) -> bool:
+        return settings.QR_IMAGE_CACHE_ENABLED
+
+    @staticmethod
+    def key(payload: str, size: Optional[int], error_correction: str) -> str:
+        raw = f"{RENDER_VERSION}\0{payload}\0{size or ''}\0{error_correction}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def etag(self, key: str) -> str:
+        return f'"{key}"'
+
+    def get_or_render(self, payload: str, size: Optional[int] = None, error_correction: str = "H") -> Tuple[str, bytes]:
+        """Return (key, PNG bytes), rendering and storing the image on a miss"""
+        key = self.key(payload, size, error_correction)
+        data = self.read(key)
+        if data is not None:
+            return key, data
+
+        from app.services.qr_service import qr_service
+
+        data = qr_service.generate_qr_image(payload, size=size, error_correction=error_correction).getvalue()
+        self.write(key, data)
+        return key, data
+
+
+# Create singleton instance
+qr_image_cache = QRImageCache()
@@ -0,0 +1,165 @@
+"""
+QR Label Sheet PDF Cache
+Finished label sheets are stored under QR_PDF_CACHE_DIR/artifacts, keyed by a
+hash of everything that ends up on the page (render mode, grid and every
+code's URL and label). Re-downloading a batch, serial range or product sheet
+whose codes have not changed is a file send; the first download streams the
+sheet page by page and writes it to the cache as it goes.
+
+Encoding the QR codes is the expensive part of rendering, so the encoded
+images are also cached one page (24 labels) at a time under .../pages. A new
+sheet that shares pages with an earlier one (a sub-range of a batch, a
+product's whole history after a new batch) only encodes the pages it has not
+seen. Page objects themselves are not reusable across files (PDF object ids
+are per file), so cached pages are re-assembled, which is cheap.
+"""
+import hashlib
+import marshal
+import os
+from typing import BinaryIO, Dict, Iterator, List, Tuple
+from app.config import settings
+from app.services.disk_cache import DiskLRUCache
+
+# Bump when iter_bulk_pdf's layout or the QR encoding changes so old files stop matching
+PDF_RENDER_VERSION = 1
+
+
+class _PDFDiskCache(DiskLRUCache):
+    def enabled(self) -> bool:
+        return settings.QR_PDF_CACHE_ENABLED
+
+
+class QRPDFCache:
+    """Cached label sheet artifacts plus per-page encoded QR images"""
+
+    def __init__(self):
+        self.artifacts = _PDFDiskCache(
+            os.path.join(settings.QR_PDF_CACHE_DIR, "artifacts"),
+            settings.QR_PDF_CACHE_MAX_BYTES,
+            extension=".pdf",
+            label="QR PDF cache"
+        )
+        self.pages = _PDFDiskCache(
+            os.path.join(settings.QR_PDF_CACHE_DIR, "pages"),
+            settings.QR_PDF_PAGE_CACHE_MAX_BYTES,
+            extension=".bin",
+            label="QR PDF page cache"
+        )
+
+    @staticmethod
+    def artifact_key(qr_codes: List[Tuple[str, str, str]], cols: int = 4, rows: int = 6) -> str:
+        """Content hash of a label sheet (render mode, grid, every URL and label in order)"""
+        digest = hashlib.sha256(f"{PDF_RENDER_VERSION}\0{settings.QR_PDF_RENDER_MODE}\0{cols}x{rows}\0".encode("utf-8"))
+        for _, url, label in qr_codes:
+            digest.update(f"{url}\t{label}\n".encode("utf-8"))
+        return digest.hexdigest()
+
+    @staticmethod
+    def page_key(urls: List[str], mode: str) -> str:
+        raw = f"{PDF_RENDER_VERSION}\0{mode}\0{marshal.version}\0" + "\n".join(urls)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def stats(self) -> Dict:
+        return {"artifacts": self.artifacts.stats(), "pages": self.pages.stats()}
+
+    def encoded(self, urls: List[str], mode: str, codes_per_page: int, chunk_size: int) -> Iterator[Tuple[int, bytes]]:
+        """
+        Same output as qr_service.render_images, served page by page from the
+        cache; runs of uncached pages are encoded together on the render pool
+        """
+        from app.services.qr_service import qr_service
+
+        if not self.pages.enabled():
+            yield from qr_service.render_images(urls, chunk_size, mode)
+            return
+
+        pages = [urls[i:i + codes_per_page] for i in range(0, len(urls), codes_per_page)]
+        keys = [self.page_key(page, mode) for page in pages]
+        index = 0
+        while index < len(pages):
+            items = self._read_page(keys[index])
+            if items is not None:
+                yield from items
+                index += 1
+                continue
+
+            end = index + 1
+            while end < len(pages) and not os.path.exists(self.pages.path(keys[end])):
+                end += 1
+            rendered = qr_service.render_images([url for page in pages[index:end] for url in page], chunk_size, mode)
+            for page_index in range(index, end):
+                items = [next(rendered) for _ in pages[page_index]]
+                self.pages.write(keys[page_index], marshal.dumps(items))
+                yield from items
+            index = end
+
+    def _read_page(self, key: str):
+        data = self.pages.read(key)
+        if data is None:
+            return None
+        try:
+            return marshal.loads(data)
+        except (EOFError, ValueError, TypeError):
+            return None
+
+    @staticmethod
+    def _send(f: BinaryIO, chunk_size: int = 1024 * 1024) -> Iterator[bytes]:
+        """Stream an already-open cached file (it stays readable even if evicted meanwhile)"""
+        with f:
+            while True:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    return
+                yield chunk
+
+    def _render_through(self, key: str, qr_codes: List[Tuple[str, str, str]], product_name: str, batch_info: dict = None) -> Iterator[bytes]:
+        """
+        Yield the label sheet as iter_bulk_pdf produces it while writing the same
+        chunks to a temp file, moved into the cache once the sheet is complete
+        (dropped if rendering fails or the client goes away)
+        """
+        from app.services.qr_service import qr_service
+
+        temp_path = self.artifacts.temp_path(key)
+        complete = False
+        try:
+            with open(temp_path, "wb") as f:
+                for chunk in qr_service.iter_bulk_pdf(qr_codes, product_name, batch_info):
+                    f.write(chunk)
+                    yield chunk
+            complete = True
+        finally:
+            if complete and self.artifacts.store(key, temp_path):
+                print(f"✅ QR PDF cached: {len(qr_codes)} labels")
+            elif os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    async def pdf_response(self, qr_codes: List[Tuple[str, str, str]], product_name: str, filename: str, batch_info: dict = None):
+        """
+        Send the cached label sheet; on a miss stream it page by page (same
+        time to first byte as uncached) and store it for the next download
+        """
+        from fastapi.responses import StreamingResponse
+        from app.services.qr_service import qr_service
+
+        if not settings.QR_PDF_CACHE_ENABLED:
+            return await qr_service.pdf_response(qr_codes, product_name, filename, batch_info=batch_info)
+
+        key = self.artifact_key(qr_codes)
+        headers = {
+            "ETag": f'"{key}"',
+            "Content-Disposition": f'attachment; filename="{filename}"',
+            "Access-Control-Expose-Headers": "Content-Disposition"
+        }
+        cached = self.artifacts.open(key)
+        if cached:
+            headers["Content-Length"] = str(os.fstat(cached.fileno()).st_size)
+            return StreamingResponse(self._send(cached), media_type="application/pdf", headers=headers)
+        return StreamingResponse(
+            self._render_through(key, qr_codes, product_name, batch_info),
+            media_type="application/pdf",
+            headers=headers
+        )
+
+# Create singleton instance
+qr_pdf_cache = QRPDFCache()
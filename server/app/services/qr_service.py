@@ -2,39 +2,118 @@
 QR Code Generation Service
 Handles QR code image generation and PDF export
 """
-import qrcode
 from io import BytesIO
-from reportlab.lib.pagesizes import A4
-from reportlab.pdfgen import canvas
-from reportlab.lib.units import mm
-from reportlab.lib.utils import ImageReader
-from typing import List, Tuple
+from collections import deque
+from typing import Iterator, List, Optional, Tuple
 from app.config import settings
 import os
+import re
+import zlib
+import tempfile
+import threading
 from datetime import datetime
 
+# Page geometry in points (same values as reportlab.lib.pagesizes.A4 / units.mm)
+MM = 72 / 25.4
+A4_SIZE = (210 * MM, 297 * MM)
+
+
+# qrcode.constants values, kept here so callers don't need the qrcode import
+ERROR_CORRECTION_LEVELS = {"L": 1, "M": 0, "Q": 3, "H": 2}
+
+# Shared patterns drawn once per document as form XObjects (module units, y up)
+FINDER_PATTERN = "0 0 7 7 re 1 1 5 5 re f* 2 2 3 3 re f"
+ALIGNMENT_PATTERN = "0 0 5 5 re 1 1 3 3 re f* 2 2 1 1 re f"
+
+
+def render_qr_chunk(urls: List[str], mode: str = "image") -> List[Tuple[int, bytes]]:
+    """
+    Process-pool task: encode each URL and return (modules per side, Flate-compressed
+    data) - 1-bit image rows in "image" mode, a form XObject content stream in "vector" mode
+    """
+    rendered = []
+    for url in urls:
+        matrix = QRCodeService.qr_matrix(url)
+        if mode == "vector":
+            data = QRCodeService.vector_commands(matrix).encode("latin-1")
+        else:
+            data = QRCodeService.pack_matrix(matrix)
+        rendered.append((len(matrix), zlib.compress(data)))
+    return rendered
+
 
 class QRCodeService:
     """Service for generating QR code images and PDFs"""
     
     def __init__(self):
         self.base_url = settings.FRONTEND_URL.rstrip('/')
+        self._pool = None
+        self._pool_lock = threading.Lock()
+
+    def _render_pool(self):
+        """Process pool for QR encoding, created on first large batch"""
+        if self._pool is None:
+            with self._pool_lock:
+                if self._pool is None:
+                    import multiprocessing
+                    from concurrent.futures import ProcessPoolExecutor
+                    # spawn: forking a process that runs worker threads is not safe
+                    self._pool = ProcessPoolExecutor(
+                        max_workers=settings.QR_RENDER_WORKERS,
+                        mp_context=multiprocessing.get_context("spawn")
+                    )
+                    print(f"✅ QR render pool started ({settings.QR_RENDER_WORKERS} processes)")
+        return self._pool
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def render_images(self, urls: List[str], chunk_size: int, mode: str = "image") -> Iterator[Tuple[int, bytes]]:
+        """
+        Yield rendered QR images in input order. Large batches are encoded in
+        chunks across the process pool with a bounded number of chunks in flight
+        """
+        chunks = [urls[i:i + chunk_size] for i in range(0, len(urls), chunk_size)]
+        if len(urls) < settings.QR_RENDER_PARALLEL_MIN or settings.QR_RENDER_WORKERS <= 1:
+            for chunk in chunks:
+                yield from render_qr_chunk(chunk, mode)
+            return
+
+        pool = self._render_pool()
+        in_flight = deque()
+        next_chunk = 0
+        try:
+            while next_chunk < len(chunks) or in_flight:
+                while next_chunk < len(chunks) and len(in_flight) < settings.QR_RENDER_WORKERS * 2:
+                    in_flight.append(pool.submit(render_qr_chunk, chunks[next_chunk], mode))
+                    next_chunk += 1
+                yield from in_flight.popleft().result()
+        finally:
+            # Client went away / error: drop the work that is still queued
+            for future in in_flight:
+                future.cancel()
     
-    def generate_qr_image(self, url: str, size: int = 300) -> BytesIO:
+    def generate_qr_image(self, url: str, size: Optional[int] = None, error_correction: str = "H") -> BytesIO:
         """
         Generate QR code image from a raw URL
         
         Args:
             url: The exact URL to embed in the QR
-            size: Image size in pixels
+            size: Image width/height in pixels (default: 10 pixels per module)
+            error_correction: Error correction level, one of L, M, Q, H
             
         Returns:
             BytesIO object containing PNG image
         """
+        import qrcode
+        from PIL import Image
+
         # Create QR code instance
         qr = qrcode.QRCode(
             version=1,
-            error_correction=qrcode.constants.ERROR_CORRECT_H,
+            error_correction=ERROR_CORRECTION_LEVELS[error_correction],
             box_size=10,
             border=4,
         )
@@ -42,9 +121,16 @@ class QRCodeService:
         # Add data
         qr.add_data(url)
         qr.make(fit=True)
+
+        if size:
+            # Whole pixels per module, then scale to the exact size without smoothing
+            modules = qr.modules_count + 2 * qr.border
+            qr.box_size = max(1, size // modules)
         
         # Create image
-        img = qr.make_image(fill_color="black", back_color="white")
+        img = qr.make_image(fill_color="black", back_color="white").get_image()
+        if size and img.size != (size, size):
+            img = img.resize((size, size), Image.NEAREST)
         
         # Save to BytesIO
         buffer = BytesIO()
@@ -53,29 +139,124 @@ class QRCodeService:
         
         return buffer
     
-    def generate_bulk_pdf(
-        self, 
-        qr_codes: List[Tuple[str, str, str]], 
+    @staticmethod
+    def qr_matrix(url: str) -> List[List[bool]]:
+        """QR modules (True = dark) including the 4-module quiet zone"""
+        import qrcode
+
+        qr = qrcode.QRCode(
+            version=1,
+            error_correction=qrcode.constants.ERROR_CORRECT_H,
+            box_size=1,
+            border=4,
+        )
+        qr.add_data(url)
+        qr.make(fit=True)
+        return qr.get_matrix()
+
+    @staticmethod
+    def pack_matrix(matrix: List[List[bool]]) -> bytes:
+        """Pack modules as 1-bit gray rows (1 = white), each row padded to whole bytes"""
+        width = len(matrix[0])
+        padding = "0" * (-width % 8)
+        row_bytes = (width + 7) // 8
+        return b"".join(
+            int("".join("0" if dark else "1" for dark in row) + padding, 2).to_bytes(row_bytes, "big")
+            for row in matrix
+        )
+
+    @staticmethod
+    def vector_commands(matrix: List[List[bool]]) -> str:
+        """
+        Content stream drawing the dark modules as rectangles in module units.
+        Finder and alignment patterns are not drawn here but placed as the
+        shared /Fp and /Ap forms; the remaining modules of each row are merged
+        into horizontal runs and filled as one path.
+        """
+        from qrcode.util import pattern_position
+
+        side = len(matrix)
+        border = 4
+        size = side - 2 * border
+        version = (size - 17) // 4
+        skip = [[False] * side for _ in range(side)]
+        placements = []
+
+        def reserve(top: int, left: int, extent: int, form: str):
+            for row in range(top, top + extent):
+                for col in range(left, left + extent):
+                    skip[row][col] = True
+            placements.append(f"q 1 0 0 1 {left} {side - top - extent} cm /{form} Do Q")
+
+        # Finder patterns: top-left, top-right, bottom-left
+        for top, left in ((0, 0), (0, size - 7), (size - 7, 0)):
+            reserve(border + top, border + left, 7, "Fp")
+
+        # Alignment patterns (none overlap the finders' 8x8 corners)
+        positions = pattern_position(version)
+        for row in positions:
+            for col in positions:
+                if (row < 9 and col < 9) or (row < 9 and col > size - 9) or (row > size - 9 and col < 9):
+                    continue
+                reserve(border + row - 2, border + col - 2, 5, "Ap")
+
+        runs = []
+        for row_index, row in enumerate(matrix):
+            y = side - 1 - row_index
+            col = 0
+            while col < side:
+                if row[col] and not skip[row_index][col]:
+                    start = col
+                    while col < side and row[col] and not skip[row_index][col]:
+                        col += 1
+                    runs.append(f"{start} {y} {col - start} 1 re")
+                else:
+                    col += 1
+
+        return "\n".join(runs + ["f"] + placements)
+
+    @staticmethod
+    def label_data(product, rows) -> List[Tuple[str, str, str]]:
+        """
+        (link_token, url, label) tuples for the label sheet
+        
+        Args:
+            product: Product the codes belong to
+            rows: Iterable of (link_token, serial_number) pairs
+        """
+        # URL format: /p/product-slug/link-token (link_token instead of the claim code)
+        base_url = settings.FRONTEND_URL.rstrip('/')
+        product_slug = re.sub(r'[^a-z0-9]+', '-', product.name.lower()).strip('-')
+        sku = (product.sku_prefix or "QR").upper()
+        return [
+            (link_token, f"{base_url}/p/{product_slug}/{link_token}", f"{sku}-{serial_number:02d}")
+            for link_token, serial_number in rows
+        ]
+
+    def iter_bulk_pdf(
+        self,
+        qr_codes: List[Tuple[str, str, str]],
         product_name: str,
         batch_info: dict = None,
         cols: int = 4,
         rows: int = 6
-    ) -> BytesIO:
+    ) -> Iterator[bytes]:
         """
-        Generate PDF with QR codes in grid layout
+        Yield the label sheet PDF in pieces, a few finished pages at a time
         
         Args:
-            qr_codes: List of (code, url) tuples
+            qr_codes: List of (code, url, label) tuples
             product_name: Product name to display
             batch_info: Metadata about the batch (number, date, etc.)
             cols: Number of columns (default 4)
             rows: Number of rows (default 6)
         """
-        buffer = BytesIO()
-        c = canvas.Canvas(buffer, pagesize=A4)
-        width, height = A4
+        from app.services.pdf_writer import StreamingPDFWriter, escape_text, text_width
+
+        width, height = A4_SIZE
+        pdf = StreamingPDFWriter(width, height)
         
-        margin = 15 * mm
+        margin = 15 * MM
         usable_width = width - (2 * margin)
         usable_height = height - (2 * margin)
         
@@ -84,47 +265,111 @@ class QRCodeService:
         
         # QR code size
         qr_size = min(cell_width, cell_height) * 0.65
+        scan_width = text_width("SCAN", 11)
         
         codes_per_page = cols * rows
-        total_pages = (len(qr_codes) + codes_per_page - 1) // codes_per_page
+        pages_per_chunk = settings.QR_PDF_PAGES_PER_CHUNK
         
-        for page in range(total_pages):
-            if page > 0:
-                c.showPage()
-            
-            # 2. Grid Placement
-            start_idx = page * codes_per_page
-            end_idx = min(start_idx + codes_per_page, len(qr_codes))
-            
-            for idx in range(start_idx, end_idx):
-                code, url, label = qr_codes[idx]
-                
-                grid_idx = idx - start_idx
+        from app.services.qr_pdf_cache import qr_pdf_cache
+
+        mode = settings.QR_PDF_RENDER_MODE
+        # Encoded images come from the per-page cache; only unseen pages go to the render pool
+        images = qr_pdf_cache.encoded([url for _, url, _ in qr_codes], mode, codes_per_page, codes_per_page * pages_per_chunk)
+        if mode == "vector":
+            shared_forms = {
+                "Fp": pdf.add_form(7, 7, FINDER_PATTERN),
+                "Ap": pdf.add_form(5, 5, ALIGNMENT_PATTERN)
+            }
+        
+        for start_idx in range(0, len(qr_codes), codes_per_page):
+            # Grid Placement
+            content = []
+            xobjects = {}
+            for grid_idx, (code, url, label) in enumerate(qr_codes[start_idx:start_idx + codes_per_page]):
                 col = grid_idx % cols
                 row = grid_idx // cols
                 
                 x = margin + (col * cell_width) + (cell_width - qr_size) / 2
-                y = height - margin - ((row + 1) * cell_height) + (cell_height - qr_size) / 2 + 5*mm
+                y = height - margin - ((row + 1) * cell_height) + (cell_height - qr_size) / 2 + 5*MM
+                center = x + qr_size / 2
                 
-                # Draw "SCAN" above QR
-                c.setFont("Helvetica-Bold", 11)
-                c.drawCentredString(x + qr_size / 2, y + qr_size + 1*mm, "SCAN")
+                # "SCAN" above QR
+                content.append(f"BT /F1 11 Tf {center - scan_width / 2:.2f} {y + qr_size + 1*MM:.2f} Td (SCAN) Tj ET")
                 
-                # Draw QR image
-                qr_img = self.generate_qr_image(url)
-                c.drawImage(ImageReader(qr_img), x, y, width=qr_size, height=qr_size, preserveAspectRatio=True)
+                # QR code (encoded in order by the render pool)
+                side, qr_data = next(images)
+                name = f"Qr{grid_idx}"
+                if mode == "vector":
+                    # Form in module units, scaled onto the label
+                    xobjects[name] = pdf.add_form(side, side, qr_data, shared_forms, compressed=True)
+                    scale = qr_size / side
+                    content.append(f"q {scale:.4f} 0 0 {scale:.4f} {x:.2f} {y:.2f} cm /{name} Do Q")
+                else:
+                    xobjects[name] = pdf.add_gray_image(side, side, qr_data, compressed=True)
+                    content.append(f"q {qr_size:.2f} 0 0 {qr_size:.2f} {x:.2f} {y:.2f} cm /{name} Do Q")
                 
-                # Draw SKU-Serial below QR
-                text_y = y - 5*mm
-                c.setFont("Helvetica-Bold", 12)
-                c.drawCentredString(x + qr_size / 2, text_y, label)
-                
-                # End of cell
+                # SKU-Serial below QR
+                content.append(
+                    f"BT /F1 12 Tf {center - text_width(label, 12) / 2:.2f} {y - 5*MM:.2f} Td ({escape_text(label)}) Tj ET"
+                )
+            
+            pdf.add_page("\n".join(content), xobjects)
+            if pdf.page_count % pages_per_chunk == 0:
+                yield pdf.drain()
         
-        c.save()
+        yield pdf.close()
+
+    def generate_bulk_pdf(
+        self, 
+        qr_codes: List[Tuple[str, str, str]], 
+        product_name: str,
+        batch_info: dict = None,
+        cols: int = 4,
+        rows: int = 6
+    ) -> BytesIO:
+        """Generate the whole label sheet PDF in memory (small batches only)"""
+        buffer = BytesIO()
+        for chunk in self.iter_bulk_pdf(qr_codes, product_name, batch_info, cols, rows):
+            buffer.write(chunk)
         buffer.seek(0)
         return buffer
 
+    def spool_bulk_pdf(self, qr_codes: List[Tuple[str, str, str]], product_name: str, batch_info: dict = None) -> str:
+        """Render the label sheet PDF to a temp file and return its path (caller deletes it)"""
+        with tempfile.NamedTemporaryFile(prefix="qr_", suffix=".pdf", dir=settings.QR_PDF_SPOOL_DIR, delete=False) as spool:
+            try:
+                for chunk in self.iter_bulk_pdf(qr_codes, product_name, batch_info):
+                    spool.write(chunk)
+            except BaseException:
+                spool.close()
+                os.remove(spool.name)
+                raise
+        return spool.name
+
+    async def pdf_response(self, qr_codes: List[Tuple[str, str, str]], product_name: str, filename: str, batch_info: dict = None):
+        """
+        Stream the label sheet to the client page by page; batches above
+        QR_PDF_SPOOL_THRESHOLD are spooled to a temp file first (sent with
+        Content-Length, deleted after sending)
+        """
+        from fastapi.concurrency import run_in_threadpool
+        from fastapi.responses import FileResponse, StreamingResponse
+        from starlette.background import BackgroundTask
+
+        headers = {
+            "Content-Disposition": f'attachment; filename="{filename}"',
+            "Access-Control-Expose-Headers": "Content-Disposition"
+        }
+        if len(qr_codes) > settings.QR_PDF_SPOOL_THRESHOLD:
+            path = await run_in_threadpool(self.spool_bulk_pdf, qr_codes, product_name, batch_info)
+            return FileResponse(path, media_type="application/pdf", headers=headers, background=BackgroundTask(os.remove, path))
+
+        return StreamingResponse(
+            self.iter_bulk_pdf(qr_codes, product_name, batch_info),
+            media_type="application/pdf",
+            headers=headers
+        )
+
 
 # Create singleton instance
 qr_service = QRCodeService()
@@ -0,0 +1,283 @@
+"""
+Bulk AI Re-verification Service
+Re-runs autonomous_verification over a filtered set of rewards (e.g. after an
+OpenAI outage) with bounded concurrency, token-bucket pacing and checkpoints.
+Only real model calls take a token; AI cache hits are not paced.
+"""
+import os
+import re
+import json
+import time
+import uuid
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Optional
+from app.config import settings
+from app.database import SessionLocal
+from app.models.reward import Reward
+from app.models.qr_code import QRCode
+
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate_per_minute` sustained, up to `burst` at once"""
+
+    def __init__(self, rate_per_minute: float, burst: Optional[int] = None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = burst or max(1, int(rate_per_minute // 60) or 1)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a token is available"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class ReverificationJob:
+    """One re-verification run. State is checkpointed to JSON so it can resume."""
+
+    def __init__(
+        self,
+        statuses: Optional[List[str]] = None,
+        date_from: Optional[datetime] = None,
+        date_to: Optional[datetime] = None,
+        product_id: Optional[int] = None,
+        concurrency: Optional[int] = None,
+        rate_per_minute: Optional[int] = None,
+        job_id: Optional[str] = None
+    ):
+        self.job_id = job_id or uuid.uuid4().hex[:12]
+        self.statuses = statuses or ["failed", "pending"]
+        self.date_from = date_from
+        self.date_to = date_to
+        self.product_id = product_id
+        self.concurrency = concurrency or settings.REVERIFY_CONCURRENCY
+        self.rate_per_minute = rate_per_minute or settings.AI_RATE_LIMIT_RPM
+
+        self.status = "created"  # created, running, completed, cancelled, error
+        self.total = 0
+        self.processed = 0
+        self.outcomes = {"approved": 0, "pending": 0, "rejected": 0, "failed": 0}
+        self.last_reward_id = 0  # Checkpoint cursor: every id <= this has been handled
+        self.error = None
+        self.started_at = None
+        self.updated_at = None
+
+        self._cancel = threading.Event()
+        self._lock = threading.Lock()
+
+    # --- Checkpointing ---
+
+    @staticmethod
+    def checkpoint_path(job_id: str) -> str:
+        if not re.fullmatch(r"[A-Za-z0-9_-]{1,64}", job_id):
+            raise ValueError(f"Invalid job id: {job_id}")
+        return os.path.join(settings.JOBS_DIR, "reverify", f"{job_id}.json")
+
+    def to_dict(self) -> Dict:
+        with self._lock:
+            return {
+                "job_id": self.job_id,
+                "status": self.status,
+                "filters": {
+                    "statuses": self.statuses,
+                    "date_from": self.date_from.isoformat() if self.date_from else None,
+                    "date_to": self.date_to.isoformat() if self.date_to else None,
+                    "product_id": self.product_id
+                },
+                "concurrency": self.concurrency,
+                "rate_per_minute": self.rate_per_minute,
+                "total": self.total,
+                "processed": self.processed,
+                "remaining": max(0, self.total - self.processed),
+                "outcomes": dict(self.outcomes),
+                "last_reward_id": self.last_reward_id,
+                "error": self.error,
+                "started_at": self.started_at.isoformat() if self.started_at else None,
+                "updated_at": self.updated_at.isoformat() if self.updated_at else None
+            }
+
+    def save_checkpoint(self):
+        path = self.checkpoint_path(self.job_id)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.to_dict(), f, indent=2)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, job_id: str) -> "ReverificationJob":
+        """Rebuild a job from its checkpoint file"""
+        with open(cls.checkpoint_path(job_id)) as f:
+            data = json.load(f)
+        filters = data["filters"]
+        job = cls(
+            statuses=filters["statuses"],
+            date_from=datetime.fromisoformat(filters["date_from"]) if filters["date_from"] else None,
+            date_to=datetime.fromisoformat(filters["date_to"]) if filters["date_to"] else None,
+            product_id=filters["product_id"],
+            concurrency=data["concurrency"],
+            rate_per_minute=data["rate_per_minute"],
+            job_id=data["job_id"]
+        )
+        job.status = data["status"]
+        job.total = data["total"]
+        job.processed = data["processed"]
+        job.outcomes = data["outcomes"]
+        job.last_reward_id = data["last_reward_id"]
+        job.started_at = datetime.fromisoformat(data["started_at"]) if data["started_at"] else None
+        return job
+
+    # --- Execution ---
+
+    def _query(self, db):
+        query = db.query(Reward.id).filter(
+            Reward.status == "pending",
+            Reward.ai_analysis_status.in_(self.statuses)
+        )
+        if self.date_from:
+            query = query.filter(Reward.created_at >= self.date_from)
+        if self.date_to:
+            query = query.filter(Reward.created_at <= self.date_to)
+        if self.product_id:
+            product_codes = db.query(QRCode.code).filter(QRCode.product_id == self.product_id)
+            query = query.filter(Reward.coupon_code.in_(product_codes))
+        return query
+
+    def count_remaining(self) -> int:
+        db = SessionLocal()
+        try:
+            return self._query(db).filter(Reward.id > self.last_reward_id).count()
+        finally:
+            db.close()
+
+    def cancel(self):
+        self._cancel.set()
+
+    def _verify_one(self, bucket: TokenBucket, reward_id: int) -> str:
+        from app.services.verification_worker import verification_worker
+
+        db = SessionLocal()
+        try:
+            reward = db.query(Reward).filter(Reward.id == reward_id).first()
+            if not reward or reward.status != "pending":
+                return "pending"
+            reward.ai_analysis_status = "queued"
+            db.commit()
+        finally:
+            db.close()
+
+        try:
+            verification_worker.process(reward_id, before_model_call=bucket.acquire)
+        except Exception as e:
+            print(f"❌ Re-verification error for Reward #{reward_id}: {str(e)}")
+
+        db = SessionLocal()
+        try:
+            reward = db.query(Reward).filter(Reward.id == reward_id).first()
+            if reward.ai_analysis_status == "failed":
+                return "failed"
+            return reward.status if reward.status in ("approved", "rejected") else "pending"
+        finally:
+            db.close()
+
+    def run(self, on_progress=None):
+        """Process matching rewards in id order, checkpointing after every chunk"""
+        self.status = "running"
+        self.started_at = self.started_at or datetime.utcnow()
+        self.updated_at = datetime.utcnow()
+        self.total = self.processed + self.count_remaining()
+        self.save_checkpoint()
+        print(f"🔁 Re-verification job {self.job_id}: {self.total - self.processed} rewards to process")
+
+        bucket = TokenBucket(self.rate_per_minute)
+        chunk_size = self.concurrency * 4
+
+        try:
+            with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix=f"reverify-{self.job_id}") as pool:
+                while not self._cancel.is_set():
+                    db = SessionLocal()
+                    try:
+                        chunk = [row.id for row in self._query(db).filter(
+                            Reward.id > self.last_reward_id
+                        ).order_by(Reward.id.asc()).limit(chunk_size).all()]
+                    finally:
+                        db.close()
+
+                    if not chunk:
+                        break
+
+                    for outcome in pool.map(lambda rid: self._verify_one(bucket, rid), chunk):
+                        with self._lock:
+                            self.processed += 1
+                            self.outcomes[outcome] = self.outcomes.get(outcome, 0) + 1
+
+                    with self._lock:
+                        self.last_reward_id = chunk[-1]
+                        self.updated_at = datetime.utcnow()
+                    self.save_checkpoint()
+                    if on_progress:
+                        on_progress(self.to_dict())
+
+            self.status = "cancelled" if self._cancel.is_set() else "completed"
+        except Exception as e:
+            self.status = "error"
+            self.error = str(e)
+            print(f"❌ Re-verification job {self.job_id} failed: {str(e)}")
+        finally:
+            self.updated_at = datetime.utcnow()
+            self.save_checkpoint()
+
+        print(f"✅ Re-verification job {self.job_id} {self.status}: {self.processed}/{self.total} {self.outcomes}")
+        return self.to_dict()
+
+
+class ReverificationService:
+    """Tracks re-verification jobs started from the admin API"""
+
+    def __init__(self):
+        self._jobs: Dict[str, ReverificationJob] = {}
+        self._lock = threading.Lock()
+
+    def start(self, job: ReverificationJob) -> ReverificationJob:
+        with self._lock:
+            running = self._jobs.get(job.job_id)
+            if running and running.status == "running":
+                return running
+            self._jobs[job.job_id] = job
+        threading.Thread(target=job.run, name=f"reverify-{job.job_id}", daemon=True).start()
+        return job
+
+    def resume(self, job_id: str) -> ReverificationJob:
+        return self.start(ReverificationJob.load(job_id))
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        """Progress of a job (live if running in this process, else from its checkpoint)"""
+        job = self._jobs.get(job_id)
+        if job:
+            return job.to_dict()
+        try:
+            return ReverificationJob.load(job_id).to_dict()
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def cancel(self, job_id: str) -> bool:
+        job = self._jobs.get(job_id)
+        if not job:
+            return False
+        job.cancel()
+        return True
+
+
+# Create singleton instance
+reverification_service = ReverificationService()
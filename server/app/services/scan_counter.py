@@ -0,0 +1,151 @@
+"""
+Write-Behind QR Scan Counters
+Scans are counted in memory and flushed periodically as a single
+UPDATE ... SET scan_count = scan_count + CASE id ... END statement per chunk,
+so a scan storm turns into a few writes per second instead of one commit per scan.
+"""
+import threading
+from datetime import datetime
+from typing import Dict, Optional
+from sqlalchemy import case, func, update
+from app.config import settings
+from app.database import SessionLocal
+from app.models.qr_code import QRCode
+
+
+class ScanCounterBuffer:
+    """Aggregates scan increments per QR code and flushes them in batches"""
+
+    def __init__(self, flush_interval: Optional[float] = None):
+        self.flush_interval = flush_interval or settings.SCAN_FLUSH_INTERVAL
+        self.batch_size = settings.SCAN_FLUSH_BATCH_SIZE
+        self._pending: Dict[int, list] = {}  # qr_id -> [count, last_scanned_at]
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self.flushed_scans = 0
+        self.flush_count = 0
+        self.last_flush_at = None
+        self.last_error = None
+
+    def record(self, qr_id: int, scanned_at: Optional[datetime] = None):
+        scanned_at = scanned_at or datetime.utcnow()
+        with self._lock:
+            entry = self._pending.get(qr_id)
+            if entry is None:
+                self._pending[qr_id] = [1, scanned_at]
+            else:
+                entry[0] += 1
+                if scanned_at > entry[1]:
+                    entry[1] = scanned_at
+            backlog = len(self._pending)
+        if backlog >= self.batch_size:
+            self._wake.set()
+
+    def pending(self, qr_id: int) -> int:
+        """Scans of qr_id not yet written to the database"""
+        with self._lock:
+            entry = self._pending.get(qr_id)
+            return entry[0] if entry else 0
+
+    def stats(self) -> Dict:
+        with self._lock:
+            pending_codes = len(self._pending)
+            pending_scans = sum(entry[0] for entry in self._pending.values())
+        return {
+            "pending_codes": pending_codes,
+            "pending_scans": pending_scans,
+            "flushed_scans": self.flushed_scans,
+            "flushes": self.flush_count,
+            "last_flush_at": self.last_flush_at.isoformat() if self.last_flush_at else None,
+            "last_error": self.last_error
+        }
+
+    def start(self):
+        if self._thread:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="scan-counter-flush", daemon=True)
+        self._thread.start()
+        print(f"✅ Scan counter flusher started (every {self.flush_interval}s)")
+
+    def stop(self, timeout: float = 5.0):
+        self._stop.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout=timeout)
+            self._thread = None
+        # Final flush so no scans are lost on a clean shutdown
+        self.flush()
+        stats = self.stats()
+        if stats["pending_scans"]:
+            print(f"⚠️ {stats['pending_scans']} QR scans on {stats['pending_codes']} codes were not flushed: {self.last_error}")
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+    def flush(self) -> int:
+        """Write all pending increments; returns the number of scans written"""
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, {}
+            if not batch:
+                return 0
+
+            items = list(batch.items())
+            written = 0
+            db = SessionLocal()
+            try:
+                for start in range(0, len(items), self.batch_size):
+                    chunk = dict(items[start:start + self.batch_size])
+                    db.execute(
+                        update(QRCode)
+                        .where(QRCode.id.in_(chunk.keys()))
+                        .values(
+                            scan_count=func.coalesce(QRCode.scan_count, 0) + case(
+                                {qr_id: entry[0] for qr_id, entry in chunk.items()}, value=QRCode.id, else_=0
+                            ),
+                            last_scanned_at=case(
+                                {qr_id: entry[1] for qr_id, entry in chunk.items()}, value=QRCode.id,
+                                else_=QRCode.last_scanned_at
+                            )
+                        )
+                        .execution_options(synchronize_session=False)
+                    )
+                    db.commit()
+                    written += sum(entry[0] for entry in chunk.values())
+                    for qr_id in chunk:
+                        del batch[qr_id]
+                self.last_error = None
+            except Exception as e:
+                db.rollback()
+                self.last_error = str(e)
+                print(f"❌ Scan counter flush failed, will retry: {str(e)}")
+                self._merge_back(batch)
+            finally:
+                db.close()
+
+            self.flushed_scans += written
+            self.flush_count += 1
+            self.last_flush_at = datetime.utcnow()
+            return written
+
+    def _merge_back(self, batch: Dict[int, list]):
+        """Return unwritten increments to the buffer (new scans may have arrived meanwhile)"""
+        with self._lock:
+            for qr_id, (count, scanned_at) in batch.items():
+                entry = self._pending.get(qr_id)
+                if entry is None:
+                    self._pending[qr_id] = [count, scanned_at]
+                else:
+                    entry[0] += count
+                    entry[1] = max(entry[1], scanned_at)
+
+
+# Create singleton instance
+scan_counter = ScanCounterBuffer()
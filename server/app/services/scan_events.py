@@ -0,0 +1,177 @@
+"""
+QR Scan Event Log
+resolve_qr_code only appends a tuple to an in-memory ring buffer; a background
+thread classifies the events and bulk-inserts them into qr_scan_events.
+When the buffer is full the oldest events are dropped (and counted) rather
+than slowing down scans.
+"""
+import ipaddress
+import re
+import threading
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+from sqlalchemy import insert
+from app.config import settings
+from app.database import SessionLocal
+from app.models.qr_scan_event import QRScanEvent
+
+BOT_PATTERN = re.compile(r"bot|crawl|spider|preview|facebookexternalhit|whatsapp|curl|python-requests", re.I)
+IOS_PATTERN = re.compile(r"iphone|ipad|ipod", re.I)
+DESKTOP_PATTERN = re.compile(r"windows nt|macintosh|x11|cros", re.I)
+
+
+def classify_user_agent(user_agent: Optional[str]) -> str:
+    if not user_agent:
+        return "other"
+    if BOT_PATTERN.search(user_agent):
+        return "bot"
+    if "android" in user_agent.lower():
+        return "android"
+    if IOS_PATTERN.search(user_agent):
+        return "ios"
+    if DESKTOP_PATTERN.search(user_agent):
+        return "desktop"
+    return "other"
+
+
+def ip_prefix(ip: Optional[str]) -> Optional[str]:
+    """Truncate to /24 (IPv4) or /48 (IPv6) so no full client address is stored"""
+    try:
+        address = ipaddress.ip_address(ip)
+    except (TypeError, ValueError):
+        return None
+    prefix = 24 if address.version == 4 else 48
+    return str(ipaddress.ip_network(f"{address}/{prefix}", strict=False))
+
+
+class ScanEventLog:
+    """Ring buffer of raw scan events drained by a bulk-insert thread"""
+
+    def __init__(self):
+        self.buffer_size = settings.SCAN_EVENT_BUFFER_SIZE
+        self.batch_size = settings.SCAN_EVENT_BATCH_SIZE
+        self.flush_interval = settings.SCAN_EVENT_FLUSH_INTERVAL
+        self._events = deque(maxlen=self.buffer_size)
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._last_prune = None
+        self.dropped = 0
+        self.written = 0
+        self.last_error = None
+
+    def record(self, link_token: str, qr_code_id: int, product_id: Optional[int], batch_id: Optional[int],
+               user_agent: Optional[str], client_ip: Optional[str]):
+        if not settings.SCAN_EVENTS_ENABLED:
+            return
+        if len(self._events) == self.buffer_size:
+            self.dropped += 1
+        self._events.append((datetime.utcnow(), link_token, qr_code_id, product_id, batch_id, user_agent, client_ip))
+        if len(self._events) >= self.batch_size:
+            self._wake.set()
+
+    def stats(self) -> Dict:
+        return {
+            "buffered": len(self._events),
+            "written": self.written,
+            "dropped": self.dropped,
+            "last_error": self.last_error
+        }
+
+    def start(self):
+        if self._thread or not settings.SCAN_EVENTS_ENABLED:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="scan-event-log", daemon=True)
+        self._thread.start()
+        print(f"✅ Scan event log started (buffer {self.buffer_size}, batch {self.batch_size})")
+
+    def stop(self, timeout: float = 5.0):
+        self._stop.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout=timeout)
+            self._thread = None
+        self.flush()
+        if self._events:
+            print(f"⚠️ {len(self._events)} QR scan events were not written: {self.last_error}")
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+            self._maybe_prune()
+
+    def flush(self) -> int:
+        """Bulk-insert everything buffered so far; returns rows written"""
+        written = 0
+        with self._flush_lock:
+            while self._events:
+                batch = []
+                while self._events and len(batch) < self.batch_size:
+                    batch.append(self._events.popleft())
+
+                rows = [{
+                    "scan_day": scanned_at.date(),
+                    "scanned_at": scanned_at,
+                    "link_token": link_token,
+                    "qr_code_id": qr_code_id,
+                    "product_id": product_id,
+                    "batch_id": batch_id,
+                    "user_agent_class": classify_user_agent(user_agent),
+                    "ip_prefix": ip_prefix(client_ip)
+                } for scanned_at, link_token, qr_code_id, product_id, batch_id, user_agent, client_ip in batch]
+
+                db = SessionLocal()
+                try:
+                    db.execute(insert(QRScanEvent), rows)
+                    db.commit()
+                    written += len(rows)
+                    self.last_error = None
+                except Exception as e:
+                    db.rollback()
+                    self.last_error = str(e)
+                    print(f"❌ Scan event insert failed, will retry: {str(e)}")
+                    # Put the batch back in front; if newer events filled the buffer, drop the oldest
+                    space = self.buffer_size - len(self._events)
+                    kept = batch[-space:] if space > 0 else []
+                    self.dropped += len(batch) - len(kept)
+                    self._events.extendleft(reversed(kept))
+                    break
+                finally:
+                    db.close()
+
+        self.written += written
+        return written
+
+    def _maybe_prune(self):
+        """Once a day, delete whole days older than SCAN_EVENT_RETENTION_DAYS"""
+        if settings.SCAN_EVENT_RETENTION_DAYS <= 0:
+            return
+        today = datetime.utcnow().date()
+        if self._last_prune == today:
+            return
+        self._last_prune = today
+        self.prune(today - timedelta(days=settings.SCAN_EVENT_RETENTION_DAYS))
+
+    def prune(self, before_day) -> int:
+        db = SessionLocal()
+        try:
+            deleted = db.query(QRScanEvent).filter(QRScanEvent.scan_day < before_day).delete(synchronize_session=False)
+            db.commit()
+            if deleted:
+                print(f"🧹 Pruned {deleted} QR scan events before {before_day}")
+            return deleted
+        except Exception as e:
+            db.rollback()
+            print(f"⚠️ Could not prune QR scan events: {str(e)}")
+            return 0
+        finally:
+            db.close()
+
+
+# Create singleton instance
+scan_event_log = ScanEventLog()
@@ -0,0 +1,247 @@
+"""
+QR Serial Bitmaps
+Per-product bitmaps indexed by serial_number, one bit per serial for each
+state: issued, scanned and used (~37 KB for a product with 100,000 codes).
+The scan path checks "used" without a query, and batch listings count scanned
+and used labels with bit operations instead of SQL.
+
+Rebuilt from qr_codes at startup and every SERIAL_BITMAP_REFRESH_SECONDS, and
+updated in place when this process issues, scans, claims or frees a code. Each
+worker process has its own copy. Another process's claim or rejection reaches
+the "used" bit when the scan path reads the row again (QR cache miss, so within
+QR_CACHE_TTL_SECONDS) and everything else on the next rebuild. Claims themselves
+are still decided by the qr_codes row, so a stale bit can only affect the scan
+page and statistics.
+"""
+import threading
+import time
+from typing import Dict, Optional
+from app.config import settings
+from app.database import SessionLocal
+from app.models.qr_code import QRCode
+
+STATES = ("issued", "scanned", "used")
+
+
+class ProductSerialBitmap:
+    """Issued/scanned/used bits for one product's serials (bit s of each bytearray = serial s)"""
+
+    def __init__(self):
+        self.bits: Dict[str, bytearray] = {state: bytearray() for state in STATES}
+
+    @property
+    def nbytes(self) -> int:
+        return sum(len(bits) for bits in self.bits.values())
+
+    def _grow(self, serial: int):
+        size = (serial >> 3) + 1
+        for bits in self.bits.values():
+            if len(bits) < size:
+                bits.extend(bytes(size - len(bits)))
+
+    def get(self, state: str, serial: int) -> bool:
+        bits = self.bits[state]
+        index = serial >> 3
+        return index < len(bits) and bool(bits[index] & (1 << (serial & 7)))
+
+    def set(self, state: str, serial: int, value: bool = True):
+        self._grow(serial)
+        if value:
+            self.bits[state][serial >> 3] |= 1 << (serial & 7)
+        else:
+            self.bits[state][serial >> 3] &= ~(1 << (serial & 7)) & 0xFF
+
+    def set_range(self, state: str, serial_start: int, count: int):
+        """Set count consecutive bits from serial_start (whole bytes at a time)"""
+        if count <= 0:
+            return
+        serial_end = serial_start + count - 1
+        self._grow(serial_end)
+        bits = self.bits[state]
+        first, last = serial_start >> 3, serial_end >> 3
+        if first == last:
+            bits[first] |= ((1 << count) - 1) << (serial_start & 7)
+            return
+        bits[first] |= (0xFF << (serial_start & 7)) & 0xFF
+        bits[first + 1:last] = b"\xff" * (last - first - 1)
+        bits[last] |= (1 << ((serial_end & 7) + 1)) - 1
+
+    def _window(self, state: str, serial_start: int, serial_end: int) -> int:
+        """Bits serial_start..serial_end as an int (bit 0 = serial_start)"""
+        bits = self.bits[state]
+        first = serial_start >> 3
+        value = int.from_bytes(bits[first:(serial_end >> 3) + 1], "little") >> (serial_start & 7)
+        return value & ((1 << (serial_end - serial_start + 1)) - 1)
+
+    def usage(self, serial_start: int, serial_end: int) -> Dict[str, int]:
+        """Counts of issued, scanned and used serials in an inclusive range"""
+        if serial_end < serial_start:
+            return {state: 0 for state in STATES}
+        return {state: self._window(state, serial_start, serial_end).bit_count() for state in STATES}
+
+    def total(self) -> Dict[str, int]:
+        return {state: int.from_bytes(bits, "little").bit_count() for state, bits in self.bits.items()}
+
+
+class QRSerialBitmaps:
+    """Serial bitmaps for every product, refreshed from the database in the background"""
+
+    def __init__(self, refresh_interval: Optional[float] = None):
+        self.refresh_interval = refresh_interval or settings.SERIAL_BITMAP_REFRESH_SECONDS
+        self._products: Dict[int, ProductSerialBitmap] = {}
+        self._loaded = False
+        self._journal = None  # updates made while a rebuild is reading, replayed onto its result
+        self._lock = threading.Lock()
+        self._rebuild_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.rebuilds = 0
+        self.last_rebuild_at = None
+        self.last_rebuild_seconds = None
+        self.last_error = None
+
+    # --- Loading ---
+
+    def start(self):
+        if not settings.SERIAL_BITMAP_ENABLED or self._thread:
+            return
+        self.rebuild()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="serial-bitmap-refresh", daemon=True)
+        self._thread.start()
+        print(f"✅ Serial bitmap refresher started (every {self.refresh_interval}s)")
+
+    def stop(self, timeout: float = 5.0):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=timeout)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.refresh_interval):
+            self.rebuild()
+
+    def rebuild(self) -> bool:
+        """Re-read every code's serial and state (one streamed query) and swap the bitmaps in"""
+        with self._rebuild_lock:
+            started = time.monotonic()
+            products: Dict[int, ProductSerialBitmap] = {}
+            with self._lock:
+                self._journal = []
+            db = SessionLocal()
+            try:
+                rows = db.query(
+                    QRCode.product_id, QRCode.serial_number, QRCode.scan_count, QRCode.is_used
+                ).filter(QRCode.serial_number.isnot(None)).yield_per(10000)
+                codes = 0
+                for product_id, serial, scan_count, is_used in rows:
+                    bitmap = products.get(product_id)
+                    if bitmap is None:
+                        bitmap = products[product_id] = ProductSerialBitmap()
+                    bitmap.set("issued", serial)
+                    if scan_count:
+                        bitmap.set("scanned", serial)
+                    if is_used:
+                        bitmap.set("used", serial)
+                    codes += 1
+            except Exception as e:
+                with self._lock:
+                    self._journal = None
+                self.last_error = str(e)
+                print(f"❌ Serial bitmap rebuild failed: {str(e)}")
+                return False
+            finally:
+                db.close()
+
+            with self._lock:
+                for product_id, apply in self._journal:
+                    apply(products.setdefault(product_id, ProductSerialBitmap()))
+                self._journal = None
+                first = not self._loaded
+                self._products = products
+                self._loaded = True
+            self.rebuilds += 1
+            self.last_rebuild_at = time.time()
+            self.last_rebuild_seconds = time.monotonic() - started
+            self.last_error = None
+            if first:
+                kb = sum(bitmap.nbytes for bitmap in products.values()) // 1024
+                print(f"🗂️ Serial bitmaps built: {codes} codes, {len(products)} products, {kb} KB in {self.last_rebuild_seconds:.2f}s")
+            return True
+
+    @property
+    def ready(self) -> bool:
+        return settings.SERIAL_BITMAP_ENABLED and self._loaded
+
+    # --- Updates (call after the change is committed) ---
+
+    def _update(self, product_id: int, apply):
+        if not self.ready:
+            return
+        with self._lock:
+            apply(self._products.setdefault(product_id, ProductSerialBitmap()))
+            if self._journal is not None:
+                self._journal.append((product_id, apply))
+
+    def mark_issued(self, product_id: int, serial_start: int, count: int = 1):
+        self._update(product_id, lambda bitmap: bitmap.set_range("issued", serial_start, count))
+
+    def mark_scanned(self, product_id: int, serial: Optional[int]):
+        if serial is not None:
+            self._update(product_id, lambda bitmap: bitmap.set("scanned", serial))
+
+    def mark_used(self, product_id: int, serial: Optional[int], used: bool = True):
+        """Claimed (used=True) or freed by a rejection (used=False)"""
+        if serial is not None:
+            self._update(product_id, lambda bitmap: bitmap.set("used", serial, used))
+
+    # --- Lookups ---
+
+    def is_used(self, product_id: int, serial: Optional[int]) -> Optional[bool]:
+        """Used state of a serial, or None when the bitmaps cannot answer (not built / not issued)"""
+        if serial is None or not self.ready:
+            return None
+        with self._lock:
+            bitmap = self._products.get(product_id)
+            if bitmap is None or not bitmap.get("issued", serial):
+                return None
+            return bitmap.get("used", serial)
+
+    def lookup(self, product_id: int, serial: int) -> Optional[Dict[str, bool]]:
+        """{issued, scanned, used} for one serial, or None when the bitmaps are not built"""
+        if not self.ready:
+            return None
+        with self._lock:
+            bitmap = self._products.get(product_id) or ProductSerialBitmap()
+            return {state: bitmap.get(state, serial) for state in STATES}
+
+    def usage(self, product_id: int, serial_start: Optional[int] = None, serial_end: Optional[int] = None) -> Optional[Dict[str, int]]:
+        """Issued/scanned/used counts over an inclusive serial range (whole product by default)"""
+        if not self.ready:
+            return None
+        with self._lock:
+            bitmap = self._products.get(product_id)
+            if bitmap is None:
+                return {state: 0 for state in STATES}
+            if serial_start is None and serial_end is None:
+                return bitmap.total()
+            last_serial = len(bitmap.bits["issued"]) * 8 - 1
+            return bitmap.usage(max(serial_start or 0, 0), min(last_serial if serial_end is None else serial_end, last_serial))
+
+    def stats(self) -> Dict:
+        with self._lock:
+            products = len(self._products)
+            nbytes = sum(bitmap.nbytes for bitmap in self._products.values())
+        return {
+            "enabled": settings.SERIAL_BITMAP_ENABLED,
+            "ready": self.ready,
+            "products": products,
+            "bytes": nbytes,
+            "rebuilds": self.rebuilds,
+            "last_rebuild_seconds": round(self.last_rebuild_seconds, 3) if self.last_rebuild_seconds is not None else None,
+            "last_error": self.last_error
+        }
+
+
+# Create singleton instance
+serial_bitmaps = QRSerialBitmaps()
@@ -0,0 +1,116 @@
+"""
+Upload Ingestion Service
+Streams an UploadFile to disk in chunks while hashing it, enforcing the size cap.
+Oversized multipart requests are refused from their Content-Length header
+before Starlette spools the body (see the middleware in main.py).
+"""
+import os
+import uuid
+import time
+import hashlib
+from dataclasses import dataclass
+from fastapi import HTTPException, Request, UploadFile, status
+from fastapi.concurrency import run_in_threadpool
+from app.config import settings
+
+ALLOWED_IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.webp')
+CHUNK_SIZE = 64 * 1024
+MULTIPART_OVERHEAD = 64 * 1024  # boundaries, part headers and the other form fields
+
+
+@dataclass
+class IngestedUpload:
+    file_path: str
+    sha256: str
+    size: int
+    extension: str
+
+    def discard(self):
+        """Remove the stored file (e.g. when a later validation step rejects it)"""
+        if os.path.exists(self.file_path):
+            os.remove(self.file_path)
+
+
+def too_large_detail(max_bytes: int = None) -> str:
+    max_bytes = max_bytes or settings.MAX_FILE_SIZE
+    return f"File too large. Maximum size is {max_bytes // (1024 * 1024)}MB"
+
+
+def declared_too_large(request: Request, max_bytes: int = None) -> bool:
+    """True when a multipart request's Content-Length already exceeds the upload cap"""
+    if not request.headers.get("content-type", "").startswith("multipart/form-data"):
+        return False
+    try:
+        content_length = int(request.headers.get("content-length", ""))
+    except ValueError:
+        return False
+    return content_length > (max_bytes or settings.MAX_FILE_SIZE) + MULTIPART_OVERHEAD
+
+
+def _copy_to_disk(source, file_path: str, max_bytes: int):
+    """Blocking chunked copy + hash; returns (sha256 hex digest, size)"""
+    sha256 = hashlib.sha256()
+    size = 0
+    with open(file_path, "wb") as buffer:
+        while True:
+            chunk = source.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            size += len(chunk)
+            if size > max_bytes:
+                raise HTTPException(
+                    status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                    detail=too_large_detail(max_bytes)
+                )
+            sha256.update(chunk)
+            buffer.write(chunk)
+    return sha256.hexdigest(), size
+
+
+async def ingest_upload(
+    upload: UploadFile,
+    subdir: str,
+    max_bytes: int = None,
+    allowed_extensions=ALLOWED_IMAGE_EXTENSIONS
+) -> IngestedUpload:
+    """
+    Save an uploaded file under UPLOAD_DIR/subdir without holding it in memory
+
+    Args:
+        upload: The incoming UploadFile
+        subdir: Folder inside UPLOAD_DIR (e.g. "rewards", "reels")
+        max_bytes: Size cap, defaults to settings.MAX_FILE_SIZE
+        allowed_extensions: Accepted (lower-case) file extensions
+
+    Returns:
+        IngestedUpload with the stored path, SHA256 hex digest and size
+    """
+    max_bytes = max_bytes or settings.MAX_FILE_SIZE
+
+    # Security: Validate file extension and sanitize filename
+    extension = os.path.splitext(upload.filename or "")[1].lower()
+    if extension not in allowed_extensions:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid image format. Allowed: {', '.join(allowed_extensions)}"
+        )
+
+    upload_dir = f"{settings.UPLOAD_DIR}/{subdir}"
+    os.makedirs(upload_dir, exist_ok=True)
+
+    # Generate a completely random, secure filename
+    file_path = f"{upload_dir}/{uuid.uuid4().hex}_{int(time.time())}{extension}"
+
+    try:
+        # Disk writes stay off the event loop
+        digest, size = await run_in_threadpool(_copy_to_disk, upload.file, file_path, max_bytes)
+    except BaseException:
+        if os.path.exists(file_path):
+            os.remove(file_path)
+        raise
+
+    if size == 0:
+        os.remove(file_path)
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Uploaded file is empty")
+
+    return IngestedUpload(file_path=file_path, sha256=digest, size=size, extension=extension)
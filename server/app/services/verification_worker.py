@@ -0,0 +1,268 @@
+"""
+Background AI Verification Workers
+Runs the 2-step screenshot verification outside the request/response cycle
+"""
+import os
+import mimetypes
+import queue
+import threading
+from typing import Dict, Optional
+
+from app.config import settings
+from app.database import SessionLocal
+from app.models.reward import Reward
+from app.models.qr_code import QRCode
+from app.models.product import Product
+from app.services.image_service import image_service
+from app.services.phash_service import phash_service
+from app.services.drive_outbox import drive_outbox, enqueue_drive_upload
+from app.services.qr_cache import qr_cache
+from app.services.serial_bitmap import serial_bitmaps
+
+# Rewards in these states still need a worker to pick them up
+UNFINISHED_STATES = ("queued", "processing")
+
+# Shown to the user when the screenshot is not a 5-star review
+NON_FIVE_STAR_MESSAGE = "केवल 5-स्टार रिव्यू के लिए कैशबैक मिलेगा। आपका रिव्यू: {rating} स्टार। कृपया 5-स्टार रिव्यू का सही स्क्रीनशॉट अपलोड करें।"
+
+
+def get_target_urls(product: Product) -> Dict[str, str]:
+    """Authorized marketplace links passed to the AI as context"""
+    return {
+        "amazon": product.amazon_url,
+        "flipkart": product.flipkart_url,
+        "meesho": product.meesho_url,
+        "myntra": product.myntra_url,
+        "nykaa": product.nykaa_url,
+        "jiomart": product.jiomart_url
+    }
+
+
+def apply_verification_result(db, reward: Reward, ai_result: Dict) -> None:
+    """
+    Apply an autonomous_verification result to a reward
+
+    Step 1: Only 5-star reviews are eligible (otherwise rejected, QR freed)
+    Step 2: Review found on platform with high confidence -> auto-approved,
+            otherwise left pending for admin review
+    """
+    if ai_result.get('status') == 'failed':
+        # AI not configured / API error - keep pending for manual review
+        print(f"❌ AI Verification System Error for Reward #{reward.id}: {ai_result.get('error')}")
+        reward.ai_verified = False
+        reward.ai_analysis_status = "failed"
+        reward.ai_decision_log = f"System Error: {ai_result.get('error')}"
+        return
+
+    reward.ai_verified = True
+    reward.ai_analysis_status = "success"
+    reward.detected_rating = ai_result.get('detected_rating')
+    reward.ai_confidence = ai_result.get('confidence_score')
+    detected_rating = ai_result.get('detected_rating', 0)
+    ai_decision_log = ai_result.get('decision_reasoning', 'No reasoning provided')
+
+    # STEP 1: Check for 5-star rating (MANDATORY)
+    if detected_rating != 5:
+        print(f"❌ REJECTED Reward #{reward.id}: Only 5-star reviews are eligible. Detected: {detected_rating} stars")
+        reward.status = "rejected"
+        reward.is_auto_approved = False
+        reward.rejection_reason = NON_FIVE_STAR_MESSAGE.format(rating=detected_rating)
+        reward.ai_decision_log = f"❌ Auto-Rejected: {ai_decision_log}"
+
+        # Free up the QR code so the user can retry with a correct screenshot
+        qr = db.query(QRCode).filter(QRCode.code == reward.coupon_code).first()
+        if qr:
+            qr.is_used = False
+        return
+
+    print(f"✅ Step 1 Passed for Reward #{reward.id}: 5-Star Review Detected")
+
+    # A near-duplicate of an earlier claim's screenshot is never auto-approved
+    near_match = None
+    if reward.phash:
+        near_match = phash_service.find_closest(
+            db, Reward, int(reward.phash, 16), exclude_id=reward.id, filters=(Reward.status != "rejected",)
+        )
+
+    # STEP 2: Platform Match Check
+    if near_match:
+        print(f"🔄 Reward #{reward.id} is a near-duplicate of Reward #{near_match[0]} → PENDING for Admin Review")
+        reward.status = "pending"
+        reward.is_auto_approved = False
+        reward.ai_decision_log = f"⚠️ Manual Review Required: {phash_service.review_note('claim', *near_match)} AI: {ai_decision_log}"
+    elif ai_result.get('auto_approve', False):
+        print(f"✅ Step 2 Passed for Reward #{reward.id}: Review FOUND on Platform → AUTO-APPROVED")
+        reward.status = "approved"
+        reward.is_auto_approved = True
+        reward.ai_decision_log = f"✅ Auto-Approved: {ai_decision_log}"
+    else:
+        print(f"🔄 Step 2 Failed for Reward #{reward.id}: Review NOT FOUND on Platform → PENDING for Admin Review")
+        reward.status = "pending"
+        reward.is_auto_approved = False
+        reward.ai_decision_log = f"⚠️ Manual Review Required: {ai_decision_log}"
+
+
+class VerificationWorkerPool:
+    """Pool of background threads that run AI verification for queued rewards"""
+
+    def __init__(self, num_workers: Optional[int] = None):
+        self.num_workers = num_workers or settings.AI_VERIFICATION_WORKERS
+        self._queue: "queue.Queue[Optional[int]]" = queue.Queue()
+        self._threads = []
+        self._processing = set()
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Start worker threads and pick up rewards left unfinished by a previous run"""
+        if self._threads:
+            return
+
+        for i in range(self.num_workers):
+            thread = threading.Thread(target=self._run, name=f"ai-verify-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+        print(f"✅ AI Verification workers started ({self.num_workers})")
+        self._requeue_unfinished()
+
+    def stop(self, timeout: float = 5.0):
+        """Signal workers to exit after their current job"""
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join(timeout=timeout)
+        self._threads = []
+
+    def enqueue(self, reward_id: int):
+        """Queue a reward for background verification"""
+        self._queue.put(reward_id)
+
+    def stats(self) -> Dict:
+        """Current queue depth and in-flight jobs"""
+        with self._lock:
+            processing = len(self._processing)
+        return {
+            "workers": len(self._threads),
+            "queued": self._queue.qsize(),
+            "processing": processing
+        }
+
+    def _requeue_unfinished(self):
+        db = SessionLocal()
+        try:
+            pending = db.query(Reward.id).filter(Reward.ai_analysis_status.in_(UNFINISHED_STATES)).all()
+            for (reward_id,) in pending:
+                self.enqueue(reward_id)
+            if pending:
+                print(f"🔄 Re-queued {len(pending)} unfinished AI verifications")
+        except Exception as e:
+            print(f"⚠️ Could not re-queue unfinished verifications: {str(e)}")
+        finally:
+            db.close()
+
+    def _run(self):
+        while True:
+            reward_id = self._queue.get()
+            try:
+                if reward_id is None:
+                    return
+                with self._lock:
+                    self._processing.add(reward_id)
+                self.process(reward_id)
+            except Exception as e:
+                print(f"❌ Verification worker error for Reward #{reward_id}: {str(e)}")
+            finally:
+                with self._lock:
+                    self._processing.discard(reward_id)
+                self._queue.task_done()
+
+    def process(self, reward_id: int, before_model_call=None):
+        """
+        Run the 2-step verification for one reward and store the verdict.
+        `before_model_call` runs only on an AI cache miss, right before the model request.
+        """
+        from app.services.ai_service import ai_service
+
+        db = SessionLocal()
+        try:
+            reward = db.query(Reward).filter(Reward.id == reward_id).first()
+            if not reward or reward.ai_analysis_status not in UNFINISHED_STATES:
+                return
+
+            reward.ai_analysis_status = "processing"
+            db.commit()
+
+            qr = db.query(QRCode).filter(QRCode.code == reward.coupon_code).first()
+            product = db.query(Product).filter(Product.id == qr.product_id).first() if qr else None
+            if not product:
+                reward.ai_analysis_status = "failed"
+                reward.ai_decision_log = "System Error: Product not found for coupon code"
+                db.commit()
+                return
+
+            # Screenshots already archived on Drive are passed to the model by URL
+            is_remote = reward.review_screenshot.startswith("http")
+            file_path = reward.review_screenshot if is_remote else reward.review_screenshot.lstrip("/")
+            ai_path = image_service.ai_variant_path(file_path)
+            if is_remote or not os.path.exists(ai_path):
+                ai_path = file_path
+
+            print(f"🤖 Starting 2-Step AI Verification for Reward #{reward.id}: {product.name}")
+            ai_result = ai_service.autonomous_verification(
+                ai_path,
+                product.name,
+                get_target_urls(product),
+                image_hash=reward.image_hash,
+                product_id=product.id,
+                before_model_call=before_model_call
+            )
+            apply_verification_result(db, reward, ai_result)
+            db.commit()
+
+            if reward.status == "rejected":
+                # The QR code was freed; drop its cached "used" state
+                qr_cache.invalidate_code(reward.coupon_code)
+                serial_bitmaps.mark_used(qr.product_id, qr.serial_number, used=False)
+
+            # The AI-sized variant is kept only while a re-run may still need it
+            if ai_path != file_path and (reward.ai_analysis_status == "success" or reward.status == "rejected"):
+                os.remove(ai_path)
+
+            if is_remote:
+                return
+
+            if reward.status == "rejected":
+                if os.path.exists(file_path):
+                    os.remove(file_path)
+                return
+
+            # Failed verifications stay local until a re-run reaches a verdict
+            if reward.ai_analysis_status == "failed":
+                return
+
+            # Hand the archive copy to the Drive outbox once the AI no longer needs it
+            extension = os.path.splitext(file_path)[1] or ".jpg"
+            enqueue_drive_upload(
+                db,
+                local_path=file_path,
+                file_name=f"{reward.name.replace(' ', '_')}_{reward.coupon_code}{extension}",
+                mime_type=mimetypes.guess_type(file_path)[0] or "image/jpeg",
+                target_type="reward",
+                target_id=reward.id
+            )
+            db.commit()
+            drive_outbox.notify()
+        except Exception as e:
+            db.rollback()
+            reward = db.query(Reward).filter(Reward.id == reward_id).first()
+            if reward and reward.ai_analysis_status == "processing":
+                reward.ai_analysis_status = "failed"
+                reward.ai_decision_log = f"System Error: {str(e)}"
+                db.commit()
+            raise
+        finally:
+            db.close()
+
+
+# Create singleton instance
+verification_worker = VerificationWorkerPool()
@@ -0,0 +1,41 @@
+"""
+Startup Timing Report
+Records how long each module import and service initialization takes during
+boot, so slow worker restarts can be traced to the module responsible.
+"""
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Tuple
+
+# Set as early as possible (app.main imports this module first)
+BOOT_STARTED = time.perf_counter()
+
+_entries: List[Tuple[str, str, float]] = []  # (phase, name, seconds)
+
+
+def record(phase: str, name: str, seconds: float):
+    _entries.append((phase, name, seconds))
+
+
+@contextmanager
+def timed(phase: str, name: str):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(phase, name, time.perf_counter() - started)
+
+
+def snapshot() -> Dict:
+    """Timings grouped by phase, in milliseconds"""
+    report = {"boot_ms": round((time.perf_counter() - BOOT_STARTED) * 1000, 1)}
+    for phase, name, seconds in _entries:
+        report.setdefault(phase, {})[name] = round(seconds * 1000, 1)
+    return report
+
+
+def print_report():
+    total = time.perf_counter() - BOOT_STARTED
+    print(f"⏱️ Startup finished in {total * 1000:.0f}ms")
+    for phase, name, seconds in sorted(_entries, key=lambda entry: entry[2], reverse=True):
+        print(f"   {phase:<7} {name:<40} {seconds * 1000:8.1f}ms")
@@ -0,0 +1,51 @@
+"""
+Backfill link tokens for QR codes that have none (imports, rows created before link tokens)
+
+Tokens come from the link_token sequence, so no uniqueness checks or retries are
+needed: each batch reserves a range, writes it with one executemany and commits.
+Existing tokens are never changed (they are printed on labels).
+
+Usage:
+    python backfill_link_tokens.py [--batch-size 5000]
+"""
+import os
+import sys
+import argparse
+from sqlalchemy import update
+
+# Set up path to import app modules
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.database import SessionLocal
+from app.models.qr_code import QRCode
+from app.services.link_tokens import allocate_link_tokens
+
+
+def backfill(batch_size: int) -> int:
+    db = SessionLocal()
+    updated = 0
+    last_id = 0
+    try:
+        while True:
+            ids = [row.id for row in db.query(QRCode.id).filter(QRCode.link_token.is_(None), QRCode.id > last_id)
+                   .order_by(QRCode.id.asc()).limit(batch_size).all()]
+            if not ids:
+                break
+            tokens = allocate_link_tokens(len(ids), db)
+            db.execute(update(QRCode), [{"id": qr_id, "link_token": token} for qr_id, token in zip(ids, tokens)])
+            db.commit()
+            updated += len(ids)
+            last_id = ids[-1]
+            print(f"   QRCode: {updated} tokens assigned (up to #{last_id})")
+    finally:
+        db.close()
+    return updated
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Assign link tokens to QR codes without one")
+    parser.add_argument("--batch-size", type=int, default=5000)
+    args = parser.parse_args()
+
+    backfill(args.batch_size)
+    print("SUCCESS: Link token backfill complete.")
@@ -0,0 +1,65 @@
+"""
+Backfill perceptual hashes for rewards and reels created before near-duplicate detection
+
+Usage:
+    python backfill_phash.py [--batch-size 200]
+"""
+import os
+import sys
+import io
+import argparse
+import requests
+
+# Set up path to import app modules
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.database import SessionLocal
+from app.models.reward import Reward
+from app.models.reel import Reel
+from app.services.phash_service import phash_service
+
+
+def open_screenshot(location: str):
+    """Local path or public (Drive) URL -> something PIL can open"""
+    if location.startswith("http"):
+        response = requests.get(location, timeout=30)
+        response.raise_for_status()
+        return io.BytesIO(response.content)
+    return location.lstrip("/")
+
+
+def backfill(model, column, batch_size: int):
+    db = SessionLocal()
+    updated = failed = 0
+    last_id = 0
+    try:
+        while True:
+            rows = db.query(model).filter(model.phash.is_(None), model.id > last_id) \
+                .order_by(model.id.asc()).limit(batch_size).all()
+            if not rows:
+                break
+            for row in rows:
+                try:
+                    value = phash_service.compute(open_screenshot(getattr(row, column)))
+                    for key, val in phash_service.columns(value).items():
+                        setattr(row, key, val)
+                    updated += 1
+                except Exception as e:
+                    failed += 1
+                    print(f"⚠️ {model.__name__} #{row.id}: {str(e)}")
+            last_id = rows[-1].id
+            db.commit()
+            print(f"   {model.__name__}: {updated} hashed, {failed} failed (up to #{last_id})")
+    finally:
+        db.close()
+    return updated, failed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compute missing perceptual hashes")
+    parser.add_argument("--batch-size", type=int, default=200)
+    args = parser.parse_args()
+
+    backfill(Reward, "review_screenshot", args.batch_size)
+    backfill(Reel, "brand_tag_proof", args.batch_size)
+    print("SUCCESS: Perceptual hash backfill complete.")
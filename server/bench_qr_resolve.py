@@ -0,0 +1,148 @@
+"""
+Benchmark for the QR resolve path (GET /api/qr/{token})
+
+Runs each strategy in-process against DATABASE_URL with a thread pool and
+reports queries per scan, latency percentiles and lost scan increments:
+
+    legacy           ORM read, scan_count += 1, commit, separate product query
+    direct           joined read + atomic UPDATE ... WHERE is_used = false (cache off)
+    cached-direct    in-process token cache + atomic UPDATE
+    cached-buffered  token cache + write-behind counters (the default)
+
+    python bench_qr_resolve.py --scans 2000 --concurrency 16 --tokens 5
+"""
+import os
+import sys
+import time
+import uuid
+import argparse
+import itertools
+import statistics
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from sqlalchemy import event, func
+
+# Set up path to import app modules
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.database import SessionLocal, engine, Base
+from app.config import settings
+from app.models import Company, Product, QRCode
+from app.api.qr import resolve_token
+from app.services.qr_cache import qr_cache
+from app.services.scan_counter import scan_counter
+
+STRATEGIES = ["legacy", "direct", "cached-direct", "cached-buffered"]
+
+
+def legacy_resolve(db, token):
+    """The resolve path before the single-round-trip rewrite"""
+    qr = db.query(QRCode).filter(QRCode.link_token == token).first()
+    if not qr or qr.is_used:
+        raise LookupError(token)
+    qr.scan_count += 1
+    qr.last_scanned_at = datetime.utcnow()
+    db.commit()
+    product = db.query(Product).filter(Product.id == qr.product_id).first()
+    return product, qr.code
+
+
+def seed(count: int):
+    """Fresh QR codes (scan_count 0) on a dedicated benchmark product"""
+    db = SessionLocal()
+    try:
+        company = db.query(Company).filter(Company.name == "Benchmark Co").first()
+        if not company:
+            company = Company(name="Benchmark Co")
+            db.add(company)
+            db.flush()
+        product = db.query(Product).filter(Product.company_id == company.id).first()
+        if not product:
+            product = Product(company_id=company.id, name="Benchmark Gummies", sku_prefix="BM")
+            db.add(product)
+            db.flush()
+        tokens = [uuid.uuid4().hex[:12] for _ in range(count)]
+        db.add_all([
+            QRCode(product_id=product.id, code=f"BM{uuid.uuid4().hex[:10].upper()}", link_token=token, scan_count=0)
+            for token in tokens
+        ])
+        db.commit()
+        return tokens
+    finally:
+        db.close()
+
+
+def counted_scans(tokens) -> int:
+    db = SessionLocal()
+    try:
+        return db.query(func.coalesce(func.sum(QRCode.scan_count), 0)).filter(QRCode.link_token.in_(tokens)).scalar()
+    finally:
+        db.close()
+
+
+def run(strategy: str, scans: int, concurrency: int, token_count: int):
+    tokens = seed(token_count)
+    settings.QR_CACHE_ENABLED = strategy.startswith("cached")
+    settings.SCAN_COUNTER_MODE = "buffered" if strategy == "cached-buffered" else "direct"
+    qr_cache.clear()
+
+    queries = itertools.count()
+    listener = lambda *args: next(queries)
+    event.listen(engine, "before_cursor_execute", listener)
+
+    def scan(i):
+        token = tokens[i % len(tokens)]
+        db = SessionLocal()
+        start = time.perf_counter()
+        try:
+            if strategy == "legacy":
+                legacy_resolve(db, token)
+            else:
+                resolve_token(db, token)
+            ok = True
+        except Exception:
+            db.rollback()
+            ok = False
+        finally:
+            db.close()
+        return (time.perf_counter() - start) * 1000, ok
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(scan, range(scans)))
+    wall = time.perf_counter() - started
+    query_count = next(queries)
+    event.remove(engine, "before_cursor_execute", listener)
+
+    if strategy == "cached-buffered":
+        scan_counter.flush()
+
+    latencies = sorted(latency for latency, _ in results)
+    succeeded = sum(1 for _, ok in results if ok)
+    pct = lambda p: latencies[min(len(latencies) - 1, int(len(latencies) * p))]
+    lost = succeeded - counted_scans(tokens)
+
+    print(f"\n=== {strategy}: {scans} scans over {token_count} codes, concurrency {concurrency} ===")
+    print(f"Throughput: {scans / wall:.1f} scans/s  (wall {wall:.2f}s)")
+    print(f"Queries:    {query_count / scans:.2f} per scan ({query_count} total)")
+    print(f"Latency ms: p50 {pct(0.50):.2f}  p95 {pct(0.95):.2f}  p99 {pct(0.99):.2f}  max {latencies[-1]:.2f}")
+    print(f"Scans:      {succeeded} ok, {scans - succeeded} errors, {lost} increments lost")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Queries, latency and lost updates of the QR resolve path")
+    parser.add_argument("--strategy", choices=STRATEGIES, action="append", help="Repeatable; default: all")
+    parser.add_argument("--scans", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--tokens", type=int, default=5, help="Few tokens = hot rows = more contention")
+    args = parser.parse_args()
+
+    engine.echo = False
+    Base.metadata.create_all(bind=engine)
+    for strategy in args.strategy or STRATEGIES:
+        run(strategy, args.scans, args.concurrency, args.tokens)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+"""
+Load test for the reward submit and admin login paths
+
+Start the API with the offline backends so no real OpenAI/Drive/SMTP calls are made:
+
+    AI_BACKEND=fake DRIVE_BACKEND=fake EMAIL_BACKEND=fake uvicorn app.main:app --workers 2
+
+Then, against the same DATABASE_URL:
+
+    python loadtest.py submit --requests 500 --concurrency 20
+    python loadtest.py admin-login --requests 200 --concurrency 10 --admin-password secret
+"""
+import os
+import sys
+import io
+import time
+import uuid
+import random
+import argparse
+import statistics
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from PIL import Image
+
+# Set up path to import app modules
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.database import SessionLocal
+from app.config import settings
+from app.models import User, Company, Product, QRCode
+
+LOADTEST_EMAIL = "loadtest@example.com"
+
+
+def seed_submit(count: int):
+    """Create a load-test user, product and `count` unused QR codes. Returns (token, codes)."""
+    from app.api.auth import create_access_token
+
+    db = SessionLocal()
+    try:
+        user = db.query(User).filter(User.email == LOADTEST_EMAIL).first()
+        if not user:
+            user = User(email=LOADTEST_EMAIL, name="Load Test")
+            db.add(user)
+
+        company = db.query(Company).filter(Company.name == "Load Test Co").first()
+        if not company:
+            company = Company(name="Load Test Co")
+            db.add(company)
+            db.flush()
+
+        product = db.query(Product).filter(Product.company_id == company.id).first()
+        if not product:
+            product = Product(company_id=company.id, name="Load Test Gummies", sku_prefix="LT")
+            db.add(product)
+            db.flush()
+
+        codes = [f"LT{uuid.uuid4().hex[:10].upper()}" for _ in range(count)]
+        db.add_all([QRCode(product_id=product.id, code=code) for code in codes])
+        db.commit()
+        return create_access_token(data={"sub": LOADTEST_EMAIL}), codes
+    finally:
+        db.close()
+
+
+def seed_admin(password: str):
+    """Make sure the configured ADMIN_EMAIL exists (created with `password` if missing)"""
+    from argon2 import PasswordHasher
+
+    if not settings.ADMIN_EMAIL:
+        sys.exit("ADMIN_EMAIL must be set for the admin-login scenario")
+
+    db = SessionLocal()
+    try:
+        admin = db.query(User).filter(User.email == settings.ADMIN_EMAIL).first()
+        if not admin:
+            db.add(User(email=settings.ADMIN_EMAIL, name="Admin", is_admin=True,
+                        password_hash=PasswordHasher().hash(password)))
+            db.commit()
+    finally:
+        db.close()
+
+
+def random_screenshot() -> bytes:
+    """A small random PNG so every submission has a unique image hash"""
+    img = Image.frombytes("RGB", (320, 640), os.urandom(320 * 640 * 3))
+    buffer = io.BytesIO()
+    img.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def run(label: str, fn, total: int, concurrency: int):
+    latencies = []
+    results = Counter()
+    reward_ids = []
+
+    def timed(i):
+        start = time.perf_counter()
+        try:
+            status_code, payload = fn(i)
+        except requests.RequestException as e:
+            status_code, payload = type(e).__name__, None
+        return time.perf_counter() - start, status_code, payload
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for elapsed, status_code, payload in pool.map(timed, range(total)):
+            latencies.append(elapsed * 1000)
+            results[status_code] += 1
+            if payload and isinstance(payload, dict) and "id" in payload:
+                reward_ids.append(payload["id"])
+    wall = time.perf_counter() - started
+
+    latencies.sort()
+    pct = lambda p: latencies[min(len(latencies) - 1, int(len(latencies) * p))]
+    print(f"\n=== {label}: {total} requests, concurrency {concurrency} ===")
+    print(f"Throughput: {total / wall:.1f} req/s  (wall {wall:.2f}s)")
+    print(f"Latency ms: p50 {pct(0.50):.1f}  p95 {pct(0.95):.1f}  p99 {pct(0.99):.1f}  max {latencies[-1]:.1f}  mean {statistics.mean(latencies):.1f}")
+    print(f"Responses:  {dict(results)}")
+    return reward_ids
+
+
+def wait_for_verification(base_url: str, token: str, reward_ids, timeout: float):
+    """Poll until background AI verification has finished for every submitted reward"""
+    headers = {"Authorization": f"Bearer {token}"}
+    started = time.perf_counter()
+    remaining = set(reward_ids)
+    outcomes = Counter()
+    while remaining and time.perf_counter() - started < timeout:
+        for reward_id in list(remaining):
+            data = requests.get(f"{base_url}/api/rewards/{reward_id}/verification", headers=headers).json()
+            if data.get("ai_analysis_status") not in ("queued", "processing"):
+                remaining.discard(reward_id)
+                outcomes[f"{data.get('status')}/{data.get('ai_analysis_status')}"] += 1
+        time.sleep(0.5)
+    print(f"Verification drained in {time.perf_counter() - started:.1f}s: {dict(outcomes)}"
+          + (f" ({len(remaining)} still running)" if remaining else ""))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Throughput benchmark for submit_reward and admin_login")
+    parser.add_argument("scenario", choices=["submit", "admin-login"])
+    parser.add_argument("--base-url", default=settings.BACKEND_URL)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--admin-password", default="loadtest-password")
+    parser.add_argument("--wait-verification", action="store_true", help="Also time the background AI queue")
+    parser.add_argument("--timeout", type=float, default=300)
+    args = parser.parse_args()
+    base_url = args.base_url.rstrip("/")
+
+    if args.scenario == "submit":
+        token, codes = seed_submit(args.requests)
+        headers = {"Authorization": f"Bearer {token}"}
+
+        def submit(i):
+            response = requests.post(
+                f"{base_url}/api/rewards/submit",
+                headers=headers,
+                data={
+                    "name": "Load Test",
+                    "phone": "9000000000",
+                    "platform": random.choice(["amazon", "flipkart"]),
+                    "upi_id": "loadtest@okaxis",
+                    "coupon_code": codes[i]
+                },
+                files={"screenshot": ("review.png", random_screenshot(), "image/png")},
+                timeout=args.timeout
+            )
+            return response.status_code, response.json() if response.ok else None
+
+        reward_ids = run("POST /api/rewards/submit", submit, args.requests, args.concurrency)
+        if args.wait_verification and reward_ids:
+            wait_for_verification(base_url, token, reward_ids, args.timeout)
+    else:
+        seed_admin(args.admin_password)
+
+        def login(i):
+            response = requests.post(
+                f"{base_url}/api/admin/auth/login",
+                json={"email": settings.ADMIN_EMAIL, "password": args.admin_password},
+                timeout=args.timeout
+            )
+            return response.status_code, None
+
+        run("POST /api/admin/auth/login", login, args.requests, args.concurrency)
+
+
+if __name__ == "__main__":
+    main()
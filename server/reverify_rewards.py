@@ -0,0 +1,66 @@
+"""
+Bulk AI re-verification of pending/failed rewards (e.g. after an OpenAI outage)
+
+Usage:
+    python reverify_rewards.py --status failed --from 2026-01-01 --product-id 3
+    python reverify_rewards.py --resume <job_id>
+"""
+import os
+import sys
+import argparse
+from datetime import datetime
+
+# Set up path to import app modules
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.services.reverification_service import ReverificationJob
+
+
+def print_progress(progress):
+    done = progress["processed"]
+    total = progress["total"] or 1
+    print(f"   [{done}/{progress['total']}] {done * 100 // total}% - {progress['outcomes']} (last id {progress['last_reward_id']})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-run AI verification over pending/failed rewards")
+    parser.add_argument("--status", action="append", dest="statuses", help="ai_analysis_status to include (repeatable, default: failed + pending)")
+    parser.add_argument("--from", dest="date_from", type=datetime.fromisoformat, help="Created on/after (YYYY-MM-DD)")
+    parser.add_argument("--to", dest="date_to", type=datetime.fromisoformat, help="Created on/before (YYYY-MM-DD)")
+    parser.add_argument("--product-id", type=int)
+    parser.add_argument("--concurrency", type=int)
+    parser.add_argument("--rpm", type=int, help="Max OpenAI requests per minute")
+    parser.add_argument("--resume", metavar="JOB_ID", help="Continue a previous job from its checkpoint")
+    parser.add_argument("--dry-run", action="store_true", help="Only count matching rewards")
+    args = parser.parse_args()
+
+    if args.resume:
+        job = ReverificationJob.load(args.resume)
+        print(f"🔁 Resuming job {job.job_id} after Reward #{job.last_reward_id}")
+    else:
+        job = ReverificationJob(
+            statuses=args.statuses,
+            date_from=args.date_from,
+            date_to=args.date_to,
+            product_id=args.product_id,
+            concurrency=args.concurrency,
+            rate_per_minute=args.rpm
+        )
+
+    if args.dry_run:
+        print(f"{job.count_remaining()} rewards match")
+        return
+
+    try:
+        result = job.run(on_progress=print_progress)
+    except KeyboardInterrupt:
+        job.cancel()
+        print(f"\n⏸️ Interrupted. Resume with: python reverify_rewards.py --resume {job.job_id}")
+        return
+
+    print(f"\nJob {result['job_id']}: {result['status']} - {result['processed']}/{result['total']} processed")
+    print(f"Outcomes: {result['outcomes']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""
+Shared fixtures: every test gets a fresh in-memory SQLite database.
+
+The app's SessionLocal is re-bound to it, so services that open their own
+sessions (serial reservation, token allocation, scan flushes, bitmap
+rebuilds) see the same data as the test's `db` session.
+"""
+import os
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("ENVIRONMENT", "development")
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.pool import StaticPool
+
+from app import models  # noqa: F401  (registers every table on Base)
+from app.database import Base, SessionLocal
+from app.models.company import Company
+from app.models.product import Product
+
+
+@pytest.fixture
+def engine():
+    # One shared connection, so all sessions see the same in-memory database
+    test_engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=test_engine)
+    SessionLocal.configure(bind=test_engine)
+    yield test_engine
+    test_engine.dispose()
+
+
+@pytest.fixture
+def db(engine):
+    session = SessionLocal()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def product(db):
+    company = Company(name="Purna")
+    db.add(company)
+    db.flush()
+    product = Product(company_id=company.id, name="Purna Gummies", sku_prefix="PG")
+    db.add(product)
+    db.commit()
+    return product
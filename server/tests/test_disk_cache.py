@@ -0,0 +1,55 @@
+import os
+
+from app.services import disk_cache
+from app.services.disk_cache import DiskLRUCache
+
+
+def make_cache(tmp_path, max_bytes=300):
+    return DiskLRUCache(str(tmp_path / "cache"), max_bytes, ".bin", "Test cache")
+
+
+def count_walks(cache, monkeypatch):
+    calls = []
+    walk = cache._walk
+
+    def counting_walk():
+        calls.append(1)
+        return walk()
+
+    monkeypatch.setattr(cache, "_walk", counting_walk)
+    return calls
+
+
+def test_full_cache_evicts_least_recently_used_without_rescanning(tmp_path, monkeypatch):
+    cache = make_cache(tmp_path)
+    walks = count_walks(cache, monkeypatch)
+    for index in range(3):
+        cache.write(f"key{index}", b"x" * 100)
+    assert cache.read("key0") == b"x" * 100  # key1 is now the oldest
+
+    for index in range(3, 10):
+        cache.write(f"key{index}", b"x" * 100)
+
+    assert len(walks) == 1  # only the first load walks the directory
+    assert cache.stats()["bytes"] <= 300
+    assert cache.read("key1") is None
+    assert cache.read("key9") == b"x" * 100
+
+
+def test_rescan_picks_up_other_workers_after_the_timer(tmp_path, monkeypatch):
+    cache = make_cache(tmp_path)
+    walks = count_walks(cache, monkeypatch)
+    cache.write("mine", b"x" * 100)
+
+    other = make_cache(tmp_path)
+    other.write("theirs", b"y" * 250)
+    cache.write("mine2", b"x" * 10)
+    assert len(walks) == 1
+    assert os.path.exists(cache.path("theirs"))
+
+    monkeypatch.setattr(disk_cache, "RESCAN_SECONDS", 0)
+    cache.write("mine3", b"x" * 10)
+    assert len(walks) == 2
+    assert cache.stats()["bytes"] <= 300
+    assert not os.path.exists(cache.path("mine"))  # oldest after the merge
+    assert cache.read("mine3") == b"x" * 10
@@ -0,0 +1,96 @@
+import hashlib
+import hmac
+import random
+
+import pytest
+
+from app.models.id_sequence import IdSequence
+from app.services import link_tokens
+from app.services.link_tokens import DOMAIN_BITS, HALF_BITS, HALF_MASK, MAC_LENGTH, ROUNDS, TOKEN_LENGTH
+
+
+def unpermute(value):
+    """Feistel rounds run backwards"""
+    left, right = value >> HALF_BITS, value & HALF_MASK
+    for round_index in reversed(range(ROUNDS)):
+        left, right = right ^ link_tokens._round(round_index, left), left
+    return (left << HALF_BITS) | right
+
+
+@pytest.fixture
+def unsigned(monkeypatch):
+    monkeypatch.setattr(link_tokens.settings, "QR_SIGNED_TOKENS", False)
+
+
+def test_permute_is_a_bijection_on_48_bits():
+    rng = random.Random(22)
+    samples = [0, 1, (1 << DOMAIN_BITS) - 1] + [rng.randrange(1 << DOMAIN_BITS) for _ in range(2000)]
+    for value in samples:
+        permuted = link_tokens.permute(value)
+        assert 0 <= permuted < (1 << DOMAIN_BITS)
+        assert unpermute(permuted) == value
+
+
+def test_consecutive_values_give_distinct_unrelated_tokens(unsigned):
+    tokens = link_tokens.tokens_for_range(0, 20000)
+    assert len(set(tokens)) == len(tokens)
+    assert all(len(token) == TOKEN_LENGTH and token.isalnum() and token == token.lower() for token in tokens)
+    assert sorted(tokens[:100]) != tokens[:100]
+
+
+def test_bulk_range_matches_single_tokens():
+    start = 123456789
+    assert link_tokens.tokens_for_range(start, 50) == [link_tokens.token_for(value) for value in range(start, start + 50)]
+
+
+def test_encode_is_fixed_width_base36():
+    assert link_tokens.encode(0) == "0" * TOKEN_LENGTH
+    assert link_tokens.encode(35) == "0" * (TOKEN_LENGTH - 1) + "z"
+    assert int(link_tokens.encode((1 << DOMAIN_BITS) - 1), 36) == (1 << DOMAIN_BITS) - 1
+
+
+def test_sequence_exhaustion_is_an_error():
+    with pytest.raises(ValueError):
+        link_tokens.permute(1 << DOMAIN_BITS)
+    with pytest.raises(ValueError):
+        link_tokens.tokens_for_range((1 << DOMAIN_BITS) - 1, 2)
+
+
+def test_allocation_advances_the_sequence(db, unsigned):
+    first = link_tokens.allocate_link_tokens(3)
+    second = link_tokens.allocate_link_tokens(2)
+    assert first + second == link_tokens.tokens_for_range(1, 5)
+    db.expire_all()
+    assert db.query(IdSequence).filter(IdSequence.name == "link_token").one().next_value == 6
+
+
+def test_mac_is_truncated_hmac_sha256():
+    key = hashlib.sha256(f"link-token-mac:{link_tokens._required_key('QR_TOKEN_SIGNING_KEY')}".encode()).digest()
+    body = link_tokens.encode(link_tokens.permute(42))
+    digest = hmac.new(key, body.encode(), hashlib.sha256).digest()
+    expected = link_tokens.encode(int.from_bytes(digest[:4], "big") % (36 ** MAC_LENGTH), MAC_LENGTH)
+    assert link_tokens.mac(body) == expected
+    assert link_tokens.sign(body) == body + expected
+
+
+def test_signed_tokens_are_checked_without_the_database(monkeypatch):
+    monkeypatch.setattr(link_tokens.settings, "QR_SIGNED_TOKENS", True)
+    token = link_tokens.token_for(7)
+    assert len(token) == TOKEN_LENGTH + MAC_LENGTH
+    assert link_tokens.token_acceptable(token)
+
+    body, given = token[:TOKEN_LENGTH], token[TOKEN_LENGTH:]
+    forged_mac = given[:-1] + ("0" if given[-1] != "0" else "1")
+    forged_body = ("0" if body[0] != "0" else "1") + body[1:]
+    assert not link_tokens.token_acceptable(body + forged_mac)
+    assert not link_tokens.token_acceptable(forged_body + given)
+    assert not link_tokens.token_acceptable(token.upper())
+
+
+def test_unsigned_tokens_follow_the_legacy_switch(monkeypatch):
+    legacy = ["0123456789ab", link_tokens.encode(link_tokens.permute(7))]
+    monkeypatch.setattr(link_tokens.settings, "QR_ACCEPT_UNSIGNED_TOKENS", True)
+    assert all(link_tokens.token_acceptable(token) for token in legacy)
+    assert not link_tokens.token_acceptable("not-a-token")
+    monkeypatch.setattr(link_tokens.settings, "QR_ACCEPT_UNSIGNED_TOKENS", False)
+    assert not any(link_tokens.token_acceptable(token) for token in legacy)
@@ -0,0 +1,58 @@
+import io
+import re
+
+import pytest
+
+from app.services.pdf_writer import StreamingPDFWriter
+
+
+def build(pages=3):
+    writer = StreamingPDFWriter(595.28, 841.89)
+    parts = []
+    image_id = writer.add_gray_image(8, 2, bytes([0b10101010, 0b01010101]))
+    for index in range(pages):
+        writer.add_page(f"BT /F1 12 Tf 72 720 Td (Page {index + 1}) Tj ET q 8 0 0 2 72 600 cm /Im0 Do Q", {"Im0": image_id})
+        parts.append(writer.drain())  # bytes handed out before the document is finished
+    parts.append(writer.close())
+    return writer, b"".join(parts)
+
+
+def xref_entries(data):
+    start = int(re.search(rb"startxref\n(\d+)\n%%EOF\n$", data).group(1))
+    assert data[start:start + 5] == b"xref\n"
+    header, rest = data[start + 5:].split(b"\n", 1)
+    first, size = map(int, header.split())
+    lines = rest.split(b"\n")[:size]
+    return first, size, lines
+
+
+def test_xref_offsets_point_at_their_objects():
+    writer, data = build()
+    first, size, lines = xref_entries(data)
+    assert first == 0
+    assert lines[0] == b"0000000000 65535 f "
+    for object_id, line in enumerate(lines[1:], start=1):
+        offset = int(line[:10])
+        assert line.endswith(b" 00000 n ")
+        assert data[offset:].startswith(f"{object_id} 0 obj\n".encode())
+    assert re.search(rb"trailer\n<< /Size %d " % size, data)
+
+
+def test_drained_chunks_form_a_readable_document():
+    pypdf = pytest.importorskip("pypdf")
+    writer, data = build(pages=5)
+    assert writer.page_count == 5
+    reader = pypdf.PdfReader(io.BytesIO(data), strict=True)
+    assert len(reader.pages) == 5
+    assert "Page 5" in reader.pages[4].extract_text()
+
+
+def test_text_outside_winansi_is_replaced_instead_of_failing():
+    writer = StreamingPDFWriter(595.28, 841.89)
+    writer.add_form(10, 10, "BT /F1 8 Tf 0 0 Td (पूर्णा) Tj ET")
+    writer.add_page("BT /F1 12 Tf 72 720 Td (Purna ₹499 Gummies €) Tj ET")
+    data = writer.close()
+
+    pypdf = pytest.importorskip("pypdf")
+    reader = pypdf.PdfReader(io.BytesIO(data), strict=True)
+    assert "Purna ?499 Gummies €" in reader.pages[0].extract_text()
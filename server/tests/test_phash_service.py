@@ -0,0 +1,68 @@
+from datetime import datetime
+
+from app.models.reward import Reward
+from app.models.user import User
+from app.services.phash_service import CHUNK_BITS, phash_service
+
+BASE = 0x0123456789ABCDEF
+
+
+def flip(value, *bits):
+    for bit in bits:
+        value ^= 1 << bit
+    return value
+
+
+def add_reward(db, value):
+    user = db.query(User).first()
+    if user is None:
+        user = User(email="claims@example.com", name="Claimant")
+        db.add(user)
+        db.flush()
+    reward = Reward(
+        user_id=user.id, name="n", phone="1", address="a", product_name="p",
+        purchase_date=datetime.utcnow(), review_screenshot="x", **phash_service.columns(value)
+    )
+    db.add(reward)
+    db.commit()
+    return reward
+
+
+def test_chunks_round_trip_the_hash():
+    chunks = phash_service.chunks(BASE)
+    assert len(chunks) == 4
+    assert sum(chunk << (CHUNK_BITS * i) for i, chunk in enumerate(chunks)) == BASE
+    columns = phash_service.columns(BASE)
+    assert columns["phash"] == "0123456789abcdef"
+    assert [columns[f"phash_{i}"] for i in range(4)] == chunks
+
+
+def test_matches_within_three_bits_share_a_chunk_and_are_found(db):
+    reward = add_reward(db, BASE)
+    # Worst case for the index: each flipped bit in a different chunk
+    for bits in [(), (0,), (0, 16), (0, 16, 32), (1, 2, 3)]:
+        probe = flip(BASE, *bits)
+        assert phash_service.find_closest(db, Reward, probe, max_distance=3) == (reward.id, len(bits))
+
+
+def test_four_bits_in_four_chunks_are_outside_the_index(db):
+    add_reward(db, BASE)
+    probe = flip(BASE, 0, 16, 32, 48)
+    assert all(a != b for a, b in zip(phash_service.chunks(probe), phash_service.chunks(BASE)))
+    assert phash_service.find_closest(db, Reward, probe, max_distance=10) is None
+
+
+def test_closest_candidate_wins_and_exclude_id_skips_self(db):
+    far = add_reward(db, flip(BASE, 0, 1))
+    near = add_reward(db, flip(BASE, 5))
+    assert phash_service.find_closest(db, Reward, BASE, max_distance=3) == (near.id, 1)
+    assert phash_service.find_closest(db, Reward, flip(BASE, 5), max_distance=3, exclude_id=near.id) == (far.id, 3)
+
+
+def test_reject_and_review_thresholds(db):
+    reward = add_reward(db, BASE)
+    assert phash_service.find_near_duplicate(db, Reward, flip(BASE, 7), max_distance=1) == reward.id
+    assert phash_service.find_near_duplicate(db, Reward, flip(BASE, 7, 8), max_distance=1) is None
+    assert phash_service.is_duplicate(phash_service.max_distance)
+    assert not phash_service.is_duplicate(phash_service.max_distance + 1)
+    assert phash_service.review_distance <= 3
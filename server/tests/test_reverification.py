@@ -0,0 +1,44 @@
+from datetime import datetime
+
+from app.models.qr_code import QRCode
+from app.models.reward import Reward
+from app.models.user import User
+from app.services import ai_service as ai_service_module
+from app.services.qr_generation import generate_codes
+from app.services.reverification_service import ReverificationJob, TokenBucket
+
+
+def test_ai_cache_hits_do_not_take_rate_limit_tokens(db, product, tmp_path, monkeypatch):
+    from app.config import settings
+
+    monkeypatch.setattr(settings, "JOBS_DIR", str(tmp_path / "jobs"))
+    monkeypatch.setattr(settings, "AI_CACHE_ENABLED", True)
+    monkeypatch.setattr(settings, "AI_BACKEND", "fake")
+    monkeypatch.setattr(settings, "FAKE_AI_LATENCY", "fixed:0")
+    monkeypatch.setattr(settings, "FAKE_AI_ERROR_RATE", 0)
+    monkeypatch.setattr(settings, "FAKE_AI_VERDICTS", "three_star")
+    monkeypatch.setattr(ai_service_module, "ai_service", ai_service_module.AIAnalysisService())
+    tokens = []
+    monkeypatch.setattr(TokenBucket, "acquire", lambda bucket: tokens.append(1))
+
+    monkeypatch.chdir(tmp_path)  # review_screenshot paths are relative to the server directory
+    (tmp_path / "uploads" / "rewards").mkdir(parents=True)
+    user = User(email="buyer@example.com", name="Buyer")
+    db.add(user)
+    generate_codes(db, product.id, 3)
+    db.flush()
+    for (code,) in db.query(QRCode.code).order_by(QRCode.serial_number):
+        # Identical bytes in separate files (a rejected claim deletes its screenshot)
+        (tmp_path / "uploads" / "rewards" / f"{code}.png").write_bytes(b"same screenshot bytes")
+        db.add(Reward(
+            user_id=user.id, name="Buyer", phone="9999999999", address="N/A", product_name=product.name,
+            purchase_date=datetime.utcnow(), review_screenshot=f"/uploads/rewards/{code}.png", coupon_code=code,
+            ai_analysis_status="failed"
+        ))
+    db.commit()
+
+    result = ReverificationJob(concurrency=1).run()
+
+    assert result["processed"] == 3
+    assert result["outcomes"]["failed"] == 0
+    assert len(tokens) == 1  # the other two verdicts came from the AI cache
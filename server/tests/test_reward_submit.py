@@ -0,0 +1,94 @@
+import io
+import random
+
+import pytest
+from fastapi.testclient import TestClient
+from PIL import Image, ImageDraw
+
+from app.api.auth import get_current_user
+from app.main import app
+from app.models.qr_code import QRCode
+from app.models.reward import Reward
+from app.models.user import User
+from app.services.qr_generation import generate_codes
+from app.services.verification_worker import apply_verification_result
+
+
+def screenshot(marker=None):
+    """A review-like screenshot; `marker` changes a few pixels (new bytes, same dHash)"""
+    rng = random.Random(6)
+    image = Image.new("RGB", (360, 720), "white")
+    draw = ImageDraw.Draw(image)
+    for _ in range(40):
+        x, y = rng.randint(0, 300), rng.randint(0, 660)
+        shade = rng.randint(0, 255)
+        draw.rectangle([x, y, x + rng.randint(5, 60), y + rng.randint(5, 60)], fill=(shade, shade, shade))
+    if marker:
+        draw.point(marker, fill=(250, 0, 0))
+    buffer = io.BytesIO()
+    image.save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def client(db, product, tmp_path, monkeypatch):
+    from app.config import settings
+
+    monkeypatch.setattr(settings, "UPLOAD_DIR", str(tmp_path))
+    user = User(email="buyer@example.com", name="Buyer")
+    db.add(user)
+    generate_codes(db, product.id, 2)
+    db.commit()
+    app.dependency_overrides[get_current_user] = lambda: db.query(User).filter(User.email == "buyer@example.com").one()
+    yield TestClient(app)
+    app.dependency_overrides.pop(get_current_user, None)
+
+
+def submit(client, code, image):
+    return client.post("/api/rewards/submit", data={
+        "name": "Buyer", "phone": "9999999999", "platform": "Amazon", "upi_id": "buyer@upi", "coupon_code": code
+    }, files={"screenshot": ("review.png", image, "image/png")})
+
+
+def test_rejected_claim_can_be_retried_with_a_near_identical_screenshot(db, client):
+    first_code, other_code = [code for (code,) in db.query(QRCode.code).order_by(QRCode.serial_number)]
+    assert submit(client, first_code, screenshot()).status_code == 200
+
+    # While the first claim stands, a near-identical screenshot is a duplicate
+    response = submit(client, other_code, screenshot(marker=(5, 5)))
+    assert response.status_code == 400
+
+    # 1-star review: rejected and the QR freed for a retry
+    reward = db.query(Reward).one()
+    apply_verification_result(db, reward, {"detected_rating": 1, "decision_reasoning": "1 star"})
+    db.commit()
+    assert reward.status == "rejected"
+
+    response = submit(client, first_code, screenshot(marker=(6, 6)))
+    assert response.status_code == 200, response.text
+    retry = db.query(Reward).filter(Reward.id == response.json()["id"]).one()
+    assert retry.ai_decision_log is None  # not held for review because of the rejected claim
+
+    apply_verification_result(db, retry, {"detected_rating": 5, "auto_approve": True, "decision_reasoning": "found"})
+    assert retry.status == "approved" and retry.is_auto_approved
+
+
+def test_oversized_upload_is_refused_from_its_content_length(db, client, monkeypatch):
+    from app.config import settings
+
+    monkeypatch.setattr(settings, "MAX_FILE_SIZE", 1024)
+    code = db.query(QRCode.code).first()[0]
+    response = submit(client, code, b"\x89PNG" + b"0" * (200 * 1024))
+    assert response.status_code == 413
+    assert db.query(Reward).count() == 0
+
+
+def test_upload_just_over_the_cap_is_refused_while_streaming(db, client, tmp_path, monkeypatch):
+    from app.config import settings
+
+    image = screenshot()
+    monkeypatch.setattr(settings, "MAX_FILE_SIZE", len(image) - 1)
+    code = db.query(QRCode.code).first()[0]
+    response = submit(client, code, image)
+    assert response.status_code == 413
+    assert not list((tmp_path / "rewards").iterdir())
@@ -0,0 +1,78 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.models.qr_code import QRCode
+from app.services import scan_counter as scan_counter_module
+from app.services.qr_generation import generate_codes
+from app.services.scan_counter import ScanCounterBuffer
+
+
+@pytest.fixture
+def codes(db, product):
+    generate_codes(db, product.id, 5)
+    db.commit()
+    return [qr_id for (qr_id,) in db.query(QRCode.id).order_by(QRCode.serial_number)]
+
+
+def counts(db):
+    db.expire_all()
+    return {qr.id: (qr.scan_count, qr.last_scanned_at) for qr in db.query(QRCode).all()}
+
+
+def test_flush_adds_increments_in_one_update_per_chunk(db, codes):
+    buffer = ScanCounterBuffer(flush_interval=60)
+    buffer.batch_size = 2  # 3 codes -> two UPDATE ... CASE chunks
+    start = datetime(2026, 1, 1, 12, 0)
+    for offset, qr_id in enumerate([codes[0], codes[0], codes[1], codes[0], codes[2]]):
+        buffer.record(qr_id, start + timedelta(minutes=offset))
+
+    assert buffer.pending(codes[0]) == 3
+    assert buffer.flush() == 5
+
+    after = counts(db)
+    assert after[codes[0]] == (3, start + timedelta(minutes=3))
+    assert after[codes[1]] == (1, start + timedelta(minutes=2))
+    assert after[codes[2]] == (1, start + timedelta(minutes=4))
+    # Codes without pending scans are untouched (CASE else branches)
+    assert after[codes[3]] == (0, None)
+    assert buffer.stats()["pending_scans"] == 0
+
+
+def test_flush_accumulates_on_existing_counts(db, codes):
+    buffer = ScanCounterBuffer(flush_interval=60)
+    buffer.record(codes[0])
+    buffer.flush()
+    buffer.record(codes[0])
+    buffer.record(codes[0])
+    buffer.flush()
+    assert counts(db)[codes[0]][0] == 3
+
+
+def test_failed_flush_keeps_scans_for_the_next_attempt(db, codes, monkeypatch):
+    buffer = ScanCounterBuffer(flush_interval=60)
+    scanned_at = datetime(2026, 1, 1, 12, 0)
+    buffer.record(codes[0], scanned_at)
+
+    class BrokenSession:
+        def execute(self, *args, **kwargs):
+            raise RuntimeError("database is down")
+
+        def rollback(self):
+            pass
+
+        def close(self):
+            pass
+
+    real_session = scan_counter_module.SessionLocal
+    monkeypatch.setattr(scan_counter_module, "SessionLocal", BrokenSession)
+    assert buffer.flush() == 0
+    assert buffer.last_error == "database is down"
+
+    # Scans arriving meanwhile merge with the returned ones
+    buffer.record(codes[0], scanned_at + timedelta(minutes=1))
+    assert buffer.pending(codes[0]) == 2
+
+    monkeypatch.setattr(scan_counter_module, "SessionLocal", real_session)
+    assert buffer.flush() == 2
+    assert counts(db)[codes[0]] == (2, scanned_at + timedelta(minutes=1))
@@ -0,0 +1,76 @@
+import pytest
+
+from app.models.qr_code import QRCode
+from app.services import serial_bitmap
+from app.services.qr_generation import generate_codes
+from app.services.serial_bitmap import ProductSerialBitmap, QRSerialBitmaps
+
+
+def brute_force(bitmap, state, serial_start, serial_end):
+    return sum(bitmap.get(state, serial) for serial in range(serial_start, serial_end + 1))
+
+
+@pytest.mark.parametrize("serial_start,count", [(0, 1), (3, 4), (5, 3), (7, 2), (8, 8), (1, 30), (13, 100), (64, 64)])
+def test_set_range_sets_exactly_the_range(serial_start, count):
+    bitmap = ProductSerialBitmap()
+    bitmap.set("issued", 200)  # grow first so neighbouring bytes exist
+    bitmap.set_range("issued", serial_start, count)
+    expected = set(range(serial_start, serial_start + count)) | {200}
+    assert {serial for serial in range(256) if bitmap.get("issued", serial)} == expected
+
+
+def test_usage_counts_match_bit_by_bit():
+    bitmap = ProductSerialBitmap()
+    bitmap.set_range("issued", 1, 150)
+    for serial in range(1, 151, 3):
+        bitmap.set("scanned", serial)
+    for serial in range(2, 151, 7):
+        bitmap.set("used", serial)
+    bitmap.set("used", 9, False)
+
+    for serial_start, serial_end in [(1, 150), (5, 5), (9, 9), (3, 70), (64, 127), (140, 160)]:
+        usage = bitmap.usage(serial_start, serial_end)
+        for state in ("issued", "scanned", "used"):
+            assert usage[state] == brute_force(bitmap, state, serial_start, serial_end)
+    assert bitmap.usage(10, 9) == {"issued": 0, "scanned": 0, "used": 0}
+    assert bitmap.total() == {state: brute_force(bitmap, state, 0, 151) for state in ("issued", "scanned", "used")}
+
+
+@pytest.fixture
+def issued(db, product):
+    generate_codes(db, product.id, 20)
+    db.commit()
+    codes = db.query(QRCode).order_by(QRCode.serial_number).all()
+    codes[0].scan_count = 2
+    codes[1].is_used = True
+    db.commit()
+    return codes
+
+
+def test_rebuild_reads_states_from_the_table(product, issued):
+    bitmaps = QRSerialBitmaps(refresh_interval=60)
+    assert bitmaps.usage(product.id) is None  # not built yet
+    assert bitmaps.rebuild()
+    assert bitmaps.usage(product.id) == {"issued": 20, "scanned": 1, "used": 1}
+    assert bitmaps.is_used(product.id, issued[1].serial_number) is True
+    assert bitmaps.is_used(product.id, issued[2].serial_number) is False
+    assert bitmaps.is_used(product.id, 999) is None  # never issued
+
+
+def test_updates_made_during_a_rebuild_are_replayed(product, issued, monkeypatch):
+    bitmaps = QRSerialBitmaps(refresh_interval=60)
+    bitmaps.rebuild()
+    serial = issued[5].serial_number
+    real_session = serial_bitmap.SessionLocal
+
+    def claim_while_reading():
+        # Committed after the rebuild's snapshot: only the journal carries it
+        bitmaps.mark_used(product.id, serial)
+        bitmaps.mark_issued(product.id, 21, 4)
+        return real_session()
+
+    monkeypatch.setattr(serial_bitmap, "SessionLocal", claim_while_reading)
+    assert bitmaps.rebuild()
+    assert bitmaps.is_used(product.id, serial) is True
+    assert bitmaps.usage(product.id) == {"issued": 24, "scanned": 1, "used": 2}
+    assert bitmaps._journal is None
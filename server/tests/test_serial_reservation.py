@@ -0,0 +1,42 @@
+from app.database import SessionLocal
+from app.models.product_serial_counter import ProductSerialCounter
+from app.models.qr_batch import QRBatch
+from app.services import qr_generation
+from app.services.qr_generation import generate_codes, reserve_serials
+
+
+def test_first_reservation_seeds_from_existing_codes_and_batches(db, product):
+    # Codes and a batch issued before the counter table existed
+    generate_codes(db, product.id, 3, serial_start=40)
+    db.add(QRBatch(product_id=product.id, batch_number=7, quantity=3, serial_start=40, serial_end=42))
+    db.commit()
+    db.query(ProductSerialCounter).delete()
+    db.commit()
+
+    assert reserve_serials(product.id, 10, batch=True) == (43, 8)
+    assert reserve_serials(product.id, 5) == (53, None)
+    assert reserve_serials(product.id, 1, batch=True) == (58, 9)
+
+
+def test_seeding_race_uses_the_other_workers_row(db, product, monkeypatch):
+    real_seed = qr_generation._seed_counter
+
+    def seeded_elsewhere_first(session, product_id):
+        # Another worker inserts the row between our missed UPDATE and our INSERT
+        other = SessionLocal()
+        other.add(ProductSerialCounter(product_id=product_id, next_serial=100, next_batch_number=4))
+        other.commit()
+        other.close()
+        real_seed(session, product_id)  # hits the primary key, rolls back
+
+    monkeypatch.setattr(qr_generation, "_seed_counter", seeded_elsewhere_first)
+    assert reserve_serials(product.id, 20, batch=True) == (100, 4)
+
+    db.expire_all()
+    counter = db.query(ProductSerialCounter).filter(ProductSerialCounter.product_id == product.id).one()
+    assert (counter.next_serial, counter.next_batch_number) == (120, 5)
+
+
+def test_reservations_never_overlap(db, product):
+    ranges = [reserve_serials(product.id, count)[0] for count in (1, 24, 1000, 7)]
+    assert ranges == [1, 2, 26, 1026]